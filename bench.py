@@ -0,0 +1,245 @@
+"""Benchmarks for the simulation hot paths.
+
+Every case runs a seeded synthetic workload through one entry point
+(``MultiLevelCache.access_batch``, per-call ``access_memory``/``write_memory``,
+per-call ``Cache.read``/``write``, address decoding, ``Cache.replace``) on a
+small or realistic configuration. Throughput is the best of ``--repeat``
+clean runs; peak memory and the per-level time split come from one extra
+instrumented run so they don't skew it.
+
+    python bench.py --save-baseline bench_baseline.json
+    python bench.py --baseline bench_baseline.json --threshold 0.2   # exit 1 on regressions
+"""
+import argparse
+import json
+import os
+import sys
+import time
+import tracemalloc
+from dataclasses import asdict, dataclass, field
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+import mylib
+import traces
+import workloads
+
+CONFIG_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "configs")
+
+# Hierarchies to benchmark: the original toy levels on both engines and a server-class setup.
+CONFIGS: Dict[str, Callable[[], mylib.MultiLevelCache]] = {
+    "toy": lambda: mylib.MultiLevelCache(),
+    "toy-numpy": lambda: mylib.MultiLevelCache([{**asdict(level), "engine": "numpy"}
+                                                for level in mylib.DEFAULT_LEVELS]),
+    "server": lambda: mylib.MultiLevelCache.from_config(os.path.join(CONFIG_DIR, "server.toml")),
+}
+
+# Accesses per case at --scale 1.
+BATCH_SIZE = 50_000
+SCALAR_SIZE = 5_000
+MICRO_SIZE = 200_000
+
+SEED = 2024
+WRITE_RATIO = 0.25
+
+# --- Workloads ---
+
+# Seeded generators from workloads.py, materialized: name -> f(n, seed) -> chunks.
+WORKLOADS: Dict[str, Callable[[int, int], Iterable[np.ndarray]]] = {
+    "sequential": lambda n, seed: workloads.strided(n, stride=8, footprint=1 << 40,
+                                                    write_ratio=WRITE_RATIO, seed=seed),
+    "strided": lambda n, seed: workloads.strided(n, stride=4096, footprint=64 << 20,
+                                                 write_ratio=WRITE_RATIO, seed=seed),
+    # A 1 MiB stride lands every access in one set of every level: the numpy kernel's worst case.
+    "hot-set": lambda n, seed: workloads.strided(n, stride=1 << 20, footprint=64 << 20,
+                                                 write_ratio=WRITE_RATIO, seed=seed),
+    "uniform": lambda n, seed: workloads.uniform(n, footprint=256 << 20, write_ratio=WRITE_RATIO, seed=seed),
+    "zipf": lambda n, seed: workloads.zipf(n, write_ratio=WRITE_RATIO, seed=seed),
+    # One random cycle through 16 MiB of 64 B nodes.
+    "pointer-chase": lambda n, seed: workloads.pointer_chase(n, nodes=1 << 18, seed=seed),
+}
+
+def make_workload(name: str, n: int, seed: int = SEED) -> Tuple[np.ndarray, np.ndarray]:
+    """(addresses, is_write) for a named workload; pointer chasing only reads."""
+    records = np.concatenate(list(WORKLOADS[name](n, seed)))
+    return records["addr"].astype(np.int64), records["op"] == traces.OP_WRITE
+
+# --- Cases ---
+
+@dataclass
+class Case:
+    name: str
+    kind: str  # batch, scalar, cache, decode or replace
+    config: str
+    workload: str
+    size: int
+
+def default_cases(configs: Sequence[str] = tuple(CONFIGS)) -> List[Case]:
+    cases = []
+    for config in configs:
+        for workload in WORKLOADS:
+            cases.append(Case(f"batch/{config}/{workload}", "batch", config, workload, BATCH_SIZE))
+            cases.append(Case(f"scalar/{config}/{workload}", "scalar", config, workload, SCALAR_SIZE))
+        cases.append(Case(f"cache/{config}/uniform", "cache", config, "uniform", SCALAR_SIZE))
+        cases.append(Case(f"replace/{config}", "replace", config, "uniform", SCALAR_SIZE))
+    for workload in ("sequential", "uniform"):
+        cases.append(Case(f"decode/{workload}", "decode", "server", workload, MICRO_SIZE))
+    return cases
+
+@dataclass
+class BenchResult:
+    name: str
+    accesses: int
+    seconds: float
+    peak_bytes: int = 0
+    levels: Dict[str, float] = field(default_factory=dict)  # seconds per level (plus "other")
+
+    @property
+    def accesses_per_sec(self) -> float:
+        return self.accesses / self.seconds if self.seconds else 0.0
+
+    def as_dict(self) -> Dict[str, object]:
+        return {**asdict(self), "accesses_per_sec": self.accesses_per_sec}
+
+def _runner(case: Case, addresses: np.ndarray, writes: np.ndarray) -> Tuple[Callable[[], None], object]:
+    """A fresh simulator for one run and the callable that drives it."""
+    hierarchy = CONFIGS[case.config]()
+    if case.kind == "batch":
+        return lambda: hierarchy.access_batch(addresses, writes, 0), hierarchy
+    if case.kind == "scalar":
+        def run():
+            read, write = hierarchy.access_memory, hierarchy.write_memory
+            for t, (address, is_write) in enumerate(zip(addresses.tolist(), writes.tolist())):
+                (write if is_write else read)(address, t)
+        return run, hierarchy
+    cache = hierarchy.levels[-1]
+    if case.kind == "cache":
+        def run():
+            for t, (address, is_write) in enumerate(zip(addresses.tolist(), writes.tolist())):
+                (cache.write if is_write else cache.read)(address, t)
+        return run, cache
+    if case.kind == "replace":
+        index, tag = cache.decode_batch(addresses)
+        def run():
+            for t, (i, g) in enumerate(zip(index.tolist(), tag.tolist())):
+                cache.replace(i, g, t)
+        return run, cache
+    if case.kind == "decode":
+        def run():
+            cache.decode_batch(addresses)
+            mylib.get_index(addresses, cache.block_size, cache.num_sets)
+            mylib.get_tag(addresses, cache.block_size, cache.num_sets)
+            for address in addresses[:len(addresses) // 10].tolist():
+                cache.decode(address)
+        return run, cache
+    raise ValueError(f"Unknown benchmark kind {case.kind!r}")
+
+_LEVEL_METHODS = ("_process_batch", "_access", "insert", "invalidate", "extract", "mark_dirty", "replace")
+
+def _instrument(target) -> Dict[str, float]:
+    # Time every entry point of each level; nested calls within a level count once.
+    levels = target.levels if isinstance(target, mylib.MultiLevelCache) else [target]
+    timings = {level.name or "cache": 0.0 for level in levels}
+    for level in levels:
+        name, active = level.name or "cache", [False]
+        for method in _LEVEL_METHODS:
+            original = getattr(level, method)
+            def timed(*args, _original=original, _name=name, _active=active, **kwargs):
+                if _active[0]:
+                    return _original(*args, **kwargs)
+                _active[0] = True
+                start = time.perf_counter()
+                try:
+                    return _original(*args, **kwargs)
+                finally:
+                    timings[_name] += time.perf_counter() - start
+                    _active[0] = False
+            setattr(level, method, timed)
+    return timings
+
+def run_case(case: Case, scale: float = 1.0, repeat: int = 3, breakdown: bool = True) -> BenchResult:
+    n = max(1, int(case.size * scale))
+    addresses, writes = make_workload(case.workload, n)
+    best = float("inf")
+    for _ in range(repeat):
+        run, _ = _runner(case, addresses, writes)
+        start = time.perf_counter()
+        run()
+        best = min(best, time.perf_counter() - start)
+    result = BenchResult(case.name, n, best)
+    if breakdown:
+        run, target = _runner(case, addresses, writes)
+        timings = _instrument(target)
+        tracemalloc.start()
+        start = time.perf_counter()
+        try:
+            run()
+        finally:
+            elapsed = time.perf_counter() - start
+            result.peak_bytes = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+        # Scale the instrumented split to the clean run's time.
+        if elapsed > 0 and any(timings.values()):
+            timings["other"] = max(elapsed - sum(timings.values()), 0.0)
+            result.levels = {name: best * seconds / elapsed for name, seconds in timings.items()}
+    return result
+
+# --- Baselines ---
+
+def save_baseline(results: Sequence[BenchResult], path: str):
+    with open(path, "w") as f:
+        json.dump({result.name: result.as_dict() for result in results}, f, indent=2, sort_keys=True)
+
+def compare(results: Sequence[BenchResult], baseline: Dict[str, Dict[str, float]],
+            threshold: float) -> List[Tuple[str, float, float]]:
+    """(name, baseline, current) accesses/sec of every case slower than baseline by more than ``threshold``."""
+    regressions = []
+    for result in results:
+        reference = baseline.get(result.name, {}).get("accesses_per_sec")
+        if reference and result.accesses_per_sec < reference * (1 - threshold):
+            regressions.append((result.name, reference, result.accesses_per_sec))
+    return regressions
+
+def format_result(result: BenchResult) -> str:
+    levels = " ".join(f"{name}={seconds / result.seconds:.0%}" for name, seconds in result.levels.items()
+                      if result.seconds)
+    return (f"{result.name:<32} {result.accesses_per_sec:>12,.0f}/s {result.seconds:>8.3f}s "
+            f"{result.peak_bytes / (1 << 20):>8.1f}MiB  {levels}")
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark the cache simulator hot paths.")
+    parser.add_argument("--filter", default="", help="only run cases whose name contains this")
+    parser.add_argument("--scale", type=float, default=1.0, help="multiply every case's access count")
+    parser.add_argument("--repeat", type=int, default=3, help="clean runs per case; the best is kept")
+    parser.add_argument("--no-breakdown", action="store_true", help="skip the instrumented memory/per-level run")
+    parser.add_argument("--json", help="write results to this JSON file")
+    parser.add_argument("--save-baseline", help="store results as a baseline JSON file")
+    parser.add_argument("--baseline", help="compare against a baseline JSON file")
+    parser.add_argument("--threshold", type=float, default=0.2,
+                        help="allowed slowdown against the baseline before failing (default 0.2 = 20%%)")
+    args = parser.parse_args(argv)
+
+    results = []
+    for case in default_cases():
+        if args.filter in case.name:
+            result = run_case(case, args.scale, args.repeat, not args.no_breakdown)
+            print(format_result(result), flush=True)
+            results.append(result)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump([result.as_dict() for result in results], f, indent=2)
+    if args.save_baseline:
+        save_baseline(results, args.save_baseline)
+    if args.baseline:
+        with open(args.baseline, "r") as f:
+            regressions = compare(results, json.load(f), args.threshold)
+        for name, reference, current in regressions:
+            print(f"REGRESSION {name}: {current:,.0f}/s vs baseline {reference:,.0f}/s "
+                  f"({current / reference - 1:+.0%})", file=sys.stderr)
+        if regressions:
+            return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,140 @@
+"""Warm-state checkpoints of a Cache or MultiLevelCache.
+
+A checkpoint is a single .npz file. It holds the get_state() arrays of every
+level (tags, valid/dirty/prefetched bits, recency and frequency metadata,
+replacement-policy state) and its counters. A JSON header carries the
+configuration, the simulated time and the small non-array state: policy RNGs
+and prefetcher tables. ``load`` rebuilds the object from the header, and
+``restore`` refills an existing one of the same shape. Either engine can
+restore a checkpoint written by the other.
+
+    traces.replay(llc, warmup)
+    checkpoint.save(llc, "warm.npz", time=warmup_length)
+    ...
+    llc, time = checkpoint.load("warm.npz")   # in every experiment that forks from it
+
+Files are uncompressed by default so np.load reads each array straight from
+disk with no decode step.
+"""
+import json
+import os
+from collections import OrderedDict
+from dataclasses import fields
+from typing import Any, Dict, List, Tuple, Union
+
+import numpy as np
+
+from mylib import Cache, HierarchyStats, LevelConfig, MissClassifier, MultiLevelCache
+
+FORMAT_VERSION = 1
+
+Checkpointable = Union[Cache, MultiLevelCache]
+
+def _levels(cache: Checkpointable) -> List[Cache]:
+    return cache.levels if isinstance(cache, MultiLevelCache) else [cache]
+
+def _shape(config: Dict[str, Any]) -> Dict[str, Any]:
+    # The engine is an implementation detail: state moves freely between them.
+    if "levels" in config:
+        return {**config, "levels": [_shape(level) for level in config["levels"]]}
+    return {key: value for key, value in config.items() if key != "engine"}
+
+# --- Saving ---
+
+def _save_level(level: Cache, prefix: str, arrays: Dict[str, np.ndarray]) -> Dict[str, Any]:
+    arrays.update({prefix + name: values for name, values in level.get_state().items()})
+    for stats, group in ((level.stats, "stats"), (level.prefetch_stats, "prefetch_stats")):
+        arrays.update({f"{prefix}{group}.{field.name}": np.int64(getattr(stats, field.name))
+                       for field in fields(stats)})
+    arrays[prefix + "pending_prefetches"] = np.array(level.pending_prefetches, dtype=np.int64)
+    arrays[prefix + "prefetch_victims"] = np.fromiter(level._prefetch_victims, dtype=np.int64)
+    classifier = level.miss_classifier
+    if classifier is not None:
+        arrays[prefix + "classifier.seen"] = np.fromiter(classifier.seen, dtype=np.int64)
+        arrays[prefix + "classifier.shadow"] = np.fromiter(classifier.shadow, dtype=np.int64)
+        arrays[prefix + "classifier.conflicts_by_set"] = classifier.conflicts_by_set
+    rng = getattr(level.policy, "rng", None)
+    return {"rng": rng.bit_generator.state if rng is not None else None,
+            "prefetcher": level.prefetcher.get_state() if level.prefetcher is not None else None,
+            "classified": classifier is not None}
+
+def save(cache: Checkpointable, path: Union[str, os.PathLike], time: int = 0, compress: bool = False):
+    """Write the full state of ``cache`` to ``path``; ``time`` is the next timestamp to simulate."""
+    arrays: Dict[str, np.ndarray] = {}
+    header: Dict[str, Any] = {"version": FORMAT_VERSION, "time": int(time),
+                              "hierarchy": isinstance(cache, MultiLevelCache), "config": cache.to_config(),
+                              "levels": [_save_level(level, f"level{i}/", arrays)
+                                         for i, level in enumerate(_levels(cache))]}
+    if isinstance(cache, MultiLevelCache):
+        stats = cache.hierarchy_stats
+        header["hierarchy_stats"] = {"accesses": stats.accesses, "total_latency": stats.total_latency,
+                                     "back_invalidations": stats.back_invalidations,
+                                     "bytes_up": stats.bytes_up, "bytes_down": stats.bytes_down}
+    arrays["header"] = np.array(json.dumps(header))
+    (np.savez_compressed if compress else np.savez)(path, **arrays)
+
+# --- Loading ---
+
+def _read(path: Union[str, os.PathLike]) -> Tuple[Dict[str, Any], Any]:
+    data = np.load(path)
+    if "header" not in data.files:
+        raise ValueError(f"{os.fspath(path)} is not a cache checkpoint")
+    header = json.loads(data["header"].item())
+    if header["version"] != FORMAT_VERSION:
+        raise ValueError(f"Unsupported checkpoint version {header['version']} (expected {FORMAT_VERSION})")
+    return header, data
+
+def _restore_level(level: Cache, prefix: str, saved: Dict[str, Any], data):
+    state = {name: data[prefix + name] for name in Cache.STATE_ARRAYS}
+    state.update({name[len(prefix):]: data[name] for name in data.files if name.startswith(prefix + "policy.")})
+    level.set_state(state)
+    for stats, group in ((level.stats, "stats"), (level.prefetch_stats, "prefetch_stats")):
+        for field in fields(stats):
+            setattr(stats, field.name, int(data[f"{prefix}{group}.{field.name}"]))
+    level.pending_prefetches = data[prefix + "pending_prefetches"].tolist()
+    level._prefetch_victims = OrderedDict.fromkeys(data[prefix + "prefetch_victims"].tolist())
+    if saved["classified"]:
+        classifier = MissClassifier(level.num_sets, level.num_sets * level.associativity)
+        classifier.seen = set(data[prefix + "classifier.seen"].tolist())
+        classifier.shadow.update(dict.fromkeys(data[prefix + "classifier.shadow"].tolist()))
+        classifier.conflicts_by_set[:] = data[prefix + "classifier.conflicts_by_set"]
+        level.miss_classifier = classifier
+    else:
+        level.miss_classifier = None
+    if saved["rng"] is not None:
+        level.policy.rng.bit_generator.state = saved["rng"]
+    if saved["prefetcher"] is not None:
+        level.prefetcher.set_state(saved["prefetcher"])
+
+def restore(cache: Checkpointable, path: Union[str, os.PathLike]) -> int:
+    """Load a checkpoint into an existing cache of the same configuration; returns its time."""
+    header, data = _read(path)
+    if header["hierarchy"] != isinstance(cache, MultiLevelCache) or \
+            _shape(header["config"]) != _shape(cache.to_config()):
+        data.close()
+        raise ValueError(f"Checkpoint {os.fspath(path)} was taken from a differently configured cache")
+    return _restore(cache, header, data)
+
+def _restore(cache: Checkpointable, header: Dict[str, Any], data) -> int:
+    with data:
+        for i, (level, saved) in enumerate(zip(_levels(cache), header["levels"])):
+            _restore_level(level, f"level{i}/", saved, data)
+    if isinstance(cache, MultiLevelCache):
+        cache.hierarchy_stats = HierarchyStats(**header["hierarchy_stats"])
+    return header["time"]
+
+def load(path: Union[str, os.PathLike], engine: str = "") -> Tuple[Checkpointable, int]:
+    """Rebuild the checkpointed Cache or MultiLevelCache; returns it and the saved time.
+
+    ``engine`` overrides the engine the checkpoint was taken with.
+    """
+    header, data = _read(path)
+    config = header["config"]
+    if engine:
+        config = {**config, "levels": [{**level, "engine": engine} for level in config["levels"]]} \
+            if header["hierarchy"] else {**config, "engine": engine}
+    if header["hierarchy"]:
+        cache = MultiLevelCache.from_config(config)
+    else:
+        cache = LevelConfig.from_dict(config).build()
+    return cache, _restore(cache, header, data)
@@ -0,0 +1,197 @@
+"""Headless command line: simulate, sweep and analyze traces, printing JSON or CSV.
+
+    python -m mylib simulate trace.bin --config configs/server.toml
+    python -m mylib simulate trace.bin --sample-sets 32 --output csv
+    python -m mylib sweep trace.bin --grid grid.json --workers 8
+    python -m mylib analyze trace.bin --sets 64 --sets 1024
+    python -m mylib gui
+
+Only argparse and the standard library load at startup; each subcommand imports
+what it needs, and nothing here touches Tk or matplotlib unless ``gui`` is
+asked for.
+"""
+import argparse
+import csv
+import json
+import sys
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Sequence
+
+OUTPUTS = ("json", "csv")
+
+def _json_default(value: Any) -> Any:
+    # NumPy scalars and arrays from summaries and tables.
+    if hasattr(value, "tolist"):
+        return value.tolist()
+    return str(value)
+
+def _emit(args: argparse.Namespace, document: Any, rows: List[Mapping[str, Any]]):
+    """Write ``document`` as JSON or ``rows`` as CSV to --out or stdout."""
+    out = open(args.out, "w", newline="") if args.out else sys.stdout
+    try:
+        if args.output == "json":
+            json.dump(document, out, indent=2, default=_json_default)
+            out.write("\n")
+        else:
+            columns = list(dict.fromkeys(key for row in rows for key in row))
+            writer = csv.DictWriter(out, columns)
+            writer.writeheader()
+            writer.writerows(rows)
+    finally:
+        if args.out:
+            out.close()
+
+def _trace(args: argparse.Namespace) -> Iterable:
+    import traces
+    chunks = traces.open_trace(args.trace, args.format)
+    return traces._limit_chunks(chunks, args.limit) if args.limit is not None else chunks
+
+# --- simulate ---
+
+def _level_rows(summary: Mapping[str, Any]) -> List[Dict[str, Any]]:
+    return [{"level": name, **stats} for name, stats in summary["levels"].items()]
+
+def simulate(args: argparse.Namespace) -> int:
+    import mylib
+    import traces
+    time = 0
+    if args.warm:
+        import checkpoint
+        cache, time = checkpoint.load(args.warm, args.engine or "")
+        if isinstance(cache, mylib.Cache):
+            # A single-cache checkpoint replays as a one-level hierarchy.
+            cache = mylib.MultiLevelCache([cache])
+    else:
+        config = mylib.load_config(args.config) if args.config else {}
+        levels = config.get("levels") or [
+            {"name": level.name, "size": level.size, "associativity": level.associativity,
+             "hit_latency": level.hit_latency} for level in mylib.DEFAULT_LEVELS]
+        if args.engine:
+            levels = [{**level, "engine": args.engine} for level in levels]
+        config = {**config, "levels": levels}
+        if args.result_cache and not (args.classify or args.sample_sets or args.save_checkpoint):
+            import resultcache
+            store = resultcache.ResultCache(args.result_cache)
+            summary = store.simulate(args.trace, config, args.format, args.limit, not args.no_ifetch)
+            document = {"trace": args.trace, "config": mylib.MultiLevelCache.from_config(config).to_config(),
+                        **summary}
+            _emit(args, document, _level_rows(summary))
+            return 0
+        cache = mylib.MultiLevelCache.from_config(config)
+    if args.sample_sets:
+        import sampling
+        chunks = _trace(args)
+        if args.no_ifetch:
+            chunks = (chunk[chunk["op"] != traces.OP_IFETCH] for chunk in chunks)
+        result = sampling.replay_set_sampled(cache, chunks, ratio=args.sample_sets, time=time)
+        estimates = {name: vars(estimate) for name, estimate in result.levels.items()}
+        document = {"accesses": result.accesses, "simulated": result.simulated,
+                    "miss_ratio": vars(result.miss_ratio),
+                    "amat": vars(result.amat) if result.amat is not None else None, "levels": estimates}
+        rows = [{"level": name, **estimate} for name, estimate in estimates.items()]
+        _emit(args, document, rows)
+        return 0
+    if args.classify:
+        cache.classify_misses()
+    result = traces.replay(cache, _trace(args), time=time, include_ifetch=not args.no_ifetch)
+    if args.save_checkpoint:
+        import checkpoint
+        checkpoint.save(cache, args.save_checkpoint, time=result.end_time)
+    summary = cache.summary()
+    document = {"trace": args.trace, "config": cache.to_config(),
+                "replay": {**vars(result), "hit_ratio": result.hit_ratio}, **summary}
+    _emit(args, document, _level_rows(summary))
+    return 0
+
+# --- sweep ---
+
+def sweep(args: argparse.Namespace) -> int:
+    import mylib
+    import sweep as sweeps
+    spec = mylib.load_config(args.grid)
+    with sweeps.SharedTrace.load(args.trace, args.format, args.limit) as trace:
+        table = sweeps.run_sweep(trace, spec.get("base", {}), spec.get("grid", {}), args.workers, args.checkpoint)
+    rows = [dict(zip(table.dtype.names, row.tolist())) for row in table]
+    _emit(args, rows, rows)
+    return 0
+
+# --- analyze ---
+
+def analyze(args: argparse.Namespace) -> int:
+    import stackdist
+    analyzer = stackdist.StackDistanceAnalyzer(args.block_size, args.sets)
+    analyzer.feed_trace(_trace(args))
+    curves = analyzer.curves()
+    rows = []
+    for name, curve in curves.items():
+        for i, miss_ratio in enumerate(curve["miss_ratio"]):
+            rows.append({"curve": name, "capacity_bytes": curve["capacity_bytes"][i],
+                         "associativity": curve["associativity"][i] if "associativity" in curve else "",
+                         "miss_ratio": miss_ratio})
+    _emit(args, {"references": analyzer.references, "curves": curves}, rows)
+    return 0
+
+def gui(args: argparse.Namespace) -> int:
+    import main as gui_main
+    gui_main.CacheSimulatorGUI().mainloop()
+    return 0
+
+# --- Parser ---
+
+def _add_trace_arguments(parser: argparse.ArgumentParser):
+    parser.add_argument("trace", help="trace file (din, lackey or binary)")
+    parser.add_argument("--format", choices=("din", "lackey", "bin"), help="trace format (detected by default)")
+    parser.add_argument("--limit", type=int, default=None, help="only use the first N references")
+    parser.add_argument("--output", choices=OUTPUTS, default="json", help="output format (json, or csv for sweep)")
+    parser.add_argument("--out", help="write to this file (default: stdout)")
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="python -m mylib", description="Headless cache simulator.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run = commands.add_parser("simulate", help="replay a trace through a hierarchy")
+    _add_trace_arguments(run)
+    run.add_argument("--config", help="hierarchy config (.json/.toml); default is the GUI's toy hierarchy")
+    run.add_argument("--engine", choices=("objects", "numpy"), help="override every level's engine")
+    run.add_argument("--warm", help="start from this checkpoint instead of --config")
+    run.add_argument("--save-checkpoint", help="write the final state to this checkpoint")
+    run.add_argument("--classify", action="store_true", help="split misses into compulsory/capacity/conflict")
+    run.add_argument("--sample-sets", type=int, default=0, metavar="RATIO",
+                     help="simulate one set in RATIO and report estimates with confidence intervals")
+    run.add_argument("--no-ifetch", action="store_true", help="drop instruction fetches")
+    run.add_argument("--result-cache", metavar="DIR",
+                     help="reuse results stored in DIR for an identical trace and config (see resultcache.py)")
+    run.set_defaults(handler=simulate)
+
+    grid = commands.add_parser("sweep", help="simulate a grid of configurations (see sweep.py)")
+    _add_trace_arguments(grid)
+    grid.add_argument("--grid", required=True, help='JSON/TOML file with "base" config and "grid" of parameter lists')
+    grid.add_argument("--workers", type=int, default=None, help="worker processes (default: all cores)")
+    grid.add_argument("--checkpoint", help="JSON-lines file used to resume an interrupted sweep")
+    grid.set_defaults(handler=sweep, output="csv")
+
+    curves = commands.add_parser("analyze", help="LRU miss-ratio curves from stack distances")
+    _add_trace_arguments(curves)
+    curves.add_argument("--block-size", type=int, default=64)
+    curves.add_argument("--sets", type=int, action="append", default=[],
+                        help="also compute per-associativity curves for this set count (repeatable)")
+    curves.set_defaults(handler=analyze)
+
+    window = commands.add_parser("gui", help="open the Tk simulator")
+    window.set_defaults(handler=gui)
+    return parser
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    if args.command == "simulate" and args.sample_sets:
+        # Only the sampled sets are simulated, so their state and per-set classification are partial.
+        for flag, value in (("--classify", args.classify), ("--save-checkpoint", args.save_checkpoint)):
+            if value:
+                parser.error(f"{flag} cannot be combined with --sample-sets")
+    if args.command == "simulate" and args.warm and args.result_cache:
+        # Stored results are keyed by trace and config, not by the warm state they started from.
+        parser.error("--result-cache cannot be combined with --warm")
+    return args.handler(args)
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,379 @@
+"""Multi-core hierarchies: private levels per core, shared levels, MESI coherence.
+
+Every core owns a non-inclusive MultiLevelCache of private levels (L1/L2 by
+default); all cores share a second MultiLevelCache (the LLC), which is
+non-inclusive of the private levels. A directory keeps, per line, the cores
+that may hold it and whether one of them holds it exclusively (E or M; the
+private dirty bit tells them apart), so coherence needs no broadcast.
+
+Coherence only matters for lines several cores touch. Each chunk is split
+accordingly: lines touched by a single core (and held by no other) run through
+that core's private hierarchy in batches on the fast path, while accesses to
+shared lines are processed one by one as coherence events. Before an event
+touches a core's caches, that core's earlier accesses are flushed, so the
+result is identical to simulating every access in order. Traffic leaving the
+private levels is replayed through the shared levels in time order at the end
+of the chunk.
+
+    system = MultiCoreCache(8)
+    coherence.replay(system, workloads.interleave([...], cores=True))
+    system.summary()["coherence"]
+"""
+import os
+from collections import Counter
+from itertools import repeat
+from operator import itemgetter
+from dataclasses import asdict, dataclass, fields
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+import mylib
+import traces
+
+# Per-core private levels and the shared LLC of the default system.
+DEFAULT_PRIVATE = (
+    {"name": "L1", "size": "32KiB", "associativity": 8, "hit_latency": 4},
+    {"name": "L2", "size": "256KiB", "associativity": 8, "hit_latency": 12},
+)
+DEFAULT_SHARED = (
+    {"name": "L3", "size": "8MiB", "associativity": 16, "hit_latency": 40},
+)
+
+# Shortest run of private accesses worth a batch call; shorter runs go access by access.
+BATCH_THRESHOLD = 32
+
+@dataclass
+class CoherenceStats:
+    accesses: int = 0
+    total_latency: int = 0
+    coherence_events: int = 0  # accesses handled on the per-access coherence path
+    invalidations: int = 0     # private copies invalidated by another core's write
+    coherence_misses: int = 0  # private misses on lines lost to an invalidation
+    upgrades: int = 0          # writes to a shared (S) copy
+    downgrades: int = 0        # exclusive copies demoted to S by another core's read
+    cache_to_cache: int = 0    # dirty lines supplied by another core
+
+    @property
+    def amat(self) -> float:
+        return self.total_latency / self.accesses if self.accesses else 0.0
+
+    def reset(self):
+        for field in fields(self):
+            setattr(self, field.name, 0)
+
+    def as_dict(self) -> Dict[str, int]:
+        return asdict(self)
+
+class MultiCoreCache:
+    def __init__(self, cores: int = 4, private: Sequence[Union[Mapping[str, Any], mylib.LevelConfig]] = DEFAULT_PRIVATE,
+                 shared: Sequence[Union[Mapping[str, Any], mylib.LevelConfig]] = DEFAULT_SHARED,
+                 memory_latency: int = mylib.DEFAULT_MEMORY_LATENCY, batch_threshold: int = BATCH_THRESHOLD):
+        if cores < 1:
+            raise ValueError(f"A multi-core system needs at least one core, got {cores}")
+        # Private levels see no memory latency of their own: misses continue into the shared levels.
+        self.cores = [mylib.MultiLevelCache(private, memory_latency=0) for _ in range(cores)]
+        self.shared = mylib.MultiLevelCache(shared, memory_latency=memory_latency)
+        if any(level.prefetcher is not None for level in self.cores[0].levels + self.shared.levels):
+            # Prefetch fills would bypass the directory.
+            raise ValueError("Prefetchers are not supported in multi-core systems")
+        block_sizes = {level.block_size for level in self.cores[0].levels + self.shared.levels}
+        if len(block_sizes) != 1:
+            raise ValueError(f"Coherence needs one block size across all levels, got {sorted(block_sizes)}")
+        self.line_size = block_sizes.pop()
+        self.batch_threshold = batch_threshold
+        self.stats = CoherenceStats()
+        # line -> (mask of cores that may hold it, held exclusively (E/M) by that one core);
+        # a line leaves the directory once no private level holds it any more.
+        self.directory: Dict[int, Tuple[int, bool]] = {}
+        # line -> mask of cores whose copy was invalidated and not yet re-fetched
+        self.invalidated: Dict[int, int] = {}
+        self.last_writer: Dict[int, int] = {}
+        # Ownership changes between cores per line (ping-pong).
+        self.ping_pong: Counter = Counter()
+        self._private_latency = self.cores[0]._latency
+        for private in self.cores:
+            private.memory_requests = []
+            private.evicted = []
+
+    @classmethod
+    def from_config(cls, source: Union[str, os.PathLike, Mapping[str, Any]]) -> "MultiCoreCache":
+        """Build from ``{"cores": N, "private": [...], "shared": [...], **level_defaults}``."""
+        config = mylib.load_config(source)
+        options = {key: config[key] for key in ("cores", "memory_latency", "batch_threshold") if key in config}
+        defaults = {key: value for key, value in config.items()
+                    if key not in ("private", "shared") and key not in options}
+        private = [mylib.LevelConfig.from_dict({"name": f"L{i + 1}", **level}, defaults)
+                   for i, level in enumerate(config.get("private", DEFAULT_PRIVATE))]
+        shared = [mylib.LevelConfig.from_dict({"name": f"L{len(private) + i + 1}", **level}, defaults)
+                  for i, level in enumerate(config.get("shared", DEFAULT_SHARED))]
+        return cls(private=private, shared=shared, **options)
+
+    # --- Simulation ---
+
+    def access_batch(self, cores, addresses, is_write: Union[bool, np.ndarray] = False,
+                     time: Union[int, np.ndarray] = 0) -> np.ndarray:
+        """Simulate a chunk of (core, address) accesses in order; returns a per-access hit mask.
+
+        Per-access ``time`` arrays must be strictly increasing.
+        """
+        levels = len(self.cores[0].levels) + len(self.shared.levels)
+        return self.serve_batch(cores, addresses, is_write, time) < levels
+
+    def serve_batch(self, cores, addresses, is_write: Union[bool, np.ndarray] = False,
+                    time: Union[int, np.ndarray] = 0) -> np.ndarray:
+        """Per access, the level that served it: private levels first, then shared, then memory."""
+        addresses, writes, times = mylib._batch_arguments(addresses, is_write, time)
+        cores = np.asarray(cores, dtype=np.int64)
+        if cores.size and cores.max() >= len(self.cores):
+            raise ValueError(f"Core id {int(cores.max())} out of range for {len(self.cores)} cores")
+        n = addresses.size
+        served = np.zeros(n, dtype=np.int64)
+        if n == 0:
+            return served
+        lines = addresses // self.line_size
+        coherent = self._coherent(cores, lines, writes)
+        order = np.argsort(cores, kind="stable")
+        bounds = np.r_[0, np.cumsum(np.bincount(cores, minlength=len(self.cores)))]
+        chunk = _Chunk(addresses, writes, times, served,
+                       [order[bounds[k]:bounds[k + 1]] for k in range(len(self.cores))])
+        writebacks: List[Tuple[int, int, int]] = []  # dirty data written back by downgrades
+        for position in np.flatnonzero(coherent).tolist():
+            self._coherence_event(chunk, position, int(cores[position]), int(lines[position]),
+                                  bool(writes[position]), writebacks)
+        for core in range(len(self.cores)):
+            self._flush(chunk, core, n)
+        self._serve_shared(chunk, writebacks)
+        self._prune()
+        private_levels = len(self.cores[0].levels)
+        shared_latency = self.shared._latency
+        latency = self._private_latency[np.minimum(served, private_levels)]
+        beyond = served >= private_levels
+        latency[beyond] += shared_latency[served[beyond] - private_levels]
+        self.stats.accesses += n
+        self.stats.total_latency += int(latency.sum())
+        return served
+
+    def _coherent(self, cores: np.ndarray, lines: np.ndarray, writes: np.ndarray) -> np.ndarray:
+        # Accesses to lines that need the coherence path: touched by several cores in
+        # this chunk, or possibly held by (or lost to) another core. The rest stay
+        # private to one core, whose directory entry is updated here directly.
+        unique, first, inverse = np.unique(lines, return_index=True, return_inverse=True)
+        owner = cores[first]
+        mixed = np.bincount(inverse, weights=cores != owner[inverse], minlength=unique.size) > 0
+        written = np.bincount(inverse, weights=writes, minlength=unique.size) > 0
+        single = np.flatnonzero(~mixed)
+        if single.size == 0:
+            return mixed[inverse]
+        directory, invalidated, last_writer = self.directory, self.invalidated, self.last_writer
+        candidates, core, write = unique[single], owner[single], written[single]
+        keys, owners = candidates.tolist(), core.tolist()
+        bits = np.left_shift(1, core)
+        entries = list(map(directory.get, keys, repeat((0, False))))
+        masks = np.fromiter(map(itemgetter(0), entries), dtype=np.int64, count=single.size)
+        exclusive = np.fromiter(map(itemgetter(1), entries), dtype=bool, count=single.size)
+        lost = np.fromiter(map(invalidated.__contains__, keys), dtype=bool, count=single.size)
+        writer = np.fromiter(map(last_writer.get, keys, owners), dtype=np.int64, count=single.size)
+        # A write to a line held in S (even by this core alone) is an upgrade.
+        conflict = (masks & ~bits != 0) | lost | (write & ((writer != core) | (masks != 0) & ~exclusive))
+        mixed[single[conflict]] = True
+        private = ~conflict
+        directory.update(zip(candidates[private].tolist(), zip(bits[private].tolist(), repeat(True))))
+        stored = private & write
+        last_writer.update(zip(candidates[stored].tolist(), core[stored].tolist()))
+        return mixed[inverse]
+
+    def _prune(self):
+        # Drop each core from the directory entries of lines it evicted and no
+        # longer holds anywhere; a line no core holds leaves the directory.
+        directory, last_writer = self.directory, self.last_writer
+        for core, private in enumerate(self.cores):
+            if not private.evicted:
+                continue
+            lines = np.unique(np.array(private.evicted, dtype=np.int64) // self.line_size)
+            private.evicted = []
+            gone = lines[~self._resident(core, lines * self.line_size)]
+            keys = gone.tolist()
+            masks = np.fromiter(map(itemgetter(0), map(directory.get, keys, repeat((0, False)))),
+                                dtype=np.int64, count=len(keys))
+            bit = 1 << core
+            listed = masks & bit != 0
+            remaining = masks & ~bit
+            emptied = gone[listed & (remaining == 0)].tolist()
+            for line in emptied:
+                del directory[line]
+                last_writer.pop(line, None)
+            shared = listed & (remaining != 0)
+            directory.update((line, (mask, directory[line][1]))
+                             for line, mask in zip(gone[shared].tolist(), remaining[shared].tolist()))
+
+    def _resident(self, core: int, addresses: np.ndarray) -> np.ndarray:
+        """Per address, whether any private level of ``core`` holds its line."""
+        held = np.zeros(addresses.size, dtype=bool)
+        for level in self.cores[core].levels:
+            if level.engine == "numpy":
+                index, tag = level.decode_batch(addresses)
+                held |= ((level.tags[index] == tag[:, None]) & level.valid[index]).any(axis=1)
+            else:
+                held |= np.fromiter((level.peek(address)[0] for address in addresses.tolist()),
+                                    dtype=bool, count=addresses.size)
+        return held
+
+    def _flush(self, chunk: "_Chunk", core: int, end: int):
+        """Run the core's accesses before position ``end`` through its private levels."""
+        positions = chunk.positions[core]
+        start = chunk.cursors[core]
+        stop = start + int(np.searchsorted(positions[start:], end))
+        if stop == start:
+            return
+        chunk.cursors[core] = stop
+        segment = positions[start:stop]
+        private = self.cores[core]
+        if segment.size >= self.batch_threshold:
+            chunk.served[segment] = private.serve_batch(chunk.addresses[segment], chunk.writes[segment],
+                                                        chunk.times[segment])
+        else:
+            served, addresses, writes, times = chunk.served, chunk.addresses, chunk.writes, chunk.times
+            for position in segment.tolist():
+                served[position] = private._access(int(addresses[position]), int(times[position]),
+                                                   bool(writes[position]))
+
+    def _holds(self, core: int, address: int) -> Tuple[bool, bool]:
+        present = dirty = False
+        for level in self.cores[core].levels:
+            level_present, level_dirty = level.peek(address)
+            present |= level_present
+            dirty |= level_dirty
+        return present, dirty
+
+    def _coherence_event(self, chunk: "_Chunk", position: int, core: int, line: int, is_write: bool,
+                         writebacks: List[Tuple[int, int, int]]):
+        # Decide the MESI transitions of one access to a shared line. The access
+        # itself stays queued for the core's next flush; only the other cores'
+        # copies are changed here, after flushing them up to this point.
+        stats = self.stats
+        stats.coherence_events += 1
+        address = line * self.line_size
+        time = int(chunk.times[position])
+        bit = 1 << core
+        self._flush(chunk, core, position)
+        present, _ = self._holds(core, address)
+        if present and not is_write:
+            return
+        entry = self.directory.get(line)
+        mask, exclusive = entry if entry is not None else (0, False)
+        if not present:
+            lost = self.invalidated.get(line, 0)
+            if lost & bit:
+                stats.coherence_misses += 1
+                lost &= ~bit
+                if lost:
+                    self.invalidated[line] = lost
+                else:
+                    del self.invalidated[line]
+        others = 0
+        for other in range(len(self.cores)):
+            if other == core or not mask >> other & 1:
+                continue
+            self._flush(chunk, other, position)
+            if is_write:
+                copies = [level.invalidate(address) for level in self.cores[other].levels]
+                if any(held for held, _ in copies):
+                    stats.invalidations += 1
+                    self.invalidated[line] = self.invalidated.get(line, 0) | 1 << other
+                    stats.cache_to_cache += any(dirty for _, dirty in copies)
+            else:
+                held, _ = self._holds(other, address)
+                if not held:
+                    continue  # stale directory entry
+                others |= 1 << other
+                if exclusive:
+                    stats.downgrades += 1
+                    if any([level.clean(address) for level in self.cores[other].levels]):
+                        stats.cache_to_cache += 1
+                        writebacks.append((mylib.OP_WRITEBACK, address, time))
+        if is_write:
+            if present and not (exclusive and mask == bit):
+                stats.upgrades += 1
+            previous = self.last_writer.get(line)
+            if previous is not None and previous != core:
+                self.ping_pong[line] += 1
+            self.last_writer[line] = core
+            self.directory[line] = (bit, True)
+        elif not present:
+            self.directory[line] = (others | bit, not others)
+
+    def _serve_shared(self, chunk: "_Chunk", writebacks: List[Tuple[int, int, int]]):
+        # Everything that left the private levels, in time order, through the shared levels.
+        requests = list(writebacks)
+        for private in self.cores:
+            requests.extend(private.memory_requests)
+            private.memory_requests = []
+        if not requests:
+            return
+        ops, addresses, times = np.array(requests, dtype=np.int64).T
+        order = np.argsort(times, kind="stable")
+        ops, addresses, times = ops[order], addresses[order], times[order]
+        shared_served = self.shared._serve_batch_streamed(addresses, ops.astype(np.int8), times)
+        # One demand per access that missed every private level; writebacks serve nobody.
+        demand = ops != mylib.OP_WRITEBACK
+        positions = np.searchsorted(chunk.times, times[demand])
+        private_levels = len(self.cores[0].levels)
+        missed = chunk.served[positions] == private_levels
+        chunk.served[positions[missed]] = private_levels + shared_served[demand][missed]
+
+    # --- Reporting ---
+
+    def top_ping_pong(self, count: int = 10) -> List[Tuple[int, int]]:
+        """(line address, ownership changes) of the most contended lines."""
+        return [(line * self.line_size, changes) for line, changes in self.ping_pong.most_common(count)]
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "accesses": self.stats.accesses,
+            "amat": self.stats.amat,
+            "coherence": self.stats.as_dict(),
+            "ping_pong": self.top_ping_pong(),
+            "cores": [private.summary()["levels"] for private in self.cores],
+            "shared": self.shared.summary()["levels"],
+        }
+
+    def reset_stats(self):
+        self.stats.reset()
+        self.ping_pong.clear()
+        for private in self.cores:
+            private.reset_stats()
+        self.shared.reset_stats()
+
+class _Chunk:
+    """Per-chunk arrays and, per core, its access positions and how many have been simulated."""
+    __slots__ = ("addresses", "writes", "times", "served", "positions", "cursors")
+
+    def __init__(self, addresses: np.ndarray, writes: np.ndarray, times: np.ndarray, served: np.ndarray,
+                 positions: List[np.ndarray]):
+        self.addresses = addresses
+        self.writes = writes
+        self.times = times
+        self.served = served
+        self.positions = positions
+        self.cursors = [0] * len(positions)
+
+def replay(system: MultiCoreCache, chunks: Iterable[np.ndarray], time: int = 0,
+           include_ifetch: bool = True) -> traces.ReplayResult:
+    """traces.replay for CORE_TRACE_DTYPE chunks."""
+    result = traces.ReplayResult(end_time=time)
+    for chunk in chunks:
+        cores, ops, addrs = chunk["core"], chunk["op"], chunk["addr"]
+        if not include_ifetch:
+            keep = ops != traces.OP_IFETCH
+            cores, ops, addrs = cores[keep], ops[keep], addrs[keep]
+        writes = ops == traces.OP_WRITE
+        n = addrs.shape[0]
+        hits = system.access_batch(cores, addrs.astype(np.int64), writes, result.end_time)
+        nwrites = int(np.count_nonzero(writes))
+        result.accesses += n
+        result.writes += nwrites
+        result.reads += n - nwrites
+        result.hits += int(np.count_nonzero(hits))
+        result.end_time += n
+    return result
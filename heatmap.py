@@ -0,0 +1,262 @@
+"""Heatmap view of a cache level for the GUI.
+
+A level is drawn as one image with a cell per block: sets are laid out
+row-major, several sets per image row so large caches stay roughly square.
+Colors are computed with NumPy from the block arrays (Cache.get_state layout),
+the visible part is scaled to the zoom level and handed to Tk as a single PPM
+image, so a redraw costs one image blit whatever the cache size.
+"""
+import math
+import tkinter as tk
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+MODES = ("state", "recency", "access count")
+
+INVALID_COLOR = (245, 245, 245)
+CLEAN_COLOR = (110, 190, 120)
+DIRTY_COLOR = (220, 80, 80)
+PREFETCHED_COLOR = (90, 140, 220)  # prefetched, not yet used
+GRID_COLOR = (200, 200, 200)
+# Dark blue (old / rarely used) to yellow (recent / hot).
+RAMP = np.array([(48, 18, 59), (33, 145, 140), (253, 231, 37)], dtype=np.float64)
+
+MIN_CELL, MAX_CELL = 1, 64
+# State arrays the colors are computed from.
+BLOCK_ARRAYS = ("valid", "dirty", "prefetched", "last_used_time", "access_count")
+
+def _ramp(values: np.ndarray) -> np.ndarray:
+    stops = np.linspace(0, 1, len(RAMP))
+    return np.stack([np.interp(values, stops, RAMP[:, c]) for c in range(3)], axis=-1).astype(np.uint8)
+
+def _block_values(state: Dict[str, np.ndarray], mode: str) -> np.ndarray:
+    valid = state["valid"]
+    if mode == "recency":
+        return state["last_used_time"][valid].astype(np.float64)
+    if mode == "access count":
+        return np.log1p(state["access_count"][valid].astype(np.float64))
+    raise ValueError(f"Unknown heatmap mode {mode!r}, expected one of {MODES}")
+
+def value_range(state: Dict[str, np.ndarray], mode: str) -> Optional[Tuple[float, float]]:
+    """(low, high) the ramp of ``mode`` spans over the valid blocks; None for "state" or no blocks."""
+    if mode == "state":
+        return None
+    values = _block_values(state, mode)
+    return (float(values.min()), float(values.max())) if values.size else None
+
+def block_colors(state: Dict[str, np.ndarray], mode: str = "state",
+                 span: Optional[Tuple[float, float]] = None) -> np.ndarray:
+    """(num_sets, associativity, 3) RGB colors of every block.
+
+    ``span`` fixes the ramp's range, so a subset of sets is colored like the whole level.
+    """
+    valid, dirty = state["valid"], state["dirty"]
+    colors = np.empty(valid.shape + (3,), dtype=np.uint8)
+    colors[:] = INVALID_COLOR
+    if mode == "state":
+        colors[valid] = CLEAN_COLOR
+        colors[valid & state["prefetched"]] = PREFETCHED_COLOR
+        colors[valid & dirty] = DIRTY_COLOR
+        return colors
+    values = _block_values(state, mode)
+    if values.size:
+        low, high = span or (values.min(), values.max())
+        colors[valid] = _ramp((values - low) / (high - low) if high > low else np.ones_like(values))
+    return colors
+
+def grid_shape(num_sets: int, associativity: int) -> Tuple[int, int]:
+    """(sets per image row, image rows) for a roughly square layout."""
+    per_row = max(1, round(math.sqrt(num_sets / associativity)))
+    return per_row, -(-num_sets // per_row)
+
+def block_grid(colors: np.ndarray, per_row: int) -> np.ndarray:
+    """Lay (sets, ways, 3) colors out as an (rows, per_row * ways, 3) image, padding the last row."""
+    num_sets, ways = colors.shape[:2]
+    rows = -(-num_sets // per_row)
+    padded = np.empty((rows * per_row, ways, 3), dtype=np.uint8)
+    padded[:num_sets] = colors
+    padded[num_sets:] = GRID_COLOR
+    return padded.reshape(rows, per_row, ways, 3).reshape(rows, per_row * ways, 3)
+
+def to_ppm(image: np.ndarray) -> bytes:
+    height, width = image.shape[:2]
+    return b"P6 %d %d 255\n" % (width, height) + np.ascontiguousarray(image).tobytes()
+
+class CacheHeatmap(tk.Canvas):
+    """Zoomable (wheel), pannable (drag) heatmap of one level with a hover tooltip."""
+
+    def __init__(self, parent, num_sets: int, associativity: int, block_size: int, **kwargs):
+        super().__init__(parent, bg="white", highlightthickness=0, **kwargs)
+        self.num_sets = num_sets
+        self.associativity = associativity
+        self.block_size = block_size
+        self.per_row, self.rows = grid_shape(num_sets, associativity)
+        self.cols = self.per_row * associativity
+        self.mode = "state"
+        self.cell = 0  # pixels per block; 0 until fitted to the canvas
+        self.origin = [0.0, 0.0]  # top-left visible cell (column, row)
+        self.state: Optional[Dict[str, np.ndarray]] = None
+        self.highlights: List[Tuple[int, Optional[int], str]] = []
+        self._grid: Optional[np.ndarray] = None
+        self._span: Optional[Tuple[float, float]] = None  # ramp range the grid was colored with
+        self._photo: Optional[tk.PhotoImage] = None
+        self._image_item = self.create_image(0, 0, anchor="nw")
+        self._drag: Optional[Tuple[int, int]] = None
+        self.bind("<Configure>", self._resize)
+        self.bind("<ButtonPress-1>", self._start_drag)
+        self.bind("<B1-Motion>", self._drag_to)
+        self.bind("<MouseWheel>", lambda e: self._zoom(e, e.delta > 0))
+        self.bind("<Button-4>", lambda e: self._zoom(e, True))
+        self.bind("<Button-5>", lambda e: self._zoom(e, False))
+        self.bind("<Motion>", self._hover)
+        self.bind("<Leave>", lambda e: self.delete("tooltip"))
+
+    # --- Drawing ---
+
+    def update_state(self, state: Dict[str, np.ndarray]):
+        """Recolor from block arrays and redraw."""
+        self.state = state
+        self._span = value_range(state, self.mode)
+        self._grid = block_grid(block_colors(state, self.mode, self._span), self.per_row)
+        self.redraw()
+
+    def update_sets(self, indices: np.ndarray, state: Dict[str, np.ndarray]):
+        """Recolor only the sets in ``indices`` and redraw.
+
+        If the ramp's range moved (recency and access-count modes), every block changes color
+        and the whole level is recolored.
+        """
+        span = value_range(state, self.mode)
+        if self._grid is None or span != self._span:
+            self.update_state(state)
+            return
+        self.state = state
+        indices = np.asarray(indices, dtype=np.int64)
+        rows, positions = np.divmod(indices, self.per_row)
+        subset = {name: state[name][indices] for name in BLOCK_ARRAYS}
+        blocks = self._grid.reshape(self.rows, self.per_row, self.associativity, 3)
+        blocks[rows, positions] = block_colors(subset, self.mode, span)
+        self.redraw()
+
+    def set_mode(self, mode: str):
+        self.mode = mode
+        if self.state is not None:
+            self.update_state(self.state)
+
+    def redraw(self):
+        width, height = self.winfo_width(), self.winfo_height()
+        if self._grid is None or width < 2 or height < 2:
+            return
+        if not self.cell:
+            self.cell = max(MIN_CELL, min(MAX_CELL, width // self.cols, height // self.rows))
+        cell = self.cell
+        col0, row0 = int(self.origin[0]), int(self.origin[1])
+        view = self._grid[row0:row0 + height // cell + 1, col0:col0 + width // cell + 1]
+        image = view.repeat(cell, axis=0).repeat(cell, axis=1)
+        if cell >= 4:
+            image[cell - 1::cell] = GRID_COLOR
+            image[:, cell - 1::cell] = GRID_COLOR
+        self._photo = tk.PhotoImage(master=self, data=to_ppm(image[:height, :width]), format="PPM")
+        self.itemconfig(self._image_item, image=self._photo)
+        self._draw_highlights()
+
+    def _draw_highlights(self):
+        self.delete("highlight")
+        for index, way, color in self.highlights:
+            ways = range(self.associativity) if way is None else (way,)
+            for w in ways:
+                x, y = self._cell_origin(index, w)
+                self.create_rectangle(x, y, x + self.cell, y + self.cell, fill=color, stipple="gray50",
+                                      outline=color, width=2, tags="highlight")
+
+    def highlight(self, index: int, way: Optional[int], color: str):
+        """Overlay a set (way=None) or one block with ``color``."""
+        self.highlights.append((index, way, color))
+        self._draw_highlights()
+
+    def clear_highlights(self):
+        self.highlights.clear()
+        self.delete("highlight")
+
+    # --- Geometry ---
+
+    def _cell_origin(self, index: int, way: int) -> Tuple[float, float]:
+        row, position = divmod(index, self.per_row)
+        col = position * self.associativity + way
+        return (col - int(self.origin[0])) * self.cell, (row - int(self.origin[1])) * self.cell
+
+    def block_at(self, x: int, y: int) -> Optional[Tuple[int, int]]:
+        """(set, way) under canvas pixel (x, y), or None."""
+        if not self.cell:
+            return None
+        col = int(self.origin[0]) + x // self.cell
+        row = int(self.origin[1]) + y // self.cell
+        if not (0 <= col < self.cols and 0 <= row < self.rows):
+            return None
+        position, way = divmod(col, self.associativity)
+        index = row * self.per_row + position
+        return (index, way) if index < self.num_sets else None
+
+    def _clamp_origin(self):
+        visible_cols = self.winfo_width() / self.cell
+        visible_rows = self.winfo_height() / self.cell
+        self.origin[0] = min(max(self.origin[0], 0.0), max(self.cols - visible_cols, 0.0))
+        self.origin[1] = min(max(self.origin[1], 0.0), max(self.rows - visible_rows, 0.0))
+
+    # --- Interaction ---
+
+    def _resize(self, event):
+        # Fit the whole level to the new size again.
+        self.cell = 0
+        self.origin = [0.0, 0.0]
+        self.redraw()
+
+    def _start_drag(self, event):
+        self._drag = (event.x, event.y)
+
+    def _drag_to(self, event):
+        if self._drag is None or not self.cell:
+            return
+        self.origin[0] -= (event.x - self._drag[0]) / self.cell
+        self.origin[1] -= (event.y - self._drag[1]) / self.cell
+        self._drag = (event.x, event.y)
+        self._clamp_origin()
+        self.redraw()
+
+    def _zoom(self, event, zoom_in: bool):
+        if not self.cell:
+            return
+        cell = min(self.cell * 2, MAX_CELL) if zoom_in else max(self.cell // 2, MIN_CELL)
+        if cell == self.cell:
+            return
+        # Keep the block under the cursor in place.
+        self.origin[0] += event.x / self.cell - event.x / cell
+        self.origin[1] += event.y / self.cell - event.y / cell
+        self.cell = cell
+        self._clamp_origin()
+        self.redraw()
+
+    def _hover(self, event):
+        self.delete("tooltip")
+        block = self.block_at(event.x, event.y)
+        if block is None or self.state is None:
+            return
+        index, way = block
+        state = self.state
+        if state["valid"][index, way]:
+            tag = int(state["tags"][index, way])
+            # Same decoding as the block labels: (tag * num_sets + index) * block_size
+            address = (tag * self.num_sets + index) * self.block_size
+            text = (f"Set {index} Way {way}\nAddr: {address}\nTag: {tag}\n"
+                    f"{'Dirty' if state['dirty'][index, way] else 'Clean'}"
+                    f"{' (prefetched)' if state['prefetched'][index, way] else ''}, "
+                    f"{int(state['access_count'][index, way])} hits\n"
+                    f"Last used: {int(state['last_used_time'][index, way])}")
+        else:
+            text = f"Set {index} Way {way}\nInvalid"
+        x = event.x + 12 if event.x < self.winfo_width() / 2 else event.x - 12
+        anchor = "nw" if event.x < self.winfo_width() / 2 else "ne"
+        label = self.create_text(x, event.y + 12, text=text, anchor=anchor, font=("Arial", 9), tags="tooltip")
+        self.create_rectangle(self.bbox(label), fill="#ffffe0", outline="black", tags="tooltip")
+        self.tag_raise(label)
@@ -1,8 +1,18 @@
+import os
+import queue
 import tkinter as tk
-from tkinter import ttk, scrolledtext
-from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
-import matplotlib.pyplot as plt
+from collections import deque
+from tkinter import filedialog, ttk, scrolledtext
+import numpy as np
+import heatmap
 import mylib
+import playback
+import traces
+
+LOG_LINES = 20  # messages kept in the log panel
+GRAPH_X_MARGIN = 2.0  # x axis grows by this factor when the plot runs off the right edge
+FRAME_MS = 33  # playback updates are drawn at ~30 frames per second
+PLAYBACK_SPEEDS = {"1K/s": 1e3, "10K/s": 1e4, "100K/s": 1e5, "1M/s": 1e6, "Max": None}
 
 class CacheSimulatorGUI(tk.Tk):
     def __init__(self):
@@ -12,15 +22,25 @@ class CacheSimulatorGUI(tk.Tk):
         
         # Initialize C++ cache (backend)
         self.cache = mylib.MultiLevelCache()
+        self.cache.track_changes()
         self.time_counter = 0
         self.current_page = None
         
         # Data containers
-        self.cache_entries = {"L1": [], "L2": [], "L3": []}
-        self.time_points = []
-        self.hit_ratios_read = []
-        self.hit_ratios_write = []
-        self.log_messages = []
+        self.level_names = [level.name for level in self.cache.levels]
+        self.heatmaps = {}
+        # Copy of every level's block arrays; the display only reads this, never the live cache,
+        # so a playback thread can keep simulating while the UI draws.
+        self.block_state = playback.snapshot(self.cache)
+        self.stale_sets = {name: set() for name in self.level_names}
+        self.player = None
+        self.playback_updates = queue.Queue()
+        self.poll_id = None  # pending poll_playback callback, so only one chain runs
+        self.read_times, self.hit_ratios_read = [], []
+        self.write_times, self.hit_ratios_write = [], []
+        # Ring buffer of recent messages plus the ones not yet shown in the log panel
+        self.log_messages = deque(maxlen=LOG_LINES)
+        self.pending_log = deque(maxlen=LOG_LINES)
         
         # Setup GUI
         self.setup_gui()
@@ -35,7 +55,7 @@ class CacheSimulatorGUI(tk.Tk):
         self.dropdown = ttk.Combobox(
             self.menu_frame, 
             textvariable=self.selected_option,
-            values=["Simple Read/Write", "Memory Tracking"],
+            values=["Simple Read/Write", "Memory Tracking", "Trace Playback"],
             state="readonly"
         )
         self.dropdown.pack(side=tk.RIGHT, padx=20)
@@ -49,6 +69,7 @@ class CacheSimulatorGUI(tk.Tk):
 
     def switch_page(self, page_name):
         # Clear current page
+        self.heatmaps.clear()
         for widget in self.main_frame.winfo_children():
             widget.destroy()
         
@@ -57,6 +78,8 @@ class CacheSimulatorGUI(tk.Tk):
             self.simple_read_write_page()
         elif page_name == "Memory Tracking":
             self.memory_tracking_page()
+        elif page_name == "Trace Playback":
+            self.trace_playback_page()
 
     def simple_read_write_page(self):
         frame = tk.Frame(self.main_frame)
@@ -71,11 +94,24 @@ class CacheSimulatorGUI(tk.Tk):
         right_frame.pack(side="left", padx=30, pady=20)
         right_frame.pack_propagate(False)
         
-        # Graph setup
+        # Graph setup: the lines are animated and blitted over a cached background.
+        # matplotlib is imported here so startup doesn't pay for it until the graph is shown.
+        import matplotlib.pyplot as plt
+        from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
         self.fig, self.ax = plt.subplots(figsize=(3.5, 3.5))
+        self.ax.set_title("Hit Ratio Over Time")
+        self.ax.set_xlabel("Operations")
+        self.ax.set_ylabel("Hit Ratio")
+        self.ax.set_ylim(0, 1.05)
+        self.ax.set_xlim(0, max(10, self.time_counter * GRAPH_X_MARGIN))
+        self.read_line, = self.ax.plot(self.read_times, self.hit_ratios_read, label='Reads', color='blue', animated=True)
+        self.write_line, = self.ax.plot(self.write_times, self.hit_ratios_write, label='Writes', color='green', animated=True)
+        self.ax.legend(loc="lower right")
+        self.graph_background = None
         self.canvas = FigureCanvasTkAgg(self.fig, master=right_frame)
+        self.canvas.mpl_connect("draw_event", self.on_graph_draw)
         self.canvas.get_tk_widget().pack(fill="both", expand=True)
-        self.update_graph()
+        self.canvas.draw()
         
         # Input components
         self.build_input_layout(left_frame)
@@ -109,7 +145,7 @@ class CacheSimulatorGUI(tk.Tk):
                  font=button_font, width=12).grid(row=4, column=0, columnspan=3, pady=10, sticky="w")
         self.log_output = scrolledtext.ScrolledText(parent, width=70, height=18, font=("Arial", 12))
         self.log_output.grid(row=5, column=0, columnspan=5, pady=20, sticky="w")
-        self.update_log_output()
+        self.update_log_output(full=True)
 
     def memory_tracking_page(self):
         frame = tk.Frame(self.main_frame)
@@ -124,20 +160,47 @@ class CacheSimulatorGUI(tk.Tk):
         self.search_entry.pack(side='left', padx=5)
         self.search_entry.bind("<Return>", lambda e: self.start_cache_search())
         ttk.Button(control_frame, text="Search Address", command=self.start_cache_search).pack(side='left', padx=5)
+        tk.Label(control_frame, text="Color by:", font=('Arial', 12)).pack(side='left', padx=(20, 5))
+        self.heatmap_mode = tk.StringVar(value="state")
+        mode_box = ttk.Combobox(control_frame, textvariable=self.heatmap_mode, values=list(heatmap.MODES),
+                                state="readonly", width=12)
+        mode_box.pack(side='left')
+        mode_box.bind("<<ComboboxSelected>>", lambda e: self.set_heatmap_mode(self.heatmap_mode.get()))
+        tk.Label(control_frame, text="Wheel to zoom, drag to pan", font=('Arial', 10)).pack(side='left', padx=20)
         
         # Cache visualization
         self.create_cache_visualization(frame)
-        self.refresh_cache_display()
+        self.refresh_cache_display(full=True)
 
-    def create_cache_visualization(self, parent):
-        # Clear existing entries
-        for level in self.cache_entries.values():
-            level.clear()
+    def trace_playback_page(self):
+        frame = tk.Frame(self.main_frame)
+        frame.pack(expand=True, fill='both', padx=20, pady=20)
         
+        # Transport controls
+        control_frame = tk.Frame(frame)
+        control_frame.pack(fill='x', pady=10)
+        ttk.Button(control_frame, text="Open Trace...", command=self.open_trace).pack(side='left', padx=5)
+        self.play_button = ttk.Button(control_frame, text="Pause" if self.player and self.player.playing else "Play",
+                                      command=self.toggle_playback)
+        self.play_button.pack(side='left', padx=5)
+        ttk.Button(control_frame, text="Step", command=self.step_playback).pack(side='left', padx=5)
+        ttk.Button(control_frame, text="Stop", command=self.stop_playback).pack(side='left', padx=5)
+        tk.Label(control_frame, text="Speed:", font=('Arial', 12)).pack(side='left', padx=(20, 5))
+        self.speed_option = tk.StringVar(value="Max")
+        speed_box = ttk.Combobox(control_frame, textvariable=self.speed_option, values=list(PLAYBACK_SPEEDS),
+                                 state="readonly", width=8)
+        speed_box.pack(side='left')
+        speed_box.bind("<<ComboboxSelected>>", lambda e: self.player and self.player.set_speed(self.playback_speed()))
+        
+        # Progress and metrics
+        self.playback_status = tk.Label(frame, text="No trace loaded", font=('Courier', 12), justify='left', anchor='w')
+        self.playback_status.pack(fill='x', pady=10)
+
+    def create_cache_visualization(self, parent):
         cache_container = tk.Frame(parent)
         cache_container.pack(expand=True, fill='both')
         
-        for level in ["L1", "L2", "L3"]:
+        for level in self.level_names:
             cache = getattr(self.cache, level)
             level_frame = tk.Frame(cache_container, bd=2, relief='groove')
             level_frame.pack(side='left', expand=True, fill='both', padx=5)
@@ -146,17 +209,11 @@ class CacheSimulatorGUI(tk.Tk):
             header = f"{level} Cache\n{cache.num_sets} Sets × {cache.associativity}-Way"
             tk.Label(level_frame, text=header, font=('Arial', 10, 'bold')).pack(pady=5)
             
-            # Create sets
-            for set_idx in range(cache.num_sets):
-                set_frame = tk.Frame(level_frame, bd=1, relief='ridge')
-                set_frame.pack(fill='x', padx=2, pady=2)
-                tk.Label(set_frame, text=f"Set {set_idx}", width=6).pack(side='left')
-                
-                # Create blocks
-                for _ in range(cache.associativity):
-                    block = tk.Label(set_frame, width=15, height=3, relief='ridge', bg="white", font=('Arial', 9), anchor='center')
-                    block.pack(side='left', padx=2)
-                    self.cache_entries[level].append(block)
+            # One heatmap image per level, a cell per block
+            view = heatmap.CacheHeatmap(level_frame, cache.num_sets, cache.associativity, cache.block_size)
+            view.mode = self.heatmap_mode.get()
+            view.pack(expand=True, fill='both', padx=2, pady=2)
+            self.heatmaps[level] = view
         
         # RAM visualization
         self.ram_frame = tk.Frame(parent, height=50, bg='lightgray', bd=1, relief='sunken')
@@ -167,7 +224,9 @@ class CacheSimulatorGUI(tk.Tk):
     def write_memory(self):
         address = self.write_address_entry.get()
         value = self.write_value_entry.get()
-        if address and value:
+        if self.player is not None:
+            self.log("Stop trace playback first")
+        elif address and value:
             try:
                 self.time_counter += 1
                 addr = int(address)
@@ -176,55 +235,58 @@ class CacheSimulatorGUI(tk.Tk):
                 result = self.cache.write_memory(
                     addr, 
                     self.time_counter,
-                    lambda msg: self.log_messages.append(f"WRITE: {msg}")
+                    lambda msg: self.log(f"WRITE: {msg}")
                     )
                 
                 # Update metrics
                 total = self.cache.getTotalHits() + self.cache.getTotalMisses()
                 if total > 0:
                     self.hit_ratios_write.append(self.cache.getTotalHits() / total)
-                    self.time_points.append(self.time_counter)
+                    self.write_times.append(self.time_counter)
                     self.update_graph()
                 
                 self.refresh_cache_display()
                 
             except ValueError:
-                self.log_messages.append("Invalid address/value")
+                self.log("Invalid address/value")
         else:
-            self.log_messages.append("Missing address/value")
+            self.log("Missing address/value")
         self.update_log_output()
         self.write_address_entry.delete(0, tk.END)
         self.write_value_entry.delete(0, tk.END)
 
     def read_memory(self):
         address = self.read_address_entry.get()
-        if address:
+        if self.player is not None:
+            self.log("Stop trace playback first")
+        elif address:
             try:
                 self.time_counter += 1
                 addr = int(address)
-                result = self.cache.accessMemory(addr, self.time_counter,
-                           lambda msg: self.log_messages.append(msg))
+                result = self.cache.accessMemory(addr, self.time_counter, self.log)
                 
                 # Update metrics
                 total = self.cache.getTotalHits() + self.cache.getTotalMisses()
                 if total > 0:
                     self.hit_ratios_read.append(self.cache.getTotalHits() / total)
-                    self.time_points.append(self.time_counter)
+                    self.read_times.append(self.time_counter)
                     self.update_graph()
                 
                 self.refresh_cache_display()
                 
             except ValueError:
-                self.log_messages.append("Invalid address")
+                self.log("Invalid address")
         else:
-            self.log_messages.append("Missing address")
+            self.log("Missing address")
         self.update_log_output()
         self.read_address_entry.delete(0, tk.END)
 
     # Animated cache search routines
     def start_cache_search(self):
         address = self.search_entry.get()
-        if address:
+        if self.player is not None:
+            self.log("Stop trace playback first")
+        elif address:
             self.animate_cache_search(address)
             self.search_entry.delete(0, tk.END)
 
@@ -234,12 +296,12 @@ class CacheSimulatorGUI(tk.Tk):
             self.reset_cache_colors()
             self.time_counter += 1
             self.search_level = 0
-            self.levels = ["L1", "L2", "L3"]
+            self.levels = self.level_names
             self.search_address = addr
             self.found = False
             self.search_next_level()
         except ValueError:
-            self.log_messages.append(f"Invalid address: {address}")
+            self.log(f"Invalid address: {address}")
             self.update_log_output()
 
     def search_next_level(self):
@@ -254,8 +316,7 @@ class CacheSimulatorGUI(tk.Tk):
         tag = mylib.getTag(self.search_address, cache.block_size, cache.num_sets)
         
         # Highlight current set
-        set_blocks = self.get_set_blocks(level, index, cache.associativity)
-        self.highlight_set(set_blocks, "#fff3cd")
+        self.highlight(level, index, None, "#fff3cd")
         
         # Check for hit
         hit_index = -1
@@ -264,28 +325,27 @@ class CacheSimulatorGUI(tk.Tk):
                 hit_index = i
                 break
         
-        self.after(800, lambda: self.process_hit_miss(level, index, hit_index, set_blocks))
+        self.after(800, lambda: self.process_hit_miss(level, index, hit_index))
 
-    def process_hit_miss(self, level, index, hit_index, set_blocks):
+    def process_hit_miss(self, level, index, hit_index):
         if hit_index != -1:
-            self.handle_hit(level, index, hit_index, set_blocks)
+            self.handle_hit(level, index, hit_index)
         else:
-            self.handle_miss(level, index, set_blocks)
-
-    def handle_hit(self, level, index, hit_index, set_blocks):
-        set_blocks[hit_index].config(bg="#d4edda")
-        for i, block in enumerate(set_blocks):
-            if i != hit_index:
-                block.config(bg="#f0f0f0")
-        self.log_messages.append(f"{level} HIT: Set {index} Block {hit_index}")
+            self.handle_miss(level, index)
+
+    def handle_hit(self, level, index, hit_index):
+        self.reset_cache_colors()
+        self.highlight(level, index, None, "#f0f0f0")
+        self.highlight(level, index, hit_index, "#d4edda")
+        self.log(f"{level} HIT: Set {index} Block {hit_index}")
         self.update_log_output()
         self.found = True
         self.after(1000, self.reset_cache_colors)
 
-    def handle_miss(self, level, index, set_blocks):
-        for block in set_blocks:
-            block.config(bg="#f8d7da")
-        self.log_messages.append(f"{level} MISS: Set {index}")
+    def handle_miss(self, level, index):
+        self.reset_cache_colors()
+        self.highlight(level, index, None, "#f8d7da")
+        self.log(f"{level} MISS: Set {index}")
         self.update_log_output()
         self.search_level += 1
         self.after(1000, self.continue_search)
@@ -296,31 +356,19 @@ class CacheSimulatorGUI(tk.Tk):
 
     def animate_ram_access(self):
         self.ram_frame.config(bg="#ffd700")
-        self.log_messages.append(f"RAM ACCESS: {self.search_address}")
+        self.log(f"RAM ACCESS: {self.search_address}")
         self.update_log_output()
     
-        # Update all cache levels in reverse order (from L3 up to L1)
+        # Update all cache levels in reverse order (from the last level up to L1)
         for level in reversed(self.levels):
             cache = getattr(self.cache, level)
             index = mylib.getIndex(self.search_address, cache.block_size, cache.num_sets)
             tag = mylib.getTag(self.search_address, cache.block_size, cache.num_sets)
         
-            # Find and replace LRU block in the cache set
-            lru_index = min(range(cache.associativity), 
-                        key=lambda i: cache.sets[index].blocks[i].lastUsedTime)
-            cache.sets[index].blocks[lru_index].tag = tag
-            cache.sets[index].blocks[lru_index].valid = True
-            cache.sets[index].blocks[lru_index].lastUsedTime = self.time_counter
-        
-            # Compute the full address based on the formula:
-            computed_address = (tag * cache.num_sets + index) * cache.block_size
-        
-            # Prepare the display text with address, tag, and index
-            display_text = f"Addr: {computed_address}\nTag: {tag}\nIdx: {index}"
-        
-            # Update GUI for this level using Label's config
-            set_blocks = self.get_set_blocks(level, index, cache.associativity)
-            set_blocks[lru_index].config(text=display_text, bg="#d4edda")
+            # Fill the block chosen by the level's replacement policy
+            lru_index = cache.replace(index, tag, self.time_counter)
+            self.highlight(level, index, lru_index, "#d4edda")
+        self.refresh_cache_display()
     
         # Reset colors after animations
         self.after(1500, self.continue_ram_animation)
@@ -331,65 +379,166 @@ class CacheSimulatorGUI(tk.Tk):
         self.reset_cache_colors()
 
     # Helper methods
-    def get_set_blocks(self, level, index, associativity):
-        start = index * associativity
-        return self.cache_entries[level][start:start+associativity]
-
-    def highlight_set(self, blocks, color):
-        for block in blocks:
-            block.config(bg=color)
+    def highlight(self, level, index, way, color):
+        """Overlay a whole set (way=None) or one block of a level's heatmap."""
+        view = self.heatmaps.get(level)
+        if view is not None:
+            view.highlight(index, way, color)
 
     def reset_cache_colors(self):
-        for level in self.cache_entries.values():
-            for block in level:
-                block.config(bg="white")
+        for view in self.heatmaps.values():
+            view.clear_highlights()
 
-    def refresh_cache_display(self):
-        for level in ["L1", "L2", "L3"]:
-            cache = getattr(self.cache, level)
-            entries = self.cache_entries.get(level, [])
-        
-            idx = 0
-            for set_idx in range(cache.num_sets):
-                for block_idx in range(cache.associativity):
-                    if idx >= len(entries):
-                        break
-                
-                    cpp_block = cache.sets[set_idx].blocks[block_idx]
-                    gui_block = entries[idx]
-                
-                    if cpp_block.valid:
-                        # Compute the full address using the same formula as initialization:
-                        computed_address = (cpp_block.tag * cache.num_sets + set_idx) * cache.block_size
-                        # Prepare a multiline text with all three values
-                        text = f"Addr: {computed_address}\nTag: {cpp_block.tag}\nIdx: {set_idx}"
-                        gui_block.config(text=text, fg="red" if cpp_block.dirty else "black")
-                    else:
-                        gui_block.config(text="")
-                    gui_block.config(bg='white')
-                    idx += 1
+    def set_heatmap_mode(self, mode):
+        for view in self.heatmaps.values():
+            view.set_mode(mode)
+
+    def pull_cache_changes(self):
+        # Without a playback thread the UI owns the cache and copies changed sets itself
+        if self.player is None:
+            self.apply_block_changes(playback.snapshot_changes(self.cache))
+
+    def apply_block_changes(self, changes):
+        playback.apply_changes(self.block_state, changes)
+        for level, (index, _) in changes.items():
+            self.stale_sets[level].update(index.tolist())
+
+    def refresh_cache_display(self, full=False):
+        """Recolor the sets that changed since the last refresh (every level in full with ``full``)."""
+        self.pull_cache_changes()
+        for level in self.level_names:
+            stale = self.stale_sets[level]
+            view = self.heatmaps.get(level)
+            if view is not None and full:
+                view.update_state(self.block_state[level])
+            elif view is not None and stale:
+                view.update_sets(np.fromiter(stale, dtype=np.int64, count=len(stale)), self.block_state[level])
+            stale.clear()
+
+    # Trace playback
+    def playback_speed(self):
+        return PLAYBACK_SPEEDS[self.speed_option.get()]
+
+    def open_trace(self):
+        path = filedialog.askopenfilename(title="Open memory trace")
+        if not path:
+            return
+        try:
+            chunks = traces.open_trace(path)
+        except (OSError, ValueError) as e:
+            self.playback_status.config(text=f"Cannot open trace: {e}")
+            return
+        self.stop_playback()
+        self.pull_cache_changes()
+        self.player = playback.TracePlayer(self.cache, chunks, self.playback_updates,
+                                           speed=self.playback_speed(), interval=FRAME_MS / 1000,
+                                           time=self.time_counter + 1)
+        self.player.start()
+        self.playback_status.config(text=f"Loaded {os.path.basename(path)}: paused")
+        self.play_button.config(text="Play")
+        if self.poll_id is not None:
+            self.after_cancel(self.poll_id)
+        self.poll_id = self.after(FRAME_MS, self.poll_playback)
+
+    def toggle_playback(self):
+        if self.player is None:
+            return
+        if self.player.playing:
+            self.player.pause()
+            self.play_button.config(text="Play")
+        else:
+            self.player.play()
+            self.play_button.config(text="Pause")
+
+    def step_playback(self):
+        if self.player is not None:
+            self.player.step()
+            if self.current_page == "Trace Playback":
+                self.play_button.config(text="Play")
+
+    def stop_playback(self):
+        if self.player is not None:
+            self.player.stop()
+            self.player.join()
+            self.player = None
+            self.drain_playback_updates()
+
+    def drain_playback_updates(self):
+        # Coalesce everything queued since the last frame; only the newest metrics are shown
+        latest = None
+        while True:
+            try:
+                update = self.playback_updates.get_nowait()
+            except queue.Empty:
+                break
+            self.apply_block_changes(update.changes)
+            latest = update
+        if latest is not None:
+            self.time_counter = max(self.time_counter, latest.time)
+            if self.current_page == "Trace Playback":
+                levels = "  ".join(f"{name}: {ratio:.3f}" for name, ratio in latest.hit_ratios.items())
+                state = "finished" if latest.finished else "playing" if self.player and self.player.playing else "paused"
+                self.playback_status.config(text=(
+                    f"{state}\nAccesses: {latest.accesses:,}  Hit ratio: {latest.hit_ratio:.4f}  "
+                    f"AMAT: {latest.amat:.1f} cycles  Rate: {latest.rate:,.0f}/s\nHit ratio per level: {levels}"))
+                if latest.finished:
+                    self.play_button.config(text="Play")
+            self.refresh_cache_display()
+        return latest
+
+    def poll_playback(self):
+        self.poll_id = None
+        if self.player is None:
+            return
+        latest = self.drain_playback_updates()
+        if latest is not None and latest.finished:
+            self.player = None
+            self.log("Trace playback finished")
+            return
+        self.poll_id = self.after(FRAME_MS, self.poll_playback)
+
+    def on_graph_draw(self, event):
+        # A full redraw (first show, resize, rescale) invalidates the cached background
+        self.graph_background = self.canvas.copy_from_bbox(self.ax.bbox)
+        self.ax.draw_artist(self.read_line)
+        self.ax.draw_artist(self.write_line)
 
     def update_graph(self):
-        self.ax.clear()
-        self.ax.set_title("Hit Ratio Over Time")
-        self.ax.set_xlabel("Operations")
-        self.ax.set_ylabel("Hit Ratio")
-        if self.time_points:
-            self.ax.plot(self.time_points, self.hit_ratios_read, label='Reads', color='blue')
-            self.ax.plot(self.time_points, self.hit_ratios_write, label='Writes', color='green')
-            self.ax.legend()
-        self.canvas.draw()
+        if not self.canvas.get_tk_widget().winfo_exists():
+            return
+        self.read_line.set_data(self.read_times, self.hit_ratios_read)
+        self.write_line.set_data(self.write_times, self.hit_ratios_write)
+        if self.time_counter > self.ax.get_xlim()[1]:
+            self.ax.set_xlim(0, self.time_counter * GRAPH_X_MARGIN)
+            self.canvas.draw()
+        elif self.graph_background is not None:
+            self.canvas.restore_region(self.graph_background)
+            self.ax.draw_artist(self.read_line)
+            self.ax.draw_artist(self.write_line)
+            self.canvas.blit(self.ax.bbox)
+
+    def log(self, message):
+        self.log_messages.append(message)
+        self.pending_log.append(message)
 
-    def update_log_output(self):
-        if self.log_output.winfo_exists():
+    def update_log_output(self, full=False):
+        """Append pending messages to the log panel, trimming it to the last LOG_LINES."""
+        if not self.log_output.winfo_exists():
+            return
+        if full:
             self.log_output.delete("1.0", tk.END)
-            for msg in self.log_messages[-20:]:  # Show last 20 messages
-                self.log_output.insert(tk.END, msg + "\n")
+            self.pending_log = deque(self.log_messages, maxlen=LOG_LINES)
+        if self.pending_log:
+            self.log_output.insert(tk.END, "".join(msg + "\n" for msg in self.pending_log))
+            self.pending_log.clear()
+            excess = int(self.log_output.index("end-1c").split(".")[0]) - 1 - LOG_LINES
+            if excess > 0:
+                self.log_output.delete("1.0", f"{excess + 1}.0")
             self.log_output.see(tk.END)
 
     def clear_logs(self):
         self.log_messages.clear()
-        self.update_log_output()
+        self.update_log_output(full=True)
         self.write_address_entry.delete(0, tk.END)
         self.write_value_entry.delete(0, tk.END)
         self.read_address_entry.delete(0, tk.END)
@@ -397,9 +546,9 @@ class CacheSimulatorGUI(tk.Tk):
     def initialize_cache(self):
         """Initialize cache with unique tags by forcing block allocation in each level separately."""
         try:
-            level_base_tags = {"L3": 0, "L2": 1000, "L1": 2000}
+            level_base_tags = {name: 1000 * i for i, name in enumerate(reversed(self.level_names))}
         
-            for level in ["L3", "L2", "L1"]:
+            for level in reversed(self.level_names):
                 cache = getattr(self.cache, level)
                 block_size = cache.block_size
                 num_sets = cache.num_sets
@@ -415,10 +564,12 @@ class CacheSimulatorGUI(tk.Tk):
                     
                         # Force block allocation by writing directly to the lower-level cache
                         # (Using the lower-level write method rather than the multi-level write)
-                        cache.write(address, self.time_counter, lambda msg: None)
+                        cache.write(address, self.time_counter)
                         self.time_counter += 1
-        
-            self.refresh_cache_display()
+
+            # The synthetic fill is not part of the measured workload
+            self.cache.reset_stats()
+            self.refresh_cache_display(full=True)
         except Exception as e:
             print(f"Initialization error: {e}")
             
@@ -1,13 +1,38 @@
-from dataclasses import dataclass
-from typing import List, Callable
+import json
+import os
+import re
+import sys
+from collections import OrderedDict
+from dataclasses import asdict, dataclass, field, fields
+from typing import Any, Callable, Dict, Iterator, List, Mapping, NamedTuple, Optional, Sequence, Set, Tuple, Union
 
-@dataclass
+import numpy as np
+
+from policies import ReplacementPolicy, make_policy
+from prefetch import PrefetchStats, Prefetcher, make_prefetcher
+
+# Operation codes shared by the batch paths; OP_READ/OP_WRITE match the trace format.
+OP_READ = 0
+OP_WRITE = 1
+OP_WRITEBACK = 3
+
+WRITE_POLICIES = ("write-back", "write-through")
+INCLUSION_POLICIES = ("nine", "inclusive", "exclusive")
+DEFAULT_MEMORY_LATENCY = 200
+# Rounds of the numpy batch kernel narrower than this many sets run per access instead.
+MIN_ROUND_WIDTH = 16
+
+# Slotted blocks (Python 3.10+) keep large object-engine caches compact.
+_SLOTS = {"slots": True} if sys.version_info >= (3, 10) else {}
+
+@dataclass(**_SLOTS)
 class CacheBlock:
     tag: int = 0
     valid: bool = False
     dirty: bool = False
     access_count: int = 0
     last_used_time: int = 0
+    prefetched: bool = False  # filled by a prefetcher and not yet hit
 
     @property
     def lastUsedTime(self):
@@ -18,109 +43,1175 @@ class CacheBlock:
         self.last_used_time = value
 
 class CacheSet:
+    __slots__ = ("blocks",)
+
     def __init__(self, associativity: int):
         self.blocks: List[CacheBlock] = [CacheBlock() for _ in range(associativity)]
 
+class LazySets(Sequence):
+    """``cache.sets``: set objects are only built when a set is first touched.
+
+    With ``keep`` the built sets are stored (the objects engine, where they hold
+    the state); otherwise a fresh view is made on every lookup.
+    """
+    __slots__ = ("_size", "_factory", "_keep", "_built")
+
+    def __init__(self, size: int, factory: Callable[[int], Any], keep: bool = True):
+        self._size = size
+        self._factory = factory
+        self._keep = keep
+        self._built: Dict[int, Any] = {}
+
+    def __len__(self) -> int:
+        return self._size
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(self._size)[index]]
+        if index < 0:
+            index += self._size
+        if not 0 <= index < self._size:
+            raise IndexError("set index out of range")
+        item = self._built.get(index)
+        if item is None:
+            item = self._factory(index)
+            if self._keep:
+                self._built[index] = item
+        return item
+
+    def __iter__(self) -> Iterator[Any]:
+        return (self[i] for i in range(self._size))
+
+    def built(self, index: int) -> Optional[Any]:
+        """The set if it has been materialized, without building it."""
+        return self._built.get(index)
+
+# --- Statistics and events ---
+
+@dataclass
+class CacheStats:
+    read_hits: int = 0
+    read_misses: int = 0
+    write_hits: int = 0
+    write_misses: int = 0
+    evictions: int = 0
+    dirty_evictions: int = 0
+    # 3C breakdown of the misses, filled while a MissClassifier is attached.
+    compulsory_misses: int = 0
+    capacity_misses: int = 0
+    conflict_misses: int = 0
+
+    @property
+    def hits(self) -> int:
+        return self.read_hits + self.write_hits
+
+    @property
+    def misses(self) -> int:
+        return self.read_misses + self.write_misses
+
+    @property
+    def accesses(self) -> int:
+        return self.hits + self.misses
+
+    @property
+    def hit_ratio(self) -> float:
+        return self.hits / self.accesses if self.accesses else 0.0
+
+    def reset(self):
+        for field in fields(self):
+            setattr(self, field.name, 0)
+
+    def as_dict(self) -> Dict[str, int]:
+        return asdict(self)
+
+# Miss kinds returned by MissClassifier.
+MISS_NONE, MISS_COMPULSORY, MISS_CAPACITY, MISS_CONFLICT = range(4)
+_MISS_FIELDS = ("compulsory_misses", "capacity_misses", "conflict_misses")
+
+class MissClassifier:
+    """3C classification of one level's demand misses.
+
+    A miss is compulsory on the first reference to a line, a capacity miss if a
+    fully associative LRU cache of the same capacity would also miss, and a
+    conflict miss otherwise. The shadow cache is an OrderedDict, so tracking is
+    O(1) per access.
+    """
+
+    def __init__(self, num_sets: int, capacity: int):
+        self.capacity = capacity
+        self.seen: Set[int] = set()
+        self.shadow: "OrderedDict[int, None]" = OrderedDict()
+        self.conflicts_by_set = np.zeros(num_sets, dtype=np.int64)
+
+    def observe(self, line: int, hit: bool, allocate: bool = True) -> int:
+        """Feed one demand reference; returns its MISS_* kind (MISS_NONE for hits).
+
+        ``allocate`` is False for a write miss the level won't allocate, so the
+        shadow cache doesn't either.
+        """
+        shadow = self.shadow
+        if line in shadow:
+            shadow.move_to_end(line)
+            shadow_hit = True
+        else:
+            shadow_hit = False
+            if allocate:
+                shadow[line] = None
+                if len(shadow) > self.capacity:
+                    shadow.popitem(last=False)
+        if hit:
+            self.seen.add(line)
+            return MISS_NONE
+        if line not in self.seen:
+            self.seen.add(line)
+            return MISS_COMPULSORY
+        return MISS_CONFLICT if shadow_hit else MISS_CAPACITY
+
+    def observe_batch(self, lines: np.ndarray, hits: np.ndarray, allocate: np.ndarray) -> np.ndarray:
+        """observe() over arrays in access order; returns the kinds as int8."""
+        observe = self.observe
+        return np.fromiter((observe(line, hit, alloc) for line, hit, alloc in
+                            zip(lines.tolist(), hits.tolist(), allocate.tolist())),
+                           dtype=np.int8, count=lines.size)
+
+    def reset_counts(self):
+        """Zero the histogram but keep the warm first-touch set and shadow cache."""
+        self.conflicts_by_set[:] = 0
+
+class CacheEvent(NamedTuple):
+    level: str
+    index: int
+    hit: bool
+    is_write: bool
+
+    def message(self) -> str:
+        return format_access_message(self.hit, self.is_write, self.index)
+
+EventSink = Callable[[CacheEvent], None]
+
+@dataclass
+class HierarchyStats:
+    accesses: int = 0
+    total_latency: int = 0
+    back_invalidations: int = 0
+    # Per link below each level (the last link goes to DRAM).
+    bytes_up: List[int] = field(default_factory=list)
+    bytes_down: List[int] = field(default_factory=list)
+
+    @property
+    def amat(self) -> float:
+        return self.total_latency / self.accesses if self.accesses else 0.0
+
+    @property
+    def dram_read_bytes(self) -> int:
+        return self.bytes_up[-1] if self.bytes_up else 0
+
+    @property
+    def dram_write_bytes(self) -> int:
+        return self.bytes_down[-1] if self.bytes_down else 0
+
+    def reset(self):
+        self.accesses = self.total_latency = self.back_invalidations = 0
+        self.bytes_up = [0] * len(self.bytes_up)
+        self.bytes_down = [0] * len(self.bytes_down)
+
+# --- Struct-of-arrays views (numpy engine) ---
+
+class ArrayCacheBlock:
+    """View of one way of a numpy-engine cache, with the CacheBlock attributes."""
+    __slots__ = ("_cache", "_index", "_way")
+
+    def __init__(self, cache: "Cache", index: int, way: int):
+        self._cache = cache
+        self._index = index
+        self._way = way
+
+    def _get(self, name):
+        return getattr(self._cache, name)[self._index, self._way].item()
+
+    def _set(self, name, value):
+        getattr(self._cache, name)[self._index, self._way] = value
+
+    tag = property(lambda self: self._get("tags"), lambda self, v: self._set("tags", v))
+    valid = property(lambda self: self._get("valid"), lambda self, v: self._set("valid", v))
+    dirty = property(lambda self: self._get("dirty"), lambda self, v: self._set("dirty", v))
+    access_count = property(lambda self: self._get("access_count"),
+                            lambda self, v: self._set("access_count", v))
+    last_used_time = property(lambda self: self._get("last_used_time"),
+                              lambda self, v: self._set("last_used_time", v))
+    prefetched = property(lambda self: self._get("prefetched"), lambda self, v: self._set("prefetched", v))
+    lastUsedTime = last_used_time
+
+class ArrayCacheSet:
+    __slots__ = ("_cache", "_index")
+
+    def __init__(self, cache: "Cache", index: int):
+        self._cache = cache
+        self._index = index
+
+    @property
+    def blocks(self) -> List[ArrayCacheBlock]:
+        return [ArrayCacheBlock(self._cache, self._index, way)
+                for way in range(self._cache.associativity)]
+
 class Cache:
-    def __init__(self, num_sets: int, associativity: int, block_size: int):
+    ENGINES = ("objects", "numpy")
+
+    def __init__(self, num_sets: int, associativity: int, block_size: int, engine: str = "objects",
+                 name: str = "", policy: Union[str, ReplacementPolicy] = "lru", seed: Optional[int] = None,
+                 write_policy: str = "write-back", write_allocate: bool = True, hit_latency: int = 1,
+                 prefetcher: Union[None, str, Mapping[str, Any], Prefetcher] = None,
+                 prefetch_latency: Optional[int] = None):
+        if engine not in self.ENGINES:
+            raise ValueError(f"Unknown cache engine {engine!r}, expected one of {self.ENGINES}")
+        if write_policy not in WRITE_POLICIES:
+            raise ValueError(f"Unknown write policy {write_policy!r}, expected one of {WRITE_POLICIES}")
         self.num_sets = num_sets
         self.associativity = associativity
         self.block_size = block_size
-        self.sets = [CacheSet(associativity) for _ in range(num_sets)]
+        self.engine = engine
+        self.name = name
+        self.policy = make_policy(policy, num_sets, associativity, seed)
+        self.seed = seed
+        self.write_back = write_policy == "write-back"
+        self.write_allocate = write_allocate
+        self.hit_latency = hit_latency
+        # Last line evicted by a fill, for the hierarchy to write back or spill.
+        self.victim_address = -1
+        self.victim_dirty = False
+        # Power-of-two geometries decode addresses with shifts and masks.
+        self.pow2 = is_power_of_two(num_sets) and is_power_of_two(block_size)
+        self.offset_bits = block_size.bit_length() - 1
+        self.index_mask = num_sets - 1
+        self.tag_shift = self.offset_bits + num_sets.bit_length() - 1
+        self.stats = CacheStats()
+        # Typed event listener; messages are only built when one is attached.
+        self.event_sink: Optional[EventSink] = None
+        # Sets modified since the last drain_changes(); None when tracking is off.
+        self.changed_sets: Optional[Set[int]] = None
+        self.miss_classifier: Optional[MissClassifier] = None
+        self.prefetcher = make_prefetcher(prefetcher)
+        self.prefetch_stats = PrefetchStats()
+        # Lines the prefetcher asked for, issued after the demand access by
+        # issue_prefetches() or the hierarchy.
+        self.pending_prefetches: List[int] = []
+        # A useful prefetch is late if used fewer than this many accesses after its fill.
+        # None converts fill_cycles to accesses with the average access time so far.
+        self.prefetch_latency = prefetch_latency
+        # Cycles a prefetch fill takes and the running cycles per access; a hierarchy sets both.
+        self.fill_cycles = DEFAULT_MEMORY_LATENCY
+        self.cycles_per_access: Callable[[], float] = self._cycles_per_access
+        # Recent victims of prefetch fills, to count the demand misses they cause.
+        self._prefetch_victims: "OrderedDict[int, None]" = OrderedDict()
+        if engine == "numpy":
+            shape = (num_sets, associativity)
+            self.tags = np.zeros(shape, dtype=np.int64)
+            self.valid = np.zeros(shape, dtype=bool)
+            self.dirty = np.zeros(shape, dtype=bool)
+            self.last_used_time = np.zeros(shape, dtype=np.int64)
+            self.access_count = np.zeros(shape, dtype=np.int64)
+            self.prefetched = np.zeros(shape, dtype=bool)
+            self.sets = LazySets(num_sets, lambda i: ArrayCacheSet(self, i), keep=False)
+        else:
+            self.sets = LazySets(num_sets, lambda i: CacheSet(associativity))
 
-    def read(self, address: int, time: int, callback: Callable[[str], None]) -> bool:
-        index = get_index(address, self.block_size, self.num_sets)
-        tag = get_tag(address, self.block_size, self.num_sets)
+    def read(self, address: int, time: int, callback: Optional[Callable[[str], None]] = None) -> bool:
+        hit = self._access(address, time, False, callback)
+        if self.pending_prefetches:
+            self.issue_prefetches(time)
+        return hit
 
-        for block in self.sets[index].blocks:
-            if block.valid and block.tag == tag:
-                callback(f"HIT ✅ in Cache at index {index}\n")
-                block.last_used_time = time
-                block.access_count += 1
-                return True
+    def track_changes(self, enabled: bool = True):
+        """Record which sets change so a display can redraw only those."""
+        self.changed_sets = set() if enabled else None
+
+    def drain_changes(self) -> Set[int]:
+        """Sets modified since the previous call (empty when tracking is off)."""
+        if self.changed_sets is None:
+            return set()
+        changed, self.changed_sets = self.changed_sets, set()
+        return changed
+
+    def classify_misses(self, enabled: bool = True):
+        """Split misses into compulsory/capacity/conflict (see MissClassifier); costs a shadow cache."""
+        self.miss_classifier = (MissClassifier(self.num_sets, self.num_sets * self.associativity)
+                                if enabled else None)
+
+    def conflict_sets(self, top: int = 10) -> List[Tuple[int, int]]:
+        """(set index, conflict misses) of the sets with the most conflict misses."""
+        if self.miss_classifier is None:
+            return []
+        counts = self.miss_classifier.conflicts_by_set
+        order = np.argsort(counts, kind="stable")[::-1][:top]
+        return [(int(i), int(counts[i])) for i in order if counts[i]]
+
+    def write(self, address: int, time: int, callback: Optional[Callable[[str], None]] = None) -> bool:
+        hit = self._access(address, time, True, callback)
+        if self.pending_prefetches:
+            self.issue_prefetches(time)
+        return hit
+
+    def decode(self, address: int) -> Tuple[int, int]:
+        """Split an address into (set index, tag)."""
+        if self.pow2:
+            return (address >> self.offset_bits) & self.index_mask, address >> self.tag_shift
+        return get_index(address, self.block_size, self.num_sets), get_tag(address, self.block_size, self.num_sets)
 
-        self.replace_lru(index, tag, time)
-        callback(f"MISS ❌ in Cache at index {index}\n")
-        return False
+    def decode_batch(self, addresses: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Vectorized decode() over an int64 address array."""
+        if self.pow2:
+            return (addresses >> self.offset_bits) & self.index_mask, addresses >> self.tag_shift
+        blocks = addresses // self.block_size
+        return blocks % self.num_sets, blocks // self.num_sets
 
-    def write(self, address: int, time: int, callback: Callable[[str], None]) -> bool:
-        index = get_index(address, self.block_size, self.num_sets)
-        tag = get_tag(address, self.block_size, self.num_sets)
+    def block_address(self, index, tag):
+        """Inverse of decode(): first byte address of a line. Works on ints and arrays."""
+        if self.pow2:
+            return (tag << self.tag_shift) | (index << self.offset_bits)
+        return (tag * self.num_sets + index) * self.block_size
 
-        for block in self.sets[index].blocks:
+    @staticmethod
+    def _find(blocks, tag: int) -> int:
+        for way, block in enumerate(blocks):
             if block.valid and block.tag == tag:
-                callback(f"HIT ✅ Writing to Cache at index {index}\n")
-                block.last_used_time = time
-                block.access_count += 1
+                return way
+        return -1
+
+    def _access(self, address: int, time: int, is_write: bool,
+                callback: Optional[Callable[[str], None]]) -> bool:
+        index, tag = self.decode(address)
+        self.victim_address = -1
+        if self.changed_sets is not None:
+            self.changed_sets.add(index)
+        blocks = self.sets[index].blocks
+        way = self._find(blocks, tag)
+        hit = way >= 0
+        if self.prefetcher is not None:
+            self._train(blocks, way, tag * self.num_sets + index, time)
+        if hit:
+            block = blocks[way]
+            block.last_used_time = time
+            block.access_count += 1
+            if is_write and self.write_back:
                 block.dirty = True
-                return True
+            self.policy.touch(index, way, time)
+        elif not is_write or self.write_allocate:
+            way = self.replace(index, tag, time)
+            if is_write and self.write_back:
+                blocks[way].dirty = True
+        if self.miss_classifier is not None:
+            self._classify(index, tag, hit, not is_write or self.write_allocate)
+        self._record(index, hit, is_write, callback)
+        return hit
 
-        self.replace_lru(index, tag, time)
-        callback(f"MISS ❌ Writing to Cache at index {index}\n")
-        return False
+    def _train(self, blocks, way: int, line: int, time: int):
+        # Prefetch accounting for a demand reference, then queue what the prefetcher asks for.
+        stats = self.prefetch_stats
+        trigger = way < 0
+        if trigger:
+            stats.demand_misses += 1
+            if line in self._prefetch_victims:
+                del self._prefetch_victims[line]
+                stats.pollution_misses += 1
+        else:
+            block = blocks[way]
+            if block.prefetched:
+                block.prefetched = False
+                stats.useful += 1
+                # The fill time is still in last_used_time until this first hit.
+                if time - block.last_used_time < self.late_window():
+                    stats.late += 1
+                trigger = True
+        self.pending_prefetches.extend(self.prefetcher.observe(line, trigger))
 
-    def replace_fifo(self, index: int, tag: int):
-        for block in self.sets[index].blocks:
-            if not block.valid:
-                block.tag = tag
-                block.valid = True
-                return
-        self.sets[index].blocks.pop(0)
-        self.sets[index].blocks.append(CacheBlock(tag=tag, valid=True))
-
-    def replace_lru(self, index: int, tag: int, time: int):
-        for block in self.sets[index].blocks:
+    def late_window(self) -> float:
+        """Accesses a prefetch into this cache takes to arrive."""
+        if self.prefetch_latency is not None:
+            return self.prefetch_latency
+        return self.fill_cycles / max(self.cycles_per_access(), 1.0)
+
+    def _cycles_per_access(self) -> float:
+        # A cache on its own: every access takes hit_latency, misses also wait for the fill.
+        return self.hit_latency + (1.0 - self.stats.hit_ratio) * self.fill_cycles
+
+    def prefetch(self, address: int, time: int) -> bool:
+        """Install a line with its prefetched bit set through the normal replacement path.
+
+        Returns False (and counts the request as redundant) if the line is already cached.
+        """
+        index, tag = self.decode(address)
+        self.victim_address = -1
+        blocks = self.sets[index].blocks
+        if self._find(blocks, tag) >= 0:
+            self.prefetch_stats.redundant += 1
+            return False
+        if self.changed_sets is not None:
+            self.changed_sets.add(index)
+        way = self.replace(index, tag, time)
+        blocks[way].prefetched = True
+        self.prefetch_stats.issued += 1
+        if self.victim_address >= 0:
+            victims = self._prefetch_victims
+            victims[self.victim_address // self.block_size] = None
+            if len(victims) > self.num_sets * self.associativity:
+                victims.popitem(last=False)
+        return True
+
+    def issue_prefetches(self, time: int):
+        """Fill the queued prefetches into this cache alone (a hierarchy routes them itself)."""
+        pending, self.pending_prefetches = self.pending_prefetches, []
+        for line in pending:
+            if line >= 0:
+                self.prefetch(line * self.block_size, time)
+
+    def _classify(self, index: int, tag: int, hit: bool, allocate: bool):
+        kind = self.miss_classifier.observe(tag * self.num_sets + index, hit, allocate)
+        if kind:
+            field_name = _MISS_FIELDS[kind - 1]
+            setattr(self.stats, field_name, getattr(self.stats, field_name) + 1)
+            if kind == MISS_CONFLICT:
+                self.miss_classifier.conflicts_by_set[index] += 1
+
+    def _record(self, index: int, hit: bool, is_write: bool, callback: Optional[Callable[[str], None]]):
+        stats = self.stats
+        if is_write:
+            if hit:
+                stats.write_hits += 1
+            else:
+                stats.write_misses += 1
+        elif hit:
+            stats.read_hits += 1
+        else:
+            stats.read_misses += 1
+
+        if callback is not None:
+            callback(format_access_message(hit, is_write, index))
+        if self.event_sink is not None:
+            self.event_sink(CacheEvent(self.name, index, hit, is_write))
+
+    def insert(self, address: int, time: int, dirty: bool = False) -> bool:
+        """Install a line without counting a demand access (writebacks, victim fills).
+
+        Returns True if the line was already present.
+        """
+        index, tag = self.decode(address)
+        self.victim_address = -1
+        if self.changed_sets is not None:
+            self.changed_sets.add(index)
+        blocks = self.sets[index].blocks
+        way = self._find(blocks, tag)
+        present = way >= 0
+        if not present:
+            way = self.replace(index, tag, time)
+        if dirty:
+            blocks[way].dirty = True
+        return present
+
+    def invalidate(self, address: int) -> Tuple[bool, bool]:
+        """Drop a line if present. Returns (was_present, was_dirty)."""
+        index, tag = self.decode(address)
+        blocks = self.sets[index].blocks
+        way = self._find(blocks, tag)
+        if way < 0:
+            return False, False
+        if self.changed_sets is not None:
+            self.changed_sets.add(index)
+        block = blocks[way]
+        dirty = block.dirty
+        if block.prefetched:
+            self.prefetch_stats.unused += 1
+        block.valid = False
+        block.dirty = False
+        block.prefetched = False
+        return True, dirty
+
+    def extract(self, address: int, time: int, is_write: bool = False) -> Tuple[bool, bool]:
+        """Demand lookup that moves the line out of this level, as exclusive hierarchies do."""
+        present, dirty = self.invalidate(address)
+        index, tag = self.decode(address)
+        if self.miss_classifier is not None:
+            self._classify(index, tag, present, True)
+        self._record(index, present, is_write, None)
+        return present, dirty
+
+    def peek(self, address: int) -> Tuple[bool, bool]:
+        """(present, dirty) of a line, without touching replacement state or stats."""
+        index, tag = self.decode(address)
+        blocks = self.sets[index].blocks
+        way = self._find(blocks, tag)
+        return (True, bool(blocks[way].dirty)) if way >= 0 else (False, False)
+
+    def clean(self, address: int) -> bool:
+        """Clear a line's dirty bit (its data was written back); returns whether it was dirty."""
+        index, tag = self.decode(address)
+        blocks = self.sets[index].blocks
+        way = self._find(blocks, tag)
+        if way < 0 or not blocks[way].dirty:
+            return False
+        blocks[way].dirty = False
+        if self.changed_sets is not None:
+            self.changed_sets.add(index)
+        return True
+
+    def mark_dirty(self, address: int) -> bool:
+        index, tag = self.decode(address)
+        blocks = self.sets[index].blocks
+        way = self._find(blocks, tag)
+        if way >= 0:
+            blocks[way].dirty = True
+            if self.changed_sets is not None:
+                self.changed_sets.add(index)
+        return way >= 0
+
+    def access_batch(self, addresses, is_write: Union[bool, np.ndarray] = False,
+                     time: Union[int, np.ndarray] = 0) -> np.ndarray:
+        """Simulate a chunk of accesses in order and return a per-access hit mask.
+
+        ``is_write`` is a scalar or a per-access boolean array. ``time`` is either
+        the timestamp of the first access (the rest follow consecutively) or an
+        array of per-access timestamps. Any event sink receives the chunk's
+        events in access order once the chunk has been simulated.
+        """
+        addresses, writes, times = _batch_arguments(addresses, is_write, time)
+        return self._process_batch(addresses, writes.astype(np.int8), times)[0]
+
+    def _process_batch(self, addresses: np.ndarray, ops: np.ndarray,
+                       times: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Run a chunk of OP_READ/OP_WRITE/OP_WRITEBACK operations.
+
+        Returns the hit mask plus, per operation, the address and dirty bit of
+        the line it evicted (-1 when nothing was evicted).
+        """
+        n = addresses.size
+        if self.engine != "numpy" or self.prefetcher is not None:
+            hits = np.zeros(n, dtype=bool)
+            victims = np.full(n, -1, dtype=np.int64)
+            victim_dirty = np.zeros(n, dtype=bool)
+            for i, (address, op, t) in enumerate(zip(addresses.tolist(), ops.tolist(), times.tolist())):
+                if op == OP_WRITEBACK:
+                    hits[i] = self.insert(address, t, self.write_back)
+                else:
+                    hits[i] = self._access(address, t, op == OP_WRITE, None)
+                if self.victim_address >= 0:
+                    victims[i] = self.victim_address
+                    victim_dirty[i] = self.victim_dirty
+                if self.pending_prefetches:
+                    self.issue_prefetches(t)
+            return hits, victims, victim_dirty
+
+        index, tag = self.decode_batch(addresses)
+        return self._process_decoded(index, tag, ops, times)
+
+    def _process_decoded(self, index: np.ndarray, tag: np.ndarray, ops: np.ndarray,
+                         times: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        hits, victims, victim_dirty = self._access_batch(index, tag, ops, times)
+        if self.changed_sets is not None:
+            self.changed_sets.update(np.unique(index).tolist())
+        demand = ops != OP_WRITEBACK
+        writes = ops == OP_WRITE
+        stats = self.stats
+        write_hits = int(np.count_nonzero(hits & writes))
+        read_hits = int(np.count_nonzero(hits & demand)) - write_hits
+        write_total = int(np.count_nonzero(writes))
+        read_total = int(np.count_nonzero(demand)) - write_total
+        stats.read_hits += read_hits
+        stats.read_misses += read_total - read_hits
+        stats.write_hits += write_hits
+        stats.write_misses += write_total - write_hits
+        if self.miss_classifier is not None:
+            di = index[demand]
+            kinds = self.miss_classifier.observe_batch(tag[demand] * self.num_sets + di, hits[demand],
+                                                       ~writes[demand] | self.write_allocate)
+            counts = np.bincount(kinds, minlength=4)
+            stats.compulsory_misses += int(counts[MISS_COMPULSORY])
+            stats.capacity_misses += int(counts[MISS_CAPACITY])
+            stats.conflict_misses += int(counts[MISS_CONFLICT])
+            self.miss_classifier.conflicts_by_set += np.bincount(di[kinds == MISS_CONFLICT],
+                                                                 minlength=self.num_sets)
+        if self.event_sink is not None:
+            sink, name = self.event_sink, self.name
+            for event in zip(index[demand].tolist(), hits[demand].tolist(), writes[demand].tolist()):
+                sink(CacheEvent(name, *event))
+        return hits, victims, victim_dirty
+
+    def _access_batch(self, index: np.ndarray, tag: np.ndarray, ops: np.ndarray,
+                      times: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        # Sets never interact, so the chunk is processed in rounds: round r holds
+        # the r-th access to every set touched by the chunk. Within a round every
+        # row is distinct and the lookup/replacement runs vectorized across sets.
+        n = index.size
+        hits = np.zeros(n, dtype=bool)
+        victims = np.full(n, -1, dtype=np.int64)
+        victim_dirty = np.zeros(n, dtype=bool)
+        if n == 0:
+            return hits, victims, victim_dirty
+        order = np.argsort(index, kind="stable")
+        sorted_index = index[order]
+        starts = np.flatnonzero(np.r_[True, sorted_index[1:] != sorted_index[:-1]])
+        rank = np.empty(n, dtype=np.int64)
+        rank[order] = np.arange(n) - np.repeat(starts, np.diff(np.r_[starts, n]))
+        by_rank = np.argsort(rank, kind="stable")
+        bounds = np.r_[0, np.cumsum(np.bincount(rank))]
+
+        for r in range(bounds.size - 1):
+            if bounds[r + 1] - bounds[r] < MIN_ROUND_WIDTH:
+                # Only a few hot sets are left: a vectorized pass per access would cost
+                # more than it saves, so finish their accesses one by one, in order.
+                self._access_rows(np.sort(by_rank[bounds[r]:]), index, tag, ops, times,
+                                  hits, victims, victim_dirty)
+                break
+            sel = by_rank[bounds[r]:bounds[r + 1]]
+            s, t, op, tm = index[sel], tag[sel], ops[sel], times[sel]
+            match = self.valid[s] & (self.tags[s] == t[:, None])
+            hit = match.any(axis=1)
+            hits[sel] = hit
+            # Writes and writebacks leave the line dirty in a write-back cache.
+            stores = (op != OP_READ) & self.write_back
+
+            if hit.any():
+                hs, hw = s[hit], match[hit].argmax(axis=1)
+                self.dirty[hs, hw] |= stores[hit]
+                demand = op[hit] != OP_WRITEBACK
+                ds, dw, dtm = hs[demand], hw[demand], tm[hit][demand]
+                self.last_used_time[ds, dw] = dtm
+                self.access_count[ds, dw] += 1
+                self.policy.touch_batch(ds, dw, dtm)
+
+            fill = ~hit & ((op != OP_WRITE) | self.write_allocate)
+            if fill.any():
+                fs, ft, ftm = s[fill], t[fill], tm[fill]
+                free = ~self.valid[fs]
+                full = ~free.any(axis=1)
+                way = free.argmax(axis=1)
+                if full.any():
+                    es = fs[full]
+                    ew = way[full] = self.policy.victim_batch(es)
+                    evicted_dirty = self.dirty[es, ew]
+                    positions = sel[fill][full]
+                    victims[positions] = self.block_address(es, self.tags[es, ew])
+                    victim_dirty[positions] = evicted_dirty
+                    self.stats.evictions += es.size
+                    self.stats.dirty_evictions += int(np.count_nonzero(evicted_dirty))
+                self.tags[fs, way] = ft
+                self.valid[fs, way] = True
+                self.dirty[fs, way] = stores[fill]
+                self.last_used_time[fs, way] = ftm
+                self.access_count[fs, way] = 0
+                self.prefetched[fs, way] = False
+                self.policy.insert_batch(fs, way, ftm)
+        return hits, victims, victim_dirty
+
+    def _access_rows(self, positions: np.ndarray, index: np.ndarray, tag: np.ndarray, ops: np.ndarray,
+                     times: np.ndarray, hits: np.ndarray, victims: np.ndarray, victim_dirty: np.ndarray):
+        # Scalar form of one round of _access_batch, for the given positions in order.
+        tags, valid, dirty = self.tags, self.valid, self.dirty
+        policy, stats = self.policy, self.stats
+        for i, s, t, op, tm in zip(positions.tolist(), index[positions].tolist(), tag[positions].tolist(),
+                                   ops[positions].tolist(), times[positions].tolist()):
+            row_valid = valid[s].tolist()
+            row_tags = tags[s].tolist()
+            store = op != OP_READ and self.write_back
+            for way, (is_valid, line_tag) in enumerate(zip(row_valid, row_tags)):
+                if is_valid and line_tag == t:
+                    hits[i] = True
+                    if store:
+                        dirty[s, way] = True
+                    if op != OP_WRITEBACK:
+                        self.last_used_time[s, way] = tm
+                        self.access_count[s, way] += 1
+                        policy.touch(s, way, tm)
+                    break
+            else:
+                if op == OP_WRITE and not self.write_allocate:
+                    continue
+                if all(row_valid):
+                    way = policy.victim(s)
+                    evicted_dirty = bool(dirty[s, way])
+                    victims[i] = self.block_address(s, row_tags[way])
+                    victim_dirty[i] = evicted_dirty
+                    stats.evictions += 1
+                    stats.dirty_evictions += evicted_dirty
+                else:
+                    way = row_valid.index(False)
+                tags[s, way] = t
+                valid[s, way] = True
+                dirty[s, way] = store
+                self.last_used_time[s, way] = tm
+                self.access_count[s, way] = 0
+                self.prefetched[s, way] = False
+                policy.insert(s, way, tm)
+
+    STATE_ARRAYS = ("tags", "valid", "dirty", "last_used_time", "access_count", "prefetched")
+    _BLOCK_FIELDS = ("tag", "valid", "dirty", "last_used_time", "access_count", "prefetched")
+    _FLAG_ARRAYS = ("valid", "dirty", "prefetched")
+
+    def get_state(self, sets: Union[slice, np.ndarray] = slice(None), policy: bool = True) -> Dict[str, np.ndarray]:
+        """Block and policy state of a range or array of sets (policy arrays are prefixed "policy.")."""
+        if self.engine == "numpy":
+            state = {name: getattr(self, name)[sets].copy() for name in self.STATE_ARRAYS}
+        else:
+            rows = range(self.num_sets)[sets] if isinstance(sets, slice) else np.asarray(sets).tolist()
+            state = {name: np.zeros((len(rows), self.associativity), dtype=bool if name in self._FLAG_ARRAYS
+                                    else np.int64) for name in self.STATE_ARRAYS}
+            # Untouched sets are never built and keep the all-zero default.
+            for row, i in enumerate(rows):
+                cache_set = self.sets.built(i)
+                if cache_set is not None:
+                    for way, block in enumerate(cache_set.blocks):
+                        for name, attr in zip(self.STATE_ARRAYS, self._BLOCK_FIELDS):
+                            state[name][row, way] = getattr(block, attr)
+        if not policy:
+            return state
+        state.update({f"policy.{name}": values for name, values in self.policy.get_state(sets).items()})
+        return state
+
+    def set_state(self, state: Mapping[str, np.ndarray], sets: slice = slice(None)):
+        """Load arrays produced by get_state() into a range of sets."""
+        if self.engine == "numpy":
+            for name in self.STATE_ARRAYS:
+                getattr(self, name)[sets] = state[name]
+        else:
+            touched = np.zeros(len(range(self.num_sets)[sets]), dtype=bool)
+            for name in self.STATE_ARRAYS:
+                touched |= np.asarray(state[name]).any(axis=1)
+            for row, i in enumerate(range(self.num_sets)[sets]):
+                if not touched[row] and self.sets.built(i) is None:
+                    continue
+                for way, block in enumerate(self.sets[i].blocks):
+                    for name, attr in zip(self.STATE_ARRAYS, self._BLOCK_FIELDS):
+                        setattr(block, attr, state[name][row, way].item())
+        if self.changed_sets is not None:
+            self.changed_sets.update(range(self.num_sets)[sets])
+        self.policy.set_state({name[len("policy."):]: values for name, values in state.items()
+                               if name.startswith("policy.")}, sets)
+
+    def to_config(self) -> Dict[str, Any]:
+        """Constructor options of this cache as a LevelConfig-style dict."""
+        return {"name": self.name,
+                "size": self.num_sets * self.associativity * self.block_size,
+                "associativity": self.associativity,
+                "block_size": self.block_size,
+                "policy": self.policy.name,
+                "engine": self.engine,
+                "seed": self.seed,
+                "write_policy": "write-back" if self.write_back else "write-through",
+                "write_allocate": self.write_allocate,
+                "hit_latency": self.hit_latency,
+                "prefetcher": self.prefetcher.to_config() if self.prefetcher is not None else None,
+                "prefetch_latency": self.prefetch_latency}
+
+    def replace(self, index: int, tag: int, time: int) -> int:
+        """Install ``tag`` in set ``index``, evicting the policy's victim if the set is full.
+
+        Returns the way. An evicted line is left in victim_address/victim_dirty.
+        """
+        if self.changed_sets is not None:
+            self.changed_sets.add(index)
+        blocks = self.sets[index].blocks
+        for way, block in enumerate(blocks):
             if not block.valid:
-                block.tag = tag
-                block.valid = True
-                block.last_used_time = time
-                return
-
-        lru_block = min(self.sets[index].blocks, key=lambda b: b.last_used_time)
-        lru_block.tag = tag
-        lru_block.valid = True
-        lru_block.access_count = 0
-        lru_block.last_used_time = time
-        lru_block.dirty = False
-
-    def replace_lfu(self, index: int, tag: int):
-        lfu_block = min(self.sets[index].blocks, key=lambda b: b.access_count)
-        lfu_block.tag = tag
-        lfu_block.valid = True
-        lfu_block.access_count = 1
-        lfu_block.last_used_time = 0
-        lfu_block.dirty = False
+                break
+        else:
+            way = self.policy.victim(index)
+            block = blocks[way]
+            self.victim_address = self.block_address(index, block.tag)
+            self.victim_dirty = block.dirty
+            self.stats.evictions += 1
+            self.stats.dirty_evictions += block.dirty
+            if block.prefetched:
+                self.prefetch_stats.unused += 1
+        block.tag = tag
+        block.valid = True
+        block.access_count = 0
+        block.last_used_time = time
+        block.dirty = False
+        block.prefetched = False
+        self.policy.insert(index, way, time)
+        return way
+
+# --- Hierarchy configuration ---
+
+_SIZE_UNITS = {"": 1, "b": 1, "k": 1 << 10, "kb": 1 << 10, "kib": 1 << 10,
+               "m": 1 << 20, "mb": 1 << 20, "mib": 1 << 20, "g": 1 << 30, "gb": 1 << 30, "gib": 1 << 30}
+
+def parse_size(size: Union[int, str]) -> int:
+    """Parse a byte count such as 32768, "32KiB" or "64 MB" (binary units)."""
+    if isinstance(size, int):
+        return size
+    match = re.fullmatch(r"\s*(\d+)\s*([a-zA-Z]*)\s*", size)
+    if not match or match.group(2).lower() not in _SIZE_UNITS:
+        raise ValueError(f"Invalid size {size!r}")
+    return int(match.group(1)) * _SIZE_UNITS[match.group(2).lower()]
+
+@dataclass
+class LevelConfig:
+    name: str
+    size: int
+    associativity: int
+    block_size: int = 64
+    policy: str = "lru"
+    engine: str = "objects"
+    seed: Optional[int] = None
+    write_policy: str = "write-back"
+    write_allocate: bool = True
+    hit_latency: int = 1
+    prefetcher: Optional[Any] = None  # name or {"name": ..., **options}, see prefetch.py
+    prefetch_latency: Optional[int] = None  # in accesses; None derives it from cycles and AMAT
+
+    @property
+    def num_sets(self) -> int:
+        return self.size // (self.associativity * self.block_size)
+
+    @classmethod
+    def from_dict(cls, data: Mapping[str, Any], defaults: Optional[Mapping[str, Any]] = None) -> "LevelConfig":
+        merged = {**(defaults or {}), **data}
+        known = {field.name for field in fields(cls)}
+        unknown = set(merged) - known - {"num_sets"}
+        if unknown:
+            raise ValueError(f"Unknown cache level options: {sorted(unknown)}")
+        block_size = parse_size(merged.get("block_size", 64))
+        if "size" not in merged and "num_sets" in merged:
+            merged["size"] = int(merged["num_sets"]) * int(merged["associativity"]) * block_size
+        merged.pop("num_sets", None)
+        merged["size"] = parse_size(merged["size"])
+        merged["block_size"] = block_size
+        config = cls(**merged)
+        config.validate()
+        return config
+
+    def validate(self):
+        if self.associativity < 1 or self.block_size < 1:
+            raise ValueError(f"{self.name}: associativity and block_size must be positive")
+        if self.size <= 0 or self.size % (self.associativity * self.block_size):
+            raise ValueError(f"{self.name}: size {self.size} is not a multiple of "
+                             f"associativity * block_size ({self.associativity * self.block_size})")
+
+    def build(self) -> "Cache":
+        return Cache(self.num_sets, self.associativity, self.block_size, engine=self.engine,
+                     name=self.name, policy=self.policy, seed=self.seed, write_policy=self.write_policy,
+                     write_allocate=self.write_allocate, hit_latency=self.hit_latency,
+                     prefetcher=self.prefetcher, prefetch_latency=self.prefetch_latency)
+
+# The original toy hierarchy: L1 = 2x1, L2 = 4x2, L3 = 8x4 with 64 B blocks.
+DEFAULT_LEVELS = (
+    LevelConfig("L1", 2 * 1 * 64, 1, hit_latency=4),
+    LevelConfig("L2", 4 * 2 * 64, 2, hit_latency=12),
+    LevelConfig("L3", 8 * 4 * 64, 4, hit_latency=40),
+)
+
+# Top-level config keys that describe the hierarchy rather than level defaults.
+HIERARCHY_OPTIONS = ("inclusion", "memory_latency", "word_size")
+
+def load_config(source: Union[str, os.PathLike, Mapping[str, Any]]) -> Dict[str, Any]:
+    """Load a hierarchy config from a mapping or a .json/.toml file."""
+    if isinstance(source, Mapping):
+        return dict(source)
+    path = os.fspath(source)
+    if path.endswith(".toml"):
+        try:
+            import tomllib
+        except ImportError:  # Python < 3.11
+            import tomli as tomllib
+        with open(path, "rb") as f:
+            return tomllib.load(f)
+    with open(path, "r") as f:
+        return json.load(f)
 
 class MultiLevelCache:
-    def __init__(self):
-        self.total_hits = 0
-        self.total_misses = 0
-        self.L1 = Cache(2, 1, 64)
-        self.L2 = Cache(4, 2, 64)
-        self.L3 = Cache(8, 4, 64)
-
-    def access_memory(self, address: int, time: int, callback: Callable[[str], None]) -> bool:
-        def wrap(level):
-            def inner(msg):
-                if "HIT" in msg:
-                    self.total_hits += 1
-                elif "MISS" in msg:
-                    self.total_misses += 1
-                callback(f"{level} Cache: {msg}")
-            return inner
-
-        if self.L1.read(address, time, wrap("L1")):
-            return True
-        if self.L2.read(address, time, wrap("L2")):
-            return True
-        return self.L3.read(address, time, wrap("L3"))
-
-    def write_memory(self, address: int, time: int, callback: Callable[[str], None]) -> bool:
-        if self.L1.write(address, time, callback):
-            return True
-        if self.L2.write(address, time, callback):
-            return True
-        return self.L3.write(address, time, callback)
+    def __init__(self, levels: Optional[Sequence[Union[Cache, LevelConfig, Mapping[str, Any]]]] = None,
+                 event_sink: Optional[EventSink] = None, inclusion: str = "nine",
+                 memory_latency: int = DEFAULT_MEMORY_LATENCY, word_size: int = 8):
+        if inclusion not in INCLUSION_POLICIES:
+            raise ValueError(f"Unknown inclusion policy {inclusion!r}, expected one of {INCLUSION_POLICIES}")
+        self.inclusion = inclusion
+        self.memory_latency = memory_latency
+        self.word_size = word_size
+        self.levels: List[Cache] = []
+        for position, level in enumerate(DEFAULT_LEVELS if levels is None else levels):
+            if isinstance(level, Mapping):
+                level = LevelConfig.from_dict({"name": f"L{position + 1}", **level})
+            if isinstance(level, LevelConfig):
+                level = level.build()
+            if not level.name:
+                level.name = f"L{position + 1}"
+            self.levels.append(level)
+        if not self.levels:
+            raise ValueError("A cache hierarchy needs at least one level")
+        if inclusion == "exclusive" and not all(level.write_back and level.write_allocate
+                                                for level in self.levels):
+            raise ValueError("Exclusive hierarchies need write-back, write-allocate levels")
+        if inclusion == "exclusive" and any(level.prefetcher is not None for level in self.levels):
+            raise ValueError("Prefetchers are not supported in exclusive hierarchies")
+        self._by_name = {level.name: level for level in self.levels}
+        # Latency of an access served by level i (index len(levels) is memory).
+        self._latency = np.cumsum([level.hit_latency for level in self.levels] + [memory_latency])
+        for i, level in enumerate(self.levels):
+            # A prefetch into level i is fetched from the levels below it.
+            level.fill_cycles = int(self._latency[-1] - self._latency[i])
+            level.cycles_per_access = self._cycles_per_access
+        self.hierarchy_stats = HierarchyStats(bytes_up=[0] * len(self.levels),
+                                              bytes_down=[0] * len(self.levels))
+        # (op, address, time) of every operation leaving the last level towards memory,
+        # collected while not None (non-exclusive hierarchies; see coherence.py).
+        self.memory_requests: Optional[List[Tuple[int, int, int]]] = None
+        # Addresses of lines evicted from any level, collected while not None (see coherence.py).
+        self.evicted: Optional[List[int]] = None
+        self.set_event_sink(event_sink)
+
+    def _cycles_per_access(self) -> float:
+        # Running AMAT; before the first access, assume it hits the first level.
+        return self.hierarchy_stats.amat or float(self._latency[0])
+
+    @classmethod
+    def from_config(cls, source: Union[str, os.PathLike, Mapping[str, Any]],
+                    event_sink: Optional[EventSink] = None) -> "MultiLevelCache":
+        """Build a hierarchy from ``{"levels": [...], **level_defaults}`` in a dict, JSON or TOML file."""
+        config = load_config(source)
+        options = {key: config[key] for key in HIERARCHY_OPTIONS if key in config}
+        defaults = {key: value for key, value in config.items()
+                    if key != "levels" and key not in HIERARCHY_OPTIONS}
+        levels = [LevelConfig.from_dict({"name": f"L{i + 1}", **level}, defaults)
+                  for i, level in enumerate(config.get("levels", []))]
+        return cls(levels, event_sink, **options)
+
+    def to_config(self) -> Dict[str, Any]:
+        return {"levels": [level.to_config() for level in self.levels],
+                "inclusion": self.inclusion,
+                "memory_latency": self.memory_latency,
+                "word_size": self.word_size}
+
+    def __getattr__(self, name: str) -> Cache:
+        # Levels are reachable by name, e.g. hierarchy.L1
+        levels = self.__dict__.get("_by_name", {})
+        if name in levels:
+            return levels[name]
+        raise AttributeError(f"{type(self).__name__!r} object has no attribute {name!r}")
+
+    def set_event_sink(self, sink: Optional[EventSink]):
+        self.event_sink = sink
+        for level in self.levels:
+            level.event_sink = sink
+
+    def track_changes(self, enabled: bool = True):
+        for level in self.levels:
+            level.track_changes(enabled)
+
+    def drain_changes(self) -> Dict[str, Set[int]]:
+        """Per level name, the sets modified since the previous call."""
+        return {level.name: level.drain_changes() for level in self.levels}
+
+    def classify_misses(self, enabled: bool = True):
+        for level in self.levels:
+            level.classify_misses(enabled)
+
+    def access_memory(self, address: int, time: int, callback: Optional[Callable[[str], None]] = None) -> bool:
+        return self._access(address, time, False, callback) < len(self.levels)
+
+    def write_memory(self, address: int, time: int, callback: Optional[Callable[[str], None]] = None) -> bool:
+        return self._access(address, time, True, callback) < len(self.levels)
+
+    def _access(self, address: int, time: int, is_write: bool,
+                callback: Optional[Callable[[str], None]] = None) -> int:
+        """Run one demand access; returns the index of the level that served it (len(levels) for memory)."""
+        if self.inclusion == "exclusive":
+            served = self._access_exclusive(address, time, is_write, callback)
+        else:
+            served = self._access_through(address, time, is_write, callback)
+        self.hierarchy_stats.accesses += 1
+        self.hierarchy_stats.total_latency += int(self._latency[served])
+        for i, level in enumerate(self.levels):
+            if level.pending_prefetches:
+                self._prefetch(i, time)
+        return served
+
+    @staticmethod
+    def _report(level: Cache, address: int, hit: bool, is_write: bool, callback: Callable[[str], None]):
+        message = format_access_message(hit, is_write, level.decode(address)[0])
+        callback(message if is_write else f"{level.name} Cache: {message}")
+
+    def _access_through(self, address: int, time: int, is_write: bool,
+                        callback: Optional[Callable[[str], None]]) -> int:
+        # Non-inclusive and inclusive hierarchies: every level on the miss path allocates.
+        stats = self.hierarchy_stats
+        served = len(self.levels)
+        for i, level in enumerate(self.levels):
+            hit = level._access(address, time, is_write, None)
+            if callback is not None:
+                self._report(level, address, hit, is_write, callback)
+            if level.victim_address >= 0:
+                self._evict(i, time)
+            if hit and served == len(self.levels):
+                served = i
+            allocated = not hit and (not is_write or level.write_allocate)
+            if allocated:
+                stats.bytes_up[i] += level.block_size
+            if is_write and (not level.write_back or not (hit or level.write_allocate)):
+                # Write-through, or a no-write-allocate miss: the store continues below.
+                stats.bytes_down[i] += self.word_size
+                continue
+            if hit:
+                break
+            is_write = False  # the missing line is fetched from below
+        else:
+            if self.memory_requests is not None:
+                self.memory_requests.append((OP_WRITE if is_write else OP_READ, address, time))
+        return served
+
+    def _access_exclusive(self, address: int, time: int, is_write: bool,
+                          callback: Optional[Callable[[str], None]]) -> int:
+        # Lines live in exactly one level: L1 allocates, lower levels give the line up on a hit
+        # and receive L1's victims instead.
+        levels, stats = self.levels, self.hierarchy_stats
+        top = levels[0]
+        hit = top._access(address, time, is_write, None)
+        if callback is not None:
+            self._report(top, address, hit, is_write, callback)
+        victim, victim_dirty = top.victim_address, top.victim_dirty
+        served = 0
+        if not hit:
+            served = len(levels)
+            for j in range(1, len(levels)):
+                present, dirty = levels[j].extract(address, time)
+                if callback is not None:
+                    self._report(levels[j], address, present, False, callback)
+                if present:
+                    served = j
+                    if dirty:
+                        top.mark_dirty(address)
+                    break
+            for link in range(served):
+                stats.bytes_up[link] += levels[link].block_size
+        if victim >= 0:
+            top.victim_address, top.victim_dirty = victim, victim_dirty
+            self._evict(0, time)
+        return served
+
+    def _prefetch(self, i: int, time: int):
+        """Issue level i's queued prefetches; levels below that miss the line allocate it too."""
+        level, stats = self.levels[i], self.hierarchy_stats
+        pending, level.pending_prefetches = level.pending_prefetches, []
+        for line in pending:
+            address = line * level.block_size
+            if line < 0 or not level.prefetch(address, time):
+                continue
+            stats.bytes_up[i] += level.block_size
+            if level.victim_address >= 0:
+                self._evict(i, time)
+            for j in range(i + 1, len(self.levels)):
+                lower = self.levels[j]
+                present = lower.insert(address, time)
+                if lower.victim_address >= 0:
+                    self._evict(j, time)
+                if present:
+                    break
+                stats.bytes_up[j] += lower.block_size
+
+    def _evict(self, i: int, time: int):
+        """Handle the line level ``i`` just evicted: back-invalidation, writeback or victim spill."""
+        level = self.levels[i]
+        address, dirty = level.victim_address, level.victim_dirty
+        level.victim_address = -1
+        if self.evicted is not None:
+            self.evicted.append(address)
+        if self.inclusion == "inclusive":
+            for upper in self.levels[:i]:
+                for line in range(address, address + level.block_size, upper.block_size):
+                    present, upper_dirty = upper.invalidate(line)
+                    if present:
+                        self.hierarchy_stats.back_invalidations += 1
+                        dirty = dirty or upper_dirty
+        if dirty or self.inclusion == "exclusive":
+            self._spill(i + 1, address, time, dirty)
+
+    def _spill(self, j: int, address: int, time: int, dirty: bool):
+        """Move a line evicted from level j - 1 down into level j (or memory)."""
+        upper = self.levels[j - 1]
+        if j == len(self.levels):
+            if dirty:
+                self.hierarchy_stats.bytes_down[j - 1] += upper.block_size
+                if self.memory_requests is not None:
+                    self.memory_requests.append((OP_WRITEBACK, address, time))
+            return
+        self.hierarchy_stats.bytes_down[j - 1] += upper.block_size
+        level = self.levels[j]
+        level.insert(address, time, dirty and level.write_back)
+        if level.victim_address >= 0:
+            self._evict(j, time)
+        if dirty and not level.write_back:
+            self._spill(j + 1, address, time, True)
+
+    def access_batch(self, addresses, is_write: Union[bool, np.ndarray] = False,
+                     time: Union[int, np.ndarray] = 0) -> np.ndarray:
+        """Batched equivalent of access_memory/write_memory over a chunk of addresses.
+
+        Returns a per-access mask of accesses that hit in any level.
+        """
+        return self.serve_batch(addresses, is_write, time) < len(self.levels)
+
+    def serve_batch(self, addresses, is_write: Union[bool, np.ndarray] = False,
+                    time: Union[int, np.ndarray] = 0) -> np.ndarray:
+        """Like access_batch, but returns the index of the level that served each access."""
+        addresses, writes, times = _batch_arguments(addresses, is_write, time)
+        if self.inclusion != "nine" or any(level.prefetcher is not None for level in self.levels):
+            # Back-invalidations, victim spills and prefetch fills feed state upwards: run per access.
+            return np.fromiter((self._access(a, t, w) for a, w, t in
+                                zip(addresses.tolist(), writes.tolist(), times.tolist())),
+                               dtype=np.int64, count=addresses.size)
+        served = self._serve_batch_streamed(addresses, writes.astype(np.int8), times)
+        self.hierarchy_stats.accesses += addresses.size
+        self.hierarchy_stats.total_latency += int(self._latency[served].sum())
+        return served
+
+    def _serve_batch_streamed(self, addresses: np.ndarray, ops: np.ndarray, times: np.ndarray) -> np.ndarray:
+        # In a non-inclusive hierarchy a level only ever sends work downwards, so
+        # each level runs as one batch over the ordered stream the level above
+        # produced: per operation, the writeback of its dirty victim followed by
+        # the forwarded demand (miss fetch, write-through or no-allocate store).
+        stats = self.hierarchy_stats
+        n_levels = len(self.levels)
+        served = np.full(addresses.size, n_levels, dtype=np.int64)
+        addr, tm = addresses, times
+        origin = np.where(ops == OP_WRITEBACK, -1, np.arange(addresses.size))  # -1 for writebacks
+        for i, level in enumerate(self.levels):
+            if addr.size == 0:
+                break
+            hits, victims, victim_dirty = level._process_batch(addr, ops, tm)
+            if self.evicted is not None:
+                self.evicted.extend(victims[victims >= 0].tolist())
+            is_write = ops == OP_WRITE
+            writeback = ops == OP_WRITEBACK
+            demand_hit = hits & ~writeback
+            first = origin[demand_hit]
+            served[first] = np.minimum(served[first], i)
+
+            forward_store = is_write & (~hits & ~np.bool_(level.write_allocate) | ~np.bool_(level.write_back))
+            forward_read = ~hits & ~writeback & ~forward_store
+            forward_writeback = writeback & ~np.bool_(level.write_back)
+            allocated = ~hits & ~writeback & (~is_write | level.write_allocate)
+            stats.bytes_up[i] += level.block_size * int(np.count_nonzero(allocated))
+            stats.bytes_down[i] += (self.word_size * int(np.count_nonzero(forward_store)) +
+                                    level.block_size * int(np.count_nonzero(victim_dirty) +
+                                                           np.count_nonzero(forward_writeback)))
+
+            forward = forward_store | forward_read | forward_writeback
+            slots = np.stack([victim_dirty, forward], axis=1).ravel()
+            next_ops = np.where(forward_store, OP_WRITE, np.where(forward_read, OP_READ, OP_WRITEBACK))
+            addr = np.stack([victims, addr], axis=1).ravel()[slots]
+            ops = np.stack([np.full_like(ops, OP_WRITEBACK), next_ops.astype(np.int8)], axis=1).ravel()[slots]
+            tm = np.repeat(tm, 2)[slots]
+            origin = np.stack([np.full_like(origin, -1), np.where(forward_writeback, -1, origin)],
+                              axis=1).ravel()[slots]
+        if self.memory_requests is not None:
+            self.memory_requests.extend(zip(ops.tolist(), addr.tolist(), tm.tolist()))
+        return served
+
+    @property
+    def total_hits(self) -> int:
+        return sum(level.stats.hits for level in self.levels)
+
+    @property
+    def total_misses(self) -> int:
+        return sum(level.stats.misses for level in self.levels)
 
     def get_total_hits(self) -> int:
         return self.total_hits
@@ -128,11 +1219,42 @@ class MultiLevelCache:
     def get_total_misses(self) -> int:
         return self.total_misses
 
+    def get_stats(self) -> Dict[str, CacheStats]:
+        return {level.name: level.stats for level in self.levels}
+
+    def traffic(self) -> Dict[str, Dict[str, int]]:
+        """Bytes moved across each link: "up" are line fills, "down" writebacks, stores and victims."""
+        names = [level.name for level in self.levels] + ["DRAM"]
+        stats = self.hierarchy_stats
+        return {f"{names[i]}-{names[i + 1]}": {"up": stats.bytes_up[i], "down": stats.bytes_down[i]}
+                for i in range(len(self.levels))}
+
+    def summary(self) -> Dict[str, Any]:
+        stats = self.hierarchy_stats
+        return {
+            "accesses": stats.accesses,
+            "amat": stats.amat,
+            "back_invalidations": stats.back_invalidations,
+            "levels": {level.name: {**level.stats.as_dict(), "hit_ratio": level.stats.hit_ratio}
+                       for level in self.levels},
+            "traffic": self.traffic(),
+            "prefetch": {level.name: level.prefetch_stats.summary()
+                         for level in self.levels if level.prefetcher is not None},
+        }
+
+    def reset_stats(self):
+        for level in self.levels:
+            level.stats.reset()
+            level.prefetch_stats.reset()
+            if level.miss_classifier is not None:
+                level.miss_classifier.reset_counts()
+        self.hierarchy_stats.reset()
+
     # --- Aliases for GUI compatibility (camelCase methods) ---
-    def accessMemory(self, address: int, time: int, callback: Callable[[str], None]) -> bool:
+    def accessMemory(self, address: int, time: int, callback: Optional[Callable[[str], None]] = None) -> bool:
         return self.access_memory(address, time, callback)
 
-    def writeMemory(self, address: int, time: int, callback: Callable[[str], None]) -> bool:
+    def writeMemory(self, address: int, time: int, callback: Optional[Callable[[str], None]] = None) -> bool:
         return self.write_memory(address, time, callback)
 
     def getTotalHits(self) -> int:
@@ -143,15 +1265,38 @@ class MultiLevelCache:
 
 # --- Utility functions ---
 
+def _batch_arguments(addresses, is_write, time) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    addresses = np.asarray(addresses, dtype=np.int64).ravel()
+    n = addresses.size
+    writes = np.broadcast_to(np.asarray(is_write, dtype=bool), (n,))
+    if np.ndim(time):
+        times = np.asarray(time, dtype=np.int64)
+    else:
+        times = int(time) + np.arange(n, dtype=np.int64)
+    return addresses, writes, times
+
+def is_power_of_two(value: int) -> bool:
+    return value > 0 and value & (value - 1) == 0
+
 def get_index(address: int, block_size: int, num_sets: int) -> int:
     return (address // block_size) % num_sets
 
 def get_tag(address: int, block_size: int, num_sets: int) -> int:
     return address // (block_size * num_sets)
 
+def format_access_message(hit: bool, is_write: bool, index: int) -> str:
+    status = "HIT ✅" if hit else "MISS ❌"
+    action = "Writing to Cache" if is_write else "in Cache"
+    return f"{status} {action} at index {index}\n"
+
 # Aliases for GUI compatibility
 def getIndex(address: int, block_size: int, num_sets: int) -> int:
     return get_index(address, block_size, num_sets)
 
 def getTag(address: int, block_size: int, num_sets: int) -> int:
     return get_tag(address, block_size, num_sets)
+
+if __name__ == "__main__":
+    # python -m mylib: the headless command line.
+    from cli import main
+    sys.exit(main())
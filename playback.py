@@ -0,0 +1,185 @@
+"""Trace playback on a background thread, for the GUI.
+
+While it runs the player owns the hierarchy: it simulates the trace in batches
+and, at most once per ``interval`` seconds, puts a PlaybackUpdate on its queue
+with the metrics so far and the block rows of every set changed since the
+previous update. A UI applies those snapshots to its own copy of the state
+(see snapshot()/apply_changes()) and never reads the live cache.
+"""
+import queue
+import threading
+import time
+from dataclasses import dataclass
+from typing import Dict, Iterable, Optional, Tuple
+
+import numpy as np
+
+import mylib
+import traces
+
+# Per level: (changed set indices, block arrays of those sets as in Cache.get_state).
+Changes = Dict[str, Tuple[np.ndarray, Dict[str, np.ndarray]]]
+
+def snapshot(hierarchy: mylib.MultiLevelCache) -> Dict[str, Dict[str, np.ndarray]]:
+    """Full block arrays of every level, e.g. to seed a UI's copy."""
+    return {level.name: level.get_state(policy=False) for level in hierarchy.levels}
+
+def snapshot_changes(hierarchy: mylib.MultiLevelCache) -> Changes:
+    """Drain the hierarchy's change tracking into block-row snapshots."""
+    changes = {}
+    for level in hierarchy.levels:
+        sets = level.drain_changes()
+        if sets:
+            index = np.fromiter(sorted(sets), dtype=np.int64, count=len(sets))
+            changes[level.name] = (index, level.get_state(index, policy=False))
+    return changes
+
+def apply_changes(state: Dict[str, Dict[str, np.ndarray]], changes: Changes):
+    for name, (index, rows) in changes.items():
+        arrays = state[name]
+        for key, values in rows.items():
+            arrays[key][index] = values
+
+@dataclass
+class PlaybackUpdate:
+    accesses: int
+    hits: int
+    time: int
+    amat: float
+    hit_ratios: Dict[str, float]
+    rate: float  # simulated accesses per second since the previous update
+    changes: Changes
+    finished: bool = False
+
+    @property
+    def hit_ratio(self) -> float:
+        return self.hits / self.accesses if self.accesses else 0.0
+
+class TracePlayer(threading.Thread):
+    """Replay trace chunks through ``hierarchy`` with play/pause/step/speed control.
+
+    ``speed`` is in accesses per second; None runs as fast as the simulator can.
+    """
+
+    def __init__(self, hierarchy: mylib.MultiLevelCache, chunks: Iterable[np.ndarray],
+                 updates: Optional[queue.Queue] = None, batch_size: int = 1 << 16,
+                 speed: Optional[float] = None, interval: float = 1 / 30, time: int = 0,
+                 include_ifetch: bool = True):
+        super().__init__(daemon=True)
+        self.hierarchy = hierarchy
+        self.updates = updates if updates is not None else queue.Queue()
+        self.batch_size = batch_size
+        self.interval = interval
+        self.include_ifetch = include_ifetch
+        self.accesses = 0
+        self.hits = 0
+        self.time = time
+        self._chunks = iter(chunks)
+        self._chunk: Optional[np.ndarray] = None
+        self._position = 0
+        self._condition = threading.Condition()
+        self._playing = False
+        self._steps = 0
+        self._stopped = False
+        self._speed = speed
+        self._paced_since = (0.0, 0)  # (clock, accesses) the current speed is measured from
+        hierarchy.track_changes()
+        hierarchy.drain_changes()
+
+    # --- Controls (any thread) ---
+
+    def play(self):
+        with self._condition:
+            self._playing = True
+            self._paced_since = (time.perf_counter(), self.accesses)
+            self._condition.notify()
+
+    def pause(self):
+        with self._condition:
+            self._playing = False
+            self._steps = 0
+
+    def step(self, count: int = 1):
+        with self._condition:
+            self._playing = False
+            self._steps += count
+            self._condition.notify()
+
+    def set_speed(self, speed: Optional[float]):
+        with self._condition:
+            self._speed = speed
+            self._paced_since = (time.perf_counter(), self.accesses)
+
+    def stop(self):
+        with self._condition:
+            self._stopped = True
+            self._condition.notify()
+
+    @property
+    def playing(self) -> bool:
+        return self._playing
+
+    # --- Worker ---
+
+    def _take(self, limit: int) -> Optional[np.ndarray]:
+        while self._chunk is None or self._position >= len(self._chunk):
+            self._chunk = next(self._chunks, None)
+            self._position = 0
+            if self._chunk is None:
+                return None
+        records = self._chunk[self._position:self._position + limit]
+        self._position += len(records)
+        return records
+
+    def run(self):
+        last_push, last_accesses = time.perf_counter(), 0
+        try:
+            while True:
+                with self._condition:
+                    while not (self._stopped or self._playing or self._steps):
+                        self._condition.wait()
+                    if self._stopped:
+                        break
+                    limit = self.batch_size if self._playing else min(self._steps, self.batch_size)
+                    speed = self._speed
+                    if speed:
+                        limit = min(limit, max(1, int(speed * self.interval)))
+                records = self._take(limit)
+                if records is None:
+                    break
+                self._simulate(records)
+                with self._condition:
+                    if not self._playing:
+                        self._steps = max(self._steps - len(records), 0)
+                    stepping = not self._playing
+                    if speed:
+                        clock, accesses = self._paced_since
+                        delay = clock + (self.accesses - accesses) / speed - time.perf_counter()
+                        if delay > 0:
+                            self._condition.wait(delay)
+                now = time.perf_counter()
+                if stepping or now - last_push >= self.interval:
+                    self._push((self.accesses - last_accesses) / max(now - last_push, 1e-9))
+                    last_push, last_accesses = now, self.accesses
+        finally:
+            now = time.perf_counter()
+            self._push((self.accesses - last_accesses) / max(now - last_push, 1e-9), finished=True)
+
+    def _simulate(self, records: np.ndarray):
+        ops, addrs = records["op"], records["addr"]
+        n = len(records)
+        if not self.include_ifetch:
+            keep = ops != traces.OP_IFETCH
+            ops, addrs = ops[keep], addrs[keep]
+        hits = self.hierarchy.access_batch(addrs.astype(np.int64), ops == traces.OP_WRITE, self.time)
+        self.accesses += len(addrs)
+        self.hits += int(np.count_nonzero(hits))
+        self.time += n
+
+    def _push(self, rate: float, finished: bool = False):
+        hierarchy = self.hierarchy
+        self.updates.put(PlaybackUpdate(
+            accesses=self.accesses, hits=self.hits, time=self.time,
+            amat=hierarchy.hierarchy_stats.amat,
+            hit_ratios={level.name: level.stats.hit_ratio for level in hierarchy.levels},
+            rate=rate, changes=snapshot_changes(hierarchy), finished=finished))
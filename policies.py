@@ -0,0 +1,343 @@
+"""Replacement policies for Cache.
+
+A policy owns its per-set metadata as (num_sets, associativity) NumPy arrays and
+is told about every hit (touch) and fill (insert). The cache itself fills
+invalid ways first, so ``victim`` is only asked to pick among a full set.
+
+The ``*_batch`` variants receive arrays of set indices that are all distinct,
+which lets the numpy engine update a whole round of sets at once. The defaults
+fall back to the scalar methods.
+
+Policy state is strictly per set (``STATE`` names the arrays, all indexed by
+set first), so a cache split by set range and merged back ends up identical to
+one simulated serially. The ``randomized`` policies are the exception: their
+draws depend on the order sets are visited.
+"""
+import heapq
+from typing import Dict, Optional, Tuple, Type, Union
+
+import numpy as np
+
+class ReplacementPolicy:
+    name = ""
+    STATE: Tuple[str, ...] = ()
+    randomized = False  # draws from an rng shared by all sets
+
+    def __init__(self, num_sets: int, associativity: int, seed: Optional[int] = None):
+        self.num_sets = num_sets
+        self.associativity = associativity
+
+    def get_state(self, sets: slice = slice(None)) -> Dict[str, np.ndarray]:
+        return {name: getattr(self, name)[sets].copy() for name in self.STATE}
+
+    def set_state(self, state: Dict[str, np.ndarray], sets: slice = slice(None)):
+        for name in self.STATE:
+            getattr(self, name)[sets] = state[name]
+
+    def touch(self, index: int, way: int, time: int):
+        pass
+
+    def insert(self, index: int, way: int, time: int):
+        pass
+
+    def victim(self, index: int) -> int:
+        raise NotImplementedError
+
+    def touch_batch(self, index: np.ndarray, way: np.ndarray, times: np.ndarray):
+        for s, w, t in zip(index.tolist(), way.tolist(), times.tolist()):
+            self.touch(s, w, t)
+
+    def insert_batch(self, index: np.ndarray, way: np.ndarray, times: np.ndarray):
+        for s, w, t in zip(index.tolist(), way.tolist(), times.tolist()):
+            self.insert(s, w, t)
+
+    def victim_batch(self, index: np.ndarray) -> np.ndarray:
+        return np.fromiter((self.victim(s) for s in index.tolist()), dtype=np.int64, count=index.size)
+
+class LRUPolicy(ReplacementPolicy):
+    """True LRU kept as a per-set doubly linked recency list: O(1) touch and victim."""
+    name = "lru"
+    STATE = ("prev", "next", "head", "tail")
+
+    def __init__(self, num_sets: int, associativity: int, seed: Optional[int] = None):
+        super().__init__(num_sets, associativity)
+        ways = np.arange(associativity, dtype=np.int64)
+        self.prev = np.tile(ways - 1, (num_sets, 1))
+        self.next = np.tile(np.where(ways + 1 < associativity, ways + 1, -1), (num_sets, 1))
+        self.head = np.zeros(num_sets, dtype=np.int64)
+        self.tail = np.full(num_sets, associativity - 1, dtype=np.int64)
+
+    def touch(self, index: int, way: int, time: int):
+        head = self.head[index]
+        if head == way:
+            return
+        prev, next_ = self.prev[index], self.next[index]
+        p, n = prev[way], next_[way]
+        next_[p] = n
+        if n == -1:
+            self.tail[index] = p
+        else:
+            prev[n] = p
+        prev[way] = -1
+        next_[way] = head
+        prev[head] = way
+        self.head[index] = way
+
+    insert = touch
+
+    def victim(self, index: int) -> int:
+        return int(self.tail[index])
+
+    def touch_batch(self, index: np.ndarray, way: np.ndarray, times: np.ndarray):
+        head = self.head[index]
+        moving = head != way
+        s, w, h = index[moving], way[moving], head[moving]
+        p, n = self.prev[s, w], self.next[s, w]
+        self.next[s, p] = n
+        last = n == -1
+        self.tail[s[last]] = p[last]
+        self.prev[s[~last], n[~last]] = p[~last]
+        self.prev[s, w] = -1
+        self.next[s, w] = h
+        self.prev[s, h] = w
+        self.head[s] = w
+
+    insert_batch = touch_batch
+
+    def victim_batch(self, index: np.ndarray) -> np.ndarray:
+        return self.tail[index]
+
+class FIFOPolicy(ReplacementPolicy):
+    name = "fifo"
+    STATE = ("inserted", "clock")
+
+    def __init__(self, num_sets: int, associativity: int, seed: Optional[int] = None):
+        super().__init__(num_sets, associativity)
+        self.inserted = np.zeros((num_sets, associativity), dtype=np.int64)
+        self.clock = np.zeros(num_sets, dtype=np.int64)  # per-set insertion counter
+
+    def insert(self, index: int, way: int, time: int):
+        self.clock[index] += 1
+        self.inserted[index, way] = self.clock[index]
+
+    def victim(self, index: int) -> int:
+        return int(self.inserted[index].argmin())
+
+    def insert_batch(self, index: np.ndarray, way: np.ndarray, times: np.ndarray):
+        self.clock[index] += 1
+        self.inserted[index, way] = self.clock[index]
+
+    def victim_batch(self, index: np.ndarray) -> np.ndarray:
+        return self.inserted[index].argmin(axis=1)
+
+class TreePLRUPolicy(ReplacementPolicy):
+    """Tree pseudo-LRU: associativity - 1 bits per set, each pointing away from the most recent half."""
+    name = "plru"
+    STATE = ("bits",)
+
+    def __init__(self, num_sets: int, associativity: int, seed: Optional[int] = None):
+        if associativity & (associativity - 1):
+            raise ValueError(f"Tree PLRU needs a power-of-two associativity, got {associativity}")
+        super().__init__(num_sets, associativity)
+        self.depth = associativity.bit_length() - 1
+        self.bits = np.zeros((num_sets, max(associativity - 1, 1)), dtype=np.uint8)
+
+    def touch(self, index: int, way: int, time: int):
+        bits = self.bits[index]
+        node = 0
+        for level in range(self.depth - 1, -1, -1):
+            go_right = (way >> level) & 1
+            bits[node] = go_right ^ 1
+            node = 2 * node + 1 + go_right
+
+    insert = touch
+
+    def victim(self, index: int) -> int:
+        bits = self.bits[index]
+        node = way = 0
+        for _ in range(self.depth):
+            go_right = int(bits[node])
+            way = (way << 1) | go_right
+            node = 2 * node + 1 + go_right
+        return way
+
+    def touch_batch(self, index: np.ndarray, way: np.ndarray, times: np.ndarray):
+        node = np.zeros(index.size, dtype=np.int64)
+        for level in range(self.depth - 1, -1, -1):
+            go_right = (way >> level) & 1
+            self.bits[index, node] = go_right ^ 1
+            node = 2 * node + 1 + go_right
+
+    insert_batch = touch_batch
+
+    def victim_batch(self, index: np.ndarray) -> np.ndarray:
+        node = np.zeros(index.size, dtype=np.int64)
+        way = np.zeros(index.size, dtype=np.int64)
+        for _ in range(self.depth):
+            go_right = self.bits[index, node].astype(np.int64)
+            way = (way << 1) | go_right
+            node = 2 * node + 1 + go_right
+        return way
+
+class SRRIPPolicy(ReplacementPolicy):
+    """Static re-reference interval prediction with 2-bit RRPVs and hit-priority promotion."""
+    name = "srrip"
+    STATE = ("rrpv",)
+    RRPV_BITS = 2
+
+    def __init__(self, num_sets: int, associativity: int, seed: Optional[int] = None):
+        super().__init__(num_sets, associativity)
+        self.max_rrpv = (1 << self.RRPV_BITS) - 1
+        self.rrpv = np.full((num_sets, associativity), self.max_rrpv, dtype=np.uint8)
+
+    def _insert_rrpv(self, count: int):
+        return self.max_rrpv - 1
+
+    def touch(self, index: int, way: int, time: int):
+        self.rrpv[index, way] = 0
+
+    def insert(self, index: int, way: int, time: int):
+        self.rrpv[index, way] = self._insert_rrpv(1)
+
+    def victim(self, index: int) -> int:
+        row = self.rrpv[index]
+        age = self.max_rrpv - row.max()
+        if age:
+            row += age
+        return int((row == self.max_rrpv).argmax())
+
+    def touch_batch(self, index: np.ndarray, way: np.ndarray, times: np.ndarray):
+        self.rrpv[index, way] = 0
+
+    def insert_batch(self, index: np.ndarray, way: np.ndarray, times: np.ndarray):
+        self.rrpv[index, way] = self._insert_rrpv(index.size)
+
+    def victim_batch(self, index: np.ndarray) -> np.ndarray:
+        rows = self.rrpv[index]
+        rows += (self.max_rrpv - rows.max(axis=1))[:, None]
+        self.rrpv[index] = rows
+        return (rows == self.max_rrpv).argmax(axis=1)
+
+class BRRIPPolicy(SRRIPPolicy):
+    """Bimodal RRIP: inserts at distant re-reference, and only occasionally at long."""
+    name = "brrip"
+    randomized = True
+    LONG_INSERT_PROBABILITY = 1 / 32
+
+    def __init__(self, num_sets: int, associativity: int, seed: Optional[int] = None):
+        super().__init__(num_sets, associativity)
+        self.rng = np.random.default_rng(seed)
+
+    def _insert_rrpv(self, count: int):
+        long = self.rng.random(count) < self.LONG_INSERT_PROBABILITY
+        values = np.where(long, self.max_rrpv - 1, self.max_rrpv).astype(np.uint8)
+        return values[0] if count == 1 else values
+
+class LFUPolicy(ReplacementPolicy):
+    """Least frequently used, ties broken by least recent; per-set heaps give O(log n) eviction."""
+    name = "lfu"
+    STATE = ("counts", "stamps", "clock")
+
+    def __init__(self, num_sets: int, associativity: int, seed: Optional[int] = None):
+        super().__init__(num_sets, associativity)
+        self.counts = np.zeros((num_sets, associativity), dtype=np.int64)
+        self.stamps = np.zeros((num_sets, associativity), dtype=np.int64)
+        self.clock = np.zeros(num_sets, dtype=np.int64)  # per-set recency counter
+        # Heap entries are (count, stamp, way); entries that no longer match
+        # counts/stamps are stale and skipped lazily.
+        self._heaps: Dict[int, list] = {}
+
+    def set_state(self, state: Dict[str, np.ndarray], sets: slice = slice(None)):
+        super().set_state(state, sets)
+        self._heaps.clear()
+
+    def _push(self, index: int, way: int, count: int):
+        self.clock[index] += 1
+        stamp = int(self.clock[index])
+        self.counts[index, way] = count
+        self.stamps[index, way] = stamp
+        heap = self._heaps.get(index)
+        if heap is None:
+            # Dropped by set_state or the batch path: rebuild from every way, not just this one.
+            self._rebuild(index)
+            return
+        heapq.heappush(heap, (count, stamp, way))
+        if len(heap) > 4 * self.associativity:
+            self._rebuild(index)
+
+    def _rebuild(self, index: int):
+        heap = list(zip(self.counts[index].tolist(), self.stamps[index].tolist(),
+                        range(self.associativity)))
+        heapq.heapify(heap)
+        self._heaps[index] = heap
+
+    def touch(self, index: int, way: int, time: int):
+        self._push(index, way, int(self.counts[index, way]) + 1)
+
+    def insert(self, index: int, way: int, time: int):
+        self._push(index, way, 1)
+
+    def victim(self, index: int) -> int:
+        heap = self._heaps.get(index)
+        if heap is None:
+            self._rebuild(index)
+            heap = self._heaps[index]
+        counts, stamps = self.counts[index], self.stamps[index]
+        while True:
+            count, stamp, way = heapq.heappop(heap)
+            if counts[way] == count and stamps[way] == stamp:
+                return way
+
+    # The batch path works on counts/stamps directly and lets the scalar heaps
+    # be rebuilt on demand.
+    def _stamp_batch(self, index: np.ndarray, way: np.ndarray, counts: np.ndarray):
+        self.counts[index, way] = counts
+        self.clock[index] += 1
+        self.stamps[index, way] = self.clock[index]
+        self._heaps.clear()
+
+    def touch_batch(self, index: np.ndarray, way: np.ndarray, times: np.ndarray):
+        self._stamp_batch(index, way, self.counts[index, way] + 1)
+
+    def insert_batch(self, index: np.ndarray, way: np.ndarray, times: np.ndarray):
+        self._stamp_batch(index, way, 1)
+
+    def victim_batch(self, index: np.ndarray) -> np.ndarray:
+        counts = self.counts[index]
+        least = counts == counts.min(axis=1)[:, None]
+        return np.where(least, self.stamps[index], np.iinfo(np.int64).max).argmin(axis=1)
+
+class RandomPolicy(ReplacementPolicy):
+    name = "random"
+    randomized = True
+
+    def __init__(self, num_sets: int, associativity: int, seed: Optional[int] = None):
+        super().__init__(num_sets, associativity)
+        self.rng = np.random.default_rng(seed)
+
+    def victim(self, index: int) -> int:
+        return int(self.rng.integers(self.associativity))
+
+    def touch_batch(self, index: np.ndarray, way: np.ndarray, times: np.ndarray):
+        pass
+
+    def insert_batch(self, index: np.ndarray, way: np.ndarray, times: np.ndarray):
+        pass
+
+    def victim_batch(self, index: np.ndarray) -> np.ndarray:
+        return self.rng.integers(self.associativity, size=index.size)
+
+POLICIES: Dict[str, Type[ReplacementPolicy]] = {
+    cls.name: cls for cls in (LRUPolicy, FIFOPolicy, TreePLRUPolicy, SRRIPPolicy,
+                              BRRIPPolicy, LFUPolicy, RandomPolicy)
+}
+
+def make_policy(policy: Union[str, ReplacementPolicy], num_sets: int, associativity: int,
+                seed: Optional[int] = None) -> ReplacementPolicy:
+    if isinstance(policy, ReplacementPolicy):
+        return policy
+    try:
+        cls = POLICIES[policy.lower()]
+    except KeyError:
+        raise ValueError(f"Unknown replacement policy {policy!r}, expected one of {sorted(POLICIES)}") from None
+    return cls(num_sets, associativity, seed)
@@ -0,0 +1,196 @@
+"""Hardware prefetchers for Cache levels.
+
+A prefetcher watches the demand references of its level as line numbers
+(address // block_size) and returns the lines it wants fetched. The level
+installs them through its normal replacement path with the block's
+``prefetched`` bit set; the bit is cleared by the first demand hit, which
+counts the prefetch as useful.
+
+``observe`` is told whether a reference is a trigger: a demand miss or the
+first hit on a prefetched line. Next-line and stream prefetchers only act on
+triggers; the stride prefetcher trains on every reference. Traces carry no
+program counter, so the stride table is keyed by memory region (one stream per
+``region`` lines) rather than by PC.
+"""
+from collections import OrderedDict
+from dataclasses import asdict, dataclass, fields
+from typing import Any, Dict, List, Mapping, Optional, Tuple, Type, Union
+
+@dataclass
+class PrefetchStats:
+    issued: int = 0          # prefetch fills installed
+    redundant: int = 0       # requests dropped because the line was already cached
+    useful: int = 0          # prefetched lines later hit by a demand access
+    late: int = 0            # useful prefetches used before they could have arrived
+    unused: int = 0          # prefetched lines evicted without a demand hit
+    demand_misses: int = 0
+    pollution_misses: int = 0  # demand misses on lines a prefetch fill had evicted
+
+    @property
+    def accuracy(self) -> float:
+        return self.useful / self.issued if self.issued else 0.0
+
+    @property
+    def coverage(self) -> float:
+        """Share of would-be misses removed by prefetching."""
+        total = self.useful + self.demand_misses
+        return self.useful / total if total else 0.0
+
+    @property
+    def timeliness(self) -> float:
+        return (self.useful - self.late) / self.useful if self.useful else 0.0
+
+    @property
+    def pollution(self) -> float:
+        return self.pollution_misses / self.demand_misses if self.demand_misses else 0.0
+
+    def reset(self):
+        for field in fields(self):
+            setattr(self, field.name, 0)
+
+    def as_dict(self) -> Dict[str, int]:
+        return asdict(self)
+
+    def summary(self) -> Dict[str, float]:
+        return {**self.as_dict(), "accuracy": self.accuracy, "coverage": self.coverage,
+                "timeliness": self.timeliness, "pollution": self.pollution}
+
+class Prefetcher:
+    name = ""
+    OPTIONS: Tuple[str, ...] = ("degree",)
+
+    def __init__(self, degree: int = 1):
+        if degree < 1:
+            raise ValueError(f"Prefetch degree must be positive, got {degree}")
+        self.degree = degree
+
+    def observe(self, line: int, trigger: bool) -> List[int]:
+        """Train on one demand reference; returns the lines to prefetch."""
+        raise NotImplementedError
+
+    def to_config(self) -> Dict[str, Any]:
+        return {"name": self.name, **{option: getattr(self, option) for option in self.OPTIONS}}
+
+    def get_state(self) -> Dict[str, Any]:
+        """Training state as JSON-serializable values (see checkpoint.py)."""
+        return {}
+
+    def set_state(self, state: Mapping[str, Any]):
+        pass
+
+class NextLinePrefetcher(Prefetcher):
+    """Fetch the ``degree`` lines after every trigger."""
+    name = "next-line"
+
+    def observe(self, line: int, trigger: bool) -> List[int]:
+        return list(range(line + 1, line + 1 + self.degree)) if trigger else []
+
+class StridePrefetcher(Prefetcher):
+    """Reference prediction table: per region, the last line and a stride with 2-bit confidence.
+
+    Once a region's stride has repeated ``threshold`` times, each reference
+    prefetches the next ``degree`` lines along it.
+    """
+    name = "stride"
+    OPTIONS = ("degree", "table_size", "region", "threshold")
+
+    def __init__(self, degree: int = 1, table_size: int = 64, region: int = 64, threshold: int = 2):
+        super().__init__(degree)
+        self.table_size = table_size
+        self.region = region
+        self.threshold = threshold
+        # region -> [last line, stride, confidence], least recently used first
+        self.table: "OrderedDict[int, List[int]]" = OrderedDict()
+
+    def observe(self, line: int, trigger: bool) -> List[int]:
+        key = line // self.region
+        table = self.table
+        entry = table.get(key)
+        if entry is None:
+            table[key] = [line, 0, 0]
+            if len(table) > self.table_size:
+                table.popitem(last=False)
+            return []
+        table.move_to_end(key)
+        last, stride, confidence = entry
+        delta = line - last
+        if delta == 0:
+            return []
+        if delta == stride:
+            confidence = min(confidence + 1, 3)
+        else:
+            confidence = max(confidence - 1, 0)
+            if confidence == 0:
+                stride = delta
+        entry[:] = [line, stride, confidence]
+        if confidence < self.threshold:
+            return []
+        return [line + stride * k for k in range(1, self.degree + 1)]
+
+    def get_state(self) -> Dict[str, Any]:
+        return {"table": [[key, *entry] for key, entry in self.table.items()]}
+
+    def set_state(self, state: Mapping[str, Any]):
+        self.table = OrderedDict((row[0], list(row[1:])) for row in state["table"])
+
+class StreamPrefetcher(Prefetcher):
+    """Stream buffers: a trigger within ``window`` lines of a tracked stream confirms its
+    direction, then the stream runs ``degree`` lines ahead of the demand.
+
+    Up to ``streams`` streams are tracked, replaced least recently used first.
+    """
+    name = "stream"
+    OPTIONS = ("degree", "streams", "window")
+
+    def __init__(self, degree: int = 4, streams: int = 8, window: int = 4):
+        super().__init__(degree)
+        self.streams = streams
+        self.window = window
+        # Per stream: [last line, direction (0 until confirmed)], least recently used first.
+        self.buffers: List[List[int]] = []
+
+    def observe(self, line: int, trigger: bool) -> List[int]:
+        if not trigger:
+            return []
+        buffers = self.buffers
+        for position, stream in enumerate(buffers):
+            delta = line - stream[0]
+            if delta and abs(delta) <= self.window:
+                break
+        else:
+            buffers.append([line, 0])
+            if len(buffers) > self.streams:
+                buffers.pop(0)
+            return []
+        buffers.append(buffers.pop(position))
+        direction = 1 if delta > 0 else -1
+        confirmed = stream[1] == direction
+        stream[:] = [line, direction]
+        if not confirmed:
+            return []
+        return [line + direction * k for k in range(1, self.degree + 1)]
+
+    def get_state(self) -> Dict[str, Any]:
+        return {"buffers": [list(stream) for stream in self.buffers]}
+
+    def set_state(self, state: Mapping[str, Any]):
+        self.buffers = [list(stream) for stream in state["buffers"]]
+
+PREFETCHERS: Dict[str, Type[Prefetcher]] = {
+    cls.name: cls for cls in (NextLinePrefetcher, StridePrefetcher, StreamPrefetcher)
+}
+
+def make_prefetcher(prefetcher: Union[None, str, Mapping[str, Any], Prefetcher]) -> Optional[Prefetcher]:
+    """Build a prefetcher from a name or ``{"name": ..., **options}``; None disables prefetching."""
+    if prefetcher is None or isinstance(prefetcher, Prefetcher):
+        return prefetcher
+    options = {"name": prefetcher} if isinstance(prefetcher, str) else dict(prefetcher)
+    name = options.pop("name", None)
+    try:
+        cls = PREFETCHERS[str(name).lower()]
+    except KeyError:
+        raise ValueError(f"Unknown prefetcher {name!r}, expected one of {sorted(PREFETCHERS)}") from None
+    unknown = set(options) - set(cls.OPTIONS)
+    if unknown:
+        raise ValueError(f"Unknown {cls.name} prefetcher options: {sorted(unknown)}")
+    return cls(**options)
@@ -0,0 +1,213 @@
+"""Content-addressed cache of simulation results.
+
+A result is keyed by a digest of the trace records and the normalized hierarchy
+configuration (defaults filled in, the engine dropped from levels whose policy
+gives the same numbers on both engines), plus the replay options. Results live as small JSON files in a
+local directory. A hit refreshes the file's mtime, and once the directory grows
+past ``max_bytes`` the least recently used results are evicted.
+
+Trace digests are computed chunk by chunk, so streams of any length hash in
+flat memory. The digest of a trace file is remembered by path, size and
+modification time, so a repeated request doesn't even reread the trace.
+
+    store = resultcache.ResultCache("~/.cache/cachesim")
+    summary = store.simulate("app.bin", "configs/server.toml")   # simulated once, then instant
+"""
+import contextlib
+import hashlib
+import json
+import os
+import tempfile
+from typing import Any, Callable, Dict, Iterable, Iterator, Mapping, Optional, Union
+
+try:
+    import fcntl
+except ImportError:  # Windows: the digest index is rewritten without a lock
+    fcntl = None
+
+import numpy as np
+
+import mylib
+import traces
+from policies import POLICIES
+
+DEFAULT_MAX_BYTES = 64 << 20
+# Part of every key: bump whenever a simulator change alters results, so older entries stop matching.
+RESULT_VERSION = 3
+_FILE_DIGESTS = "files.json"
+_LOCK = "files.lock"
+
+def trace_digest(chunks: Iterable[np.ndarray]) -> str:
+    """Digest of the records in a stream of TRACE_DTYPE chunks (independent of chunk boundaries)."""
+    digest = hashlib.blake2b(digest_size=16)
+    for chunk in chunks:
+        digest.update(np.ascontiguousarray(chunk, dtype=traces.TRACE_DTYPE).data)
+    return digest.hexdigest()
+
+def normalize_config(config: Union[str, os.PathLike, Mapping[str, Any]]) -> Dict[str, Any]:
+    """The full configuration a hierarchy config builds, minus the engine where it doesn't matter.
+
+    Randomized policies keep it: the numpy batch kernel draws victims once per
+    round and the objects engine once per access, so seeded runs differ.
+    """
+    normalized = mylib.MultiLevelCache.from_config(config).to_config()
+    normalized["levels"] = [{key: value for key, value in level.items()
+                             if key != "engine" or POLICIES[level["policy"]].randomized}
+                            for level in normalized["levels"]]
+    return normalized
+
+def deterministic(normalized: Mapping[str, Any]) -> bool:
+    """False when an unseeded randomized policy makes every run of a normalized config differ."""
+    return not any(POLICIES[level["policy"]].randomized and level["seed"] is None
+                   for level in normalized["levels"])
+
+def _prune(index: Dict[str, str]) -> Dict[str, str]:
+    """Drop fingerprints of files that were deleted or changed since they were hashed."""
+    kept = {}
+    for fingerprint, digest in index.items():
+        path, size, mtime, _, _ = fingerprint.rsplit("|", 4)
+        try:
+            status = os.stat(path)
+        except OSError:
+            continue
+        if str(status.st_size) == size and str(status.st_mtime_ns) == mtime:
+            kept[fingerprint] = digest
+    return kept
+
+class ResultCache:
+    def __init__(self, directory: Union[str, os.PathLike], max_bytes: int = DEFAULT_MAX_BYTES):
+        self.directory = os.path.expanduser(os.fspath(directory))
+        self.max_bytes = max_bytes
+        os.makedirs(self.directory, exist_ok=True)
+        self.hits = self.misses = 0
+
+    # --- Keys ---
+
+    @staticmethod
+    def key(digest: str, normalized: Mapping[str, Any], **options: Any) -> str:
+        """Store key of a trace digest, a normalize_config() result and the run options."""
+        payload = json.dumps({"version": RESULT_VERSION, "trace": digest, "config": normalized,
+                              "options": options}, sort_keys=True)
+        return hashlib.blake2b(payload.encode(), digest_size=20).hexdigest()
+
+    def file_digest(self, path: Union[str, os.PathLike], fmt: Optional[str] = None,
+                    limit: Optional[int] = None) -> str:
+        """trace_digest() of a trace file, reused while the file is unchanged."""
+        path = os.path.abspath(os.fspath(path))
+        status = os.stat(path)
+        fingerprint = f"{path}|{status.st_size}|{status.st_mtime_ns}|{fmt}|{limit}"
+        digest = self._file_digests().get(fingerprint)
+        if digest is None:
+            chunks = traces.open_trace(path, fmt)
+            digest = trace_digest(traces._limit_chunks(chunks, limit) if limit is not None else chunks)
+            with self._locked():
+                # Re-read under the lock so concurrent writers don't drop each other's entries.
+                index = self._file_digests()
+                index[fingerprint] = digest
+                self._write(os.path.join(self.directory, _FILE_DIGESTS), _prune(index))
+        return digest
+
+    def _file_digests(self) -> Dict[str, str]:
+        try:
+            with open(os.path.join(self.directory, _FILE_DIGESTS), "r") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    @contextlib.contextmanager
+    def _locked(self) -> Iterator[None]:
+        if fcntl is None:
+            yield
+            return
+        with open(os.path.join(self.directory, _LOCK), "w") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+
+    # --- Store ---
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key + ".json")
+
+    def _write(self, path: str, document: Any):
+        # Write-then-rename so concurrent readers never see a partial file.
+        handle, temporary = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        with os.fdopen(handle, "w") as f:
+            json.dump(document, f, default=lambda value: value.tolist())
+        os.replace(temporary, path)
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        path = self._path(key)
+        try:
+            with open(path, "r") as f:
+                result = json.load(f)
+        except (OSError, ValueError):
+            self.misses += 1
+            return None
+        os.utime(path)  # mark as recently used
+        self.hits += 1
+        return result
+
+    def put(self, key: str, result: Mapping[str, Any]):
+        self._write(self._path(key), result)
+        self.evict()
+
+    def size(self) -> int:
+        return sum(entry.stat().st_size for entry in os.scandir(self.directory)
+                   if entry.name.endswith(".json") and entry.name != _FILE_DIGESTS)
+
+    def evict(self, max_bytes: Optional[int] = None) -> int:
+        """Delete least recently used results until the store fits; returns how many were removed."""
+        limit = self.max_bytes if max_bytes is None else max_bytes
+        entries = [(entry.stat().st_mtime_ns, entry.stat().st_size, entry.path)
+                   for entry in os.scandir(self.directory)
+                   if entry.name.endswith(".json") and entry.name != _FILE_DIGESTS]
+        total = sum(size for _, size, _ in entries)
+        removed = 0
+        for _, size, path in sorted(entries):
+            if total <= limit:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:  # evicted by another process
+                pass
+            total -= size
+            removed += 1
+        return removed
+
+    def clear(self):
+        self.evict(0)
+
+    # --- Memoized runs ---
+
+    def memoize(self, digest: str, config: Mapping[str, Any], run: Callable[[], Dict[str, Any]],
+                **options: Any) -> Dict[str, Any]:
+        """Stored result for (digest, config, options), or ``run()``'s result after storing it.
+
+        Configs with an unseeded randomized policy always run and are never stored.
+        """
+        normalized = normalize_config(config)
+        if not deterministic(normalized):
+            return run()
+        key = self.key(digest, normalized, **options)
+        result = self.get(key)
+        if result is None:
+            result = run()
+            self.put(key, result)
+        return result
+
+    def simulate(self, trace: Union[str, os.PathLike], config: Union[str, os.PathLike, Mapping[str, Any]],
+                 fmt: Optional[str] = None, limit: Optional[int] = None,
+                 include_ifetch: bool = True) -> Dict[str, Any]:
+        """Replay a trace file through a hierarchy config; returns the summary with the replay counts."""
+        config = mylib.load_config(config)
+
+        def run() -> Dict[str, Any]:
+            hierarchy = mylib.MultiLevelCache.from_config(config)
+            result = traces.replay(hierarchy, traces.open_trace(trace, fmt), include_ifetch=include_ifetch,
+                                   limit=limit)
+            return {"replay": {**vars(result), "hit_ratio": result.hit_ratio}, **hierarchy.summary()}
+
+        return self.memoize(self.file_digest(trace, fmt, limit), config, run, include_ifetch=include_ifetch)
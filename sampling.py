@@ -0,0 +1,200 @@
+"""Sampled simulation: estimate hit ratios from part of a trace, with confidence intervals.
+
+Set sampling keeps only the lines that map to one set in every ``ratio``: the
+rest of the trace is dropped before lookup. Because the ratio must divide
+every level's set count, each level sees all the traffic of its sampled sets
+and nothing else. Interval sampling measures ``length`` accesses out of every
+``period``. Before each window it either warms up on the ``warmup`` preceding
+accesses (state updated, not measured) and skips the rest, or, with
+``warmup=None``, keeps all state warm (functional warming) and only restricts
+what is measured.
+
+Estimates are ratio estimators over clusters: sampled sets for set sampling,
+intervals for interval sampling. The intervals use the normal approximation
+and a finite-population correction.
+
+    result = sampling.replay_set_sampled(hierarchy, traces.open_trace("trace.bin"), ratio=32)
+    result.levels["L2"]     # Estimate(value=0.61, low=0.58, high=0.64, ...)
+"""
+import math
+from dataclasses import dataclass, field
+from statistics import NormalDist
+from typing import Dict, Iterable, List, Optional, Union
+
+import numpy as np
+
+from mylib import Cache, MultiLevelCache
+from traces import OP_WRITE
+
+@dataclass
+class Estimate:
+    value: float
+    low: float
+    high: float
+    confidence: float
+    clusters: int
+
+    @property
+    def half_width(self) -> float:
+        return (self.high - self.low) / 2
+
+    def __str__(self) -> str:
+        return f"{self.value:.4f} ± {self.half_width:.4f} ({self.confidence:.0%}, {self.clusters} clusters)"
+
+def ratio_estimate(numerators, denominators, confidence: float = 0.95,
+                   population: Optional[int] = None) -> Estimate:
+    """sum(numerators) / sum(denominators) over sampled clusters, with its confidence interval.
+
+    ``population`` is the total number of clusters the sample was drawn from.
+    """
+    y = np.asarray(numerators, dtype=np.float64)
+    x = np.asarray(denominators, dtype=np.float64)
+    n = y.size
+    total = x.sum()
+    if total == 0:
+        return Estimate(math.nan, math.nan, math.nan, confidence, n)
+    ratio = float(y.sum() / total)
+    if n < 2:
+        return Estimate(ratio, math.nan, math.nan, confidence, n)
+    variance = (y - ratio * x).var(ddof=1) / (n * (total / n) ** 2)
+    if population:
+        variance *= max(0.0, 1 - n / population)
+    half = NormalDist().inv_cdf(0.5 + confidence / 2) * math.sqrt(float(variance))
+    return Estimate(ratio, ratio - half, ratio + half, confidence, n)
+
+@dataclass
+class SampledResult:
+    accesses: int = 0   # trace records seen
+    simulated: int = 0  # records actually fed to the caches (measured or warming)
+    measured: int = 0
+    levels: Dict[str, Estimate] = field(default_factory=dict)  # local hit ratio per level
+    miss_ratio: Optional[Estimate] = None  # share of accesses served by memory
+    amat: Optional[Estimate] = None        # hierarchies only
+
+    @property
+    def speedup(self) -> float:
+        """Records in the trace per record simulated."""
+        return self.accesses / self.simulated if self.simulated else math.inf
+
+class _Tally:
+    """Per-cluster sums of the served-level arrays, grown as new clusters show up."""
+
+    def __init__(self, cache: Union[Cache, MultiLevelCache]):
+        self.hierarchy = isinstance(cache, MultiLevelCache)
+        self.levels: List[Cache] = cache.levels if self.hierarchy else [cache]
+        self.latency = cache._latency if self.hierarchy else None
+        self.sums: Dict[str, np.ndarray] = {}
+
+    def _add(self, key: str, clusters: np.ndarray, weights):
+        counts = np.bincount(clusters, weights=weights, minlength=1)
+        stored = self.sums.get(key, np.zeros(0))
+        if stored.size < counts.size:
+            stored = np.concatenate([stored, np.zeros(counts.size - stored.size)])
+        stored[:counts.size] += counts
+        self.sums[key] = stored
+
+    def add(self, served: np.ndarray, level_clusters: List[np.ndarray], clusters: np.ndarray):
+        """``level_clusters[i]`` groups the accesses for level i, ``clusters`` for the whole-hierarchy metrics."""
+        for i, ids in enumerate(level_clusters):
+            self._add(f"hits{i}", ids, served == i)
+            self._add(f"reach{i}", ids, served >= i)
+        self._add("memory", clusters, served == len(self.levels))
+        self._add("accesses", clusters, None)
+        if self.latency is not None:
+            self._add("latency", clusters, self.latency[served])
+
+    def column(self, key: str, size: int) -> np.ndarray:
+        stored = self.sums.get(key, np.zeros(0))
+        return np.concatenate([stored, np.zeros(max(0, size - stored.size))])[:size]
+
+    def estimate(self, result: SampledResult, level_clusters: List[np.ndarray], clusters: np.ndarray,
+                 level_population: List[int], population: int, confidence: float):
+        """Fill the estimates of ``result`` over the sampled cluster ids given per level and overall."""
+        for i, (level, ids) in enumerate(zip(self.levels, level_clusters)):
+            size = int(ids.max()) + 1 if ids.size else 0
+            result.levels[level.name or f"L{i + 1}"] = ratio_estimate(
+                self.column(f"hits{i}", size)[ids], self.column(f"reach{i}", size)[ids],
+                confidence, level_population[i])
+        size = int(clusters.max()) + 1 if clusters.size else 0
+        accesses = self.column("accesses", size)[clusters]
+        result.miss_ratio = ratio_estimate(self.column("memory", size)[clusters], accesses, confidence, population)
+        if self.latency is not None:
+            result.amat = ratio_estimate(self.column("latency", size)[clusters], accesses, confidence, population)
+
+def _serve(cache: Union[Cache, MultiLevelCache], addresses: np.ndarray, writes: np.ndarray,
+           times: np.ndarray) -> np.ndarray:
+    if isinstance(cache, MultiLevelCache):
+        return cache.serve_batch(addresses, writes, times)
+    return (~cache.access_batch(addresses, writes, times)).astype(np.int64)
+
+# --- Set sampling ---
+
+def replay_set_sampled(cache: Union[Cache, MultiLevelCache], chunks: Iterable[np.ndarray], ratio: int = 16,
+                       offset: int = 0, confidence: float = 0.95, time: int = 0) -> SampledResult:
+    """Simulate only the sets whose index is ``offset`` modulo ``ratio`` in every level."""
+    tally = _Tally(cache)
+    levels = tally.levels
+    block_size = levels[0].block_size
+    if ratio < 1 or not 0 <= offset < ratio:
+        raise ValueError(f"Set sampling needs ratio >= 1 and 0 <= offset < ratio, got {ratio}, {offset}")
+    for level in levels:
+        if level.num_sets % ratio or level.block_size != block_size:
+            raise ValueError(f"{level.name}: set sampling needs one block size and a sampling ratio "
+                             f"dividing every level's set count ({level.num_sets} sets, ratio {ratio})")
+    result = SampledResult()
+    for chunk in chunks:
+        addresses = chunk["addr"].astype(np.int64)
+        n = addresses.size
+        keep = np.flatnonzero((addresses // block_size) % ratio == offset)
+        kept = addresses[keep]
+        served = _serve(cache, kept, chunk["op"][keep] == OP_WRITE, time + keep)
+        indices = [level.decode_batch(kept)[0] for level in levels]
+        tally.add(served, indices, indices[-1])
+        result.accesses += n
+        result.simulated += keep.size
+        result.measured += keep.size
+        time += n
+    sampled = [np.arange(offset, level.num_sets, ratio) for level in levels]
+    tally.estimate(result, sampled, sampled[-1], [level.num_sets for level in levels],
+                   levels[-1].num_sets, confidence)
+    return result
+
+# --- Interval sampling ---
+
+def replay_intervals(cache: Union[Cache, MultiLevelCache], chunks: Iterable[np.ndarray], period: int,
+                     length: int, warmup: Optional[int] = None, confidence: float = 0.95,
+                     time: int = 0) -> SampledResult:
+    """Measure the last ``length`` accesses of every ``period``.
+
+    With ``warmup`` only that many accesses before each window are simulated
+    (unmeasured) and the rest of the period is skipped; with None every access
+    is simulated and only the windows are measured.
+    """
+    if not 0 < length <= period or (warmup is not None and not 0 <= warmup <= period - length):
+        raise ValueError(f"Interval sampling needs 0 < length <= period and warmup + length <= period, "
+                         f"got period={period}, length={length}, warmup={warmup}")
+    tally = _Tally(cache)
+    start = period - length
+    skip = 0 if warmup is None else start - warmup
+    result = SampledResult()
+    position = 0
+    for chunk in chunks:
+        n = len(chunk)
+        phase = (position + np.arange(n)) % period
+        keep = np.flatnonzero(phase >= skip)
+        addresses = chunk["addr"][keep].astype(np.int64)
+        served = _serve(cache, addresses, chunk["op"][keep] == OP_WRITE, time + keep)
+        window = phase[keep] >= start
+        intervals = (position + keep[window]) // period
+        tally.add(served[window], [intervals] * len(tally.levels), intervals)
+        result.accesses += n
+        result.simulated += keep.size
+        result.measured += int(np.count_nonzero(window))
+        position += n
+        time += n
+    # Intervals whose measurement window was reached, out of every window-sized slice of the trace.
+    measured = np.arange(max(0, position - start + period - 1) // period)
+    population = -(-position // length)
+    tally.estimate(result, [measured] * len(tally.levels), measured,
+                   [population] * len(tally.levels), population, confidence)
+    return result
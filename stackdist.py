@@ -0,0 +1,172 @@
+"""Single-pass LRU stack-distance (reuse distance) analysis.
+
+The stack distance of a reference is the number of distinct lines touched since
+the previous reference to the same line. An LRU cache holding C lines misses
+exactly on the references whose distance is >= C (plus first touches), so one
+histogram gives the miss ratio of every capacity. Kept per set for a fixed set
+count, the same histogram gives the miss ratio of every associativity.
+
+Distances are counted with a Fenwick tree over access slots, O(log n) each.
+"""
+from collections import Counter
+from typing import Dict, Iterable, Optional, Sequence, Tuple
+
+import numpy as np
+
+import mylib
+
+class StackDistanceCounter:
+    """Stack distances of one reference stream."""
+
+    def __init__(self, capacity: int = 1024):
+        self._size = capacity
+        self._tree = [0] * (capacity + 1)
+        self._clock = 0
+        self._last: Dict[int, int] = {}  # line -> slot of its latest reference
+        self.histogram: Counter = Counter()
+        self.cold = 0
+        self.references = 0
+
+    def access(self, line: int) -> int:
+        """Record a reference; returns its stack distance, or -1 for a first touch."""
+        if self._clock == self._size:
+            self._compact()
+        tree, last = self._tree, self._last
+        slot = last.get(line)
+        if slot is None:
+            distance = -1
+            self.cold += 1
+        else:
+            # Live slots after ours = live lines - live slots up to and including ours.
+            i, prefix = slot + 1, 0
+            while i:
+                prefix += tree[i]
+                i &= i - 1
+            distance = len(last) - prefix
+            self.histogram[distance] += 1
+            i = slot + 1
+            while i <= self._size:
+                tree[i] -= 1
+                i += i & -i
+        slot = self._clock
+        i = slot + 1
+        while i <= self._size:
+            tree[i] += 1
+            i += i & -i
+        last[line] = slot
+        self._clock += 1
+        self.references += 1
+        return distance
+
+    def _compact(self):
+        # Renumber live slots densely so the tree only grows with the number of distinct lines.
+        ordered = sorted(self._last.items(), key=lambda item: item[1])
+        self._size = max(2 * len(ordered), 1024)
+        self._tree = [0] * (self._size + 1)
+        self._last = {}
+        for slot, (line, _) in enumerate(ordered):
+            self._last[line] = slot
+            i = slot + 1
+            while i <= self._size:
+                self._tree[i] += 1
+                i += i & -i
+        self._clock = len(ordered)
+
+    def distances(self) -> np.ndarray:
+        """Histogram as an array indexed by distance."""
+        if not self.histogram:
+            return np.zeros(0, dtype=np.int64)
+        counts = np.zeros(max(self.histogram) + 1, dtype=np.int64)
+        for distance, count in self.histogram.items():
+            counts[distance] = count
+        return counts
+
+def _miss_ratios(histogram: np.ndarray, cold: int, references: int, sizes: np.ndarray) -> np.ndarray:
+    # Misses at size c: cold misses plus every distance >= c.
+    at_least = np.concatenate([np.cumsum(histogram[::-1])[::-1], [0]])
+    misses = cold + at_least[np.minimum(sizes, histogram.size)]
+    return misses / references if references else np.zeros(sizes.size)
+
+class StackDistanceAnalyzer:
+    """Fully associative and per-set stack distances for a trace, in one pass.
+
+    ``set_counts`` lists the set counts to analyze per set; each gets a
+    miss-ratio curve over associativity. The fully associative histogram is
+    always kept and gives the curve over capacity.
+    """
+
+    def __init__(self, block_size: int = 64, set_counts: Sequence[int] = ()):
+        self.block_size = block_size
+        self.fully_associative = StackDistanceCounter()
+        self.per_set: Dict[int, Dict[int, StackDistanceCounter]] = {num_sets: {} for num_sets in set_counts}
+
+    def feed(self, addresses: Iterable[int]):
+        addresses = np.asarray(addresses, dtype=np.int64).ravel()
+        lines = (addresses // self.block_size).tolist()
+        access = self.fully_associative.access
+        for line in lines:
+            access(line)
+        for num_sets, sets in self.per_set.items():
+            index = mylib.get_index(addresses, self.block_size, num_sets).tolist()
+            tag = mylib.get_tag(addresses, self.block_size, num_sets).tolist()
+            for s, t in zip(index, tag):
+                counter = sets.get(s)
+                if counter is None:
+                    counter = sets[s] = StackDistanceCounter(64)
+                counter.access(t)
+
+    def feed_trace(self, chunks: Iterable[np.ndarray], limit: Optional[int] = None):
+        """Consume trace chunks (see traces.TRACE_DTYPE)."""
+        remaining = limit
+        for chunk in chunks:
+            addresses = chunk["addr"].astype(np.int64)
+            if remaining is not None:
+                addresses = addresses[:remaining]
+                remaining -= addresses.size
+            self.feed(addresses)
+            if remaining is not None and remaining <= 0:
+                break
+
+    @property
+    def references(self) -> int:
+        return self.fully_associative.references
+
+    def miss_ratio_curve(self, max_lines: Optional[int] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """Fully associative LRU miss ratio for every capacity: (capacities in bytes, miss ratios)."""
+        counter = self.fully_associative
+        histogram = counter.distances()
+        if max_lines is None:
+            max_lines = histogram.size + 1
+        lines = np.arange(1, max_lines + 1)
+        return lines * self.block_size, _miss_ratios(histogram, counter.cold, counter.references, lines)
+
+    def set_histogram(self, num_sets: int) -> Tuple[np.ndarray, int]:
+        """Per-set stack distances merged over all sets: (histogram, cold misses)."""
+        counters = self.per_set[num_sets].values()
+        histogram: Counter = Counter()
+        for counter in counters:
+            histogram.update(counter.histogram)
+        merged = np.zeros(max(histogram, default=-1) + 1, dtype=np.int64)
+        for distance, count in histogram.items():
+            merged[distance] = count
+        return merged, sum(counter.cold for counter in counters)
+
+    def set_miss_ratio_curve(self, num_sets: int,
+                             max_ways: Optional[int] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """LRU miss ratio of a ``num_sets``-set cache for every associativity: (ways, miss ratios)."""
+        histogram, cold = self.set_histogram(num_sets)
+        if max_ways is None:
+            max_ways = histogram.size + 1
+        ways = np.arange(1, max_ways + 1)
+        return ways, _miss_ratios(histogram, cold, self.references, ways)
+
+    def curves(self) -> Dict[str, Dict[str, list]]:
+        """All curves as plain lists, e.g. for JSON output."""
+        capacities, ratios = self.miss_ratio_curve()
+        result = {"fully_associative": {"capacity_bytes": capacities.tolist(), "miss_ratio": ratios.tolist()}}
+        for num_sets in self.per_set:
+            ways, ratios = self.set_miss_ratio_curve(num_sets)
+            result[f"sets_{num_sets}"] = {"associativity": ways.tolist(),
+                                          "capacity_bytes": (ways * num_sets * self.block_size).tolist(),
+                                          "miss_ratio": ratios.tolist()}
+        return result
@@ -0,0 +1,285 @@
+"""Design-space sweeps over one trace, fanned out across a process pool.
+
+The trace is decoded once into ``multiprocessing.shared_memory`` and every
+worker maps the same pages. Each grid point is a Cache config (a single level)
+or a MultiLevelCache config (``{"levels": [...]}``); rows stream back as they
+finish and can be appended to a JSON-lines checkpoint so an interrupted sweep
+resumes where it stopped.
+
+    python sweep.py trace.bin --grid grid.json --workers 8 --out results.csv
+"""
+import argparse
+import copy
+import csv
+import hashlib
+import itertools
+import json
+import os
+import sys
+import time
+from multiprocessing import Pool, shared_memory
+from typing import Any, Dict, Iterable, Iterator, List, Mapping, Optional, Sequence
+
+import numpy as np
+
+import mylib
+import traces
+
+METRIC_FIELDS = [
+    ("accesses", "i8"),
+    ("hits", "i8"),
+    ("miss_ratio", "f8"),
+    ("evictions", "i8"),
+    ("dirty_evictions", "i8"),
+    ("amat", "f8"),
+    ("dram_read_bytes", "i8"),
+    ("dram_write_bytes", "i8"),
+    ("seconds", "f8"),
+]
+CHUNK_SIZE = 1 << 20
+
+# --- Shared trace ---
+
+class SharedTrace:
+    """Decoded trace (int64 addresses + uint8 ops) in one shared-memory block."""
+
+    def __init__(self, shm: shared_memory.SharedMemory, length: int, owner: bool):
+        self.shm = shm
+        self.length = length
+        self.owner = owner
+        self.addresses = np.ndarray((length,), dtype=np.int64, buffer=shm.buf)
+        self.ops = np.ndarray((length,), dtype=np.uint8, buffer=shm.buf, offset=8 * length)
+        self._digest: Optional[str] = None
+
+    @classmethod
+    def create(cls, length: int) -> "SharedTrace":
+        shm = shared_memory.SharedMemory(create=True, size=max(9 * length, 1))
+        return cls(shm, length, owner=True)
+
+    @classmethod
+    def attach(cls, name: str, length: int) -> "SharedTrace":
+        return cls(shared_memory.SharedMemory(name=name), length, owner=False)
+
+    @classmethod
+    def load(cls, path: str, fmt: Optional[str] = None, limit: Optional[int] = None) -> "SharedTrace":
+        fmt = fmt or traces.detect_format(path)
+        if fmt == "bin":
+            length = (os.path.getsize(path) - len(traces.BINARY_MAGIC)) // traces.TRACE_DTYPE.itemsize
+        else:
+            length = sum(len(chunk) for chunk in traces.open_trace(path, fmt))
+        if limit is not None:
+            length = min(length, limit)
+        shared = cls.create(length)
+        position = 0
+        for chunk in traces.open_trace(path, fmt):
+            chunk = chunk[:length - position]
+            shared.addresses[position:position + len(chunk)] = chunk["addr"]
+            shared.ops[position:position + len(chunk)] = chunk["op"]
+            position += len(chunk)
+            if position == length:
+                break
+        return shared
+
+    @property
+    def name(self) -> str:
+        return self.shm.name
+
+    @property
+    def digest(self) -> str:
+        """Hash of the decoded records (so also of --limit), computed once."""
+        if self._digest is None:
+            digest = hashlib.blake2b(str(self.length).encode(), digest_size=16)
+            digest.update(self.addresses.data)
+            digest.update(self.ops.data)
+            self._digest = digest.hexdigest()
+        return self._digest
+
+    def close(self):
+        # Drop the views before closing the mapping they point into.
+        del self.addresses, self.ops
+        self.shm.close()
+        if self.owner:
+            self.shm.unlink()
+
+    def __enter__(self) -> "SharedTrace":
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+# --- Grid expansion ---
+
+def _set_path(config: Dict[str, Any], path: str, value: Any):
+    # "associativity" sets a key on a single-level config or on every level;
+    # "L2.size" (or "1.size") sets it on one level of a hierarchy.
+    head, _, rest = path.partition(".")
+    levels = config.get("levels")
+    if rest and levels is not None:
+        for position, level in enumerate(levels):
+            if level.get("name", f"L{position + 1}") == head or str(position) == head:
+                level[rest] = value
+                return
+        raise KeyError(f"No level {head!r} in sweep config")
+    if levels is not None and path not in mylib.HIERARCHY_OPTIONS:
+        for level in levels:
+            level[path] = value
+    else:
+        config[path] = value
+
+def expand_grid(base: Mapping[str, Any], grid: Mapping[str, Sequence[Any]]) -> List[Dict[str, Any]]:
+    """Cartesian product of ``grid`` values applied on top of ``base``."""
+    keys = list(grid)
+    configs = []
+    for values in itertools.product(*(grid[key] for key in keys)):
+        config = copy.deepcopy(dict(base))
+        for key, value in zip(keys, values):
+            _set_path(config, key, value)
+        configs.append({"params": dict(zip(keys, values)), "config": config})
+    return configs
+
+def config_key(config: Mapping[str, Any], trace: str = "") -> str:
+    """Row key of a grid point; ``trace`` (a SharedTrace digest) keeps rows from other traces apart."""
+    return hashlib.sha1((trace + json.dumps(config, sort_keys=True)).encode()).hexdigest()[:16]
+
+def build_hierarchy(config: Mapping[str, Any]) -> mylib.MultiLevelCache:
+    """A Cache config becomes a one-level hierarchy so every point reports the same metrics."""
+    if "levels" not in config:
+        config = {"levels": [dict(config)]}
+    return mylib.MultiLevelCache.from_config(config)
+
+# --- Workers ---
+
+_worker_trace: Optional[SharedTrace] = None
+
+def _init_worker(name: str, length: int):
+    global _worker_trace
+    _worker_trace = SharedTrace.attach(name, length)
+
+def simulate(config: Mapping[str, Any], addresses: np.ndarray, ops: np.ndarray) -> Dict[str, Any]:
+    hierarchy = build_hierarchy(config)
+    start = time.perf_counter()
+    hits = 0
+    for begin in range(0, addresses.size, CHUNK_SIZE):
+        chunk_ops = ops[begin:begin + CHUNK_SIZE]
+        hits += int(np.count_nonzero(hierarchy.access_batch(
+            addresses[begin:begin + CHUNK_SIZE], chunk_ops == traces.OP_WRITE, begin)))
+    stats = hierarchy.hierarchy_stats
+    return {
+        "accesses": stats.accesses,
+        "hits": hits,
+        "miss_ratio": 1 - hits / stats.accesses if stats.accesses else 0.0,
+        "evictions": sum(level.stats.evictions for level in hierarchy.levels),
+        "dirty_evictions": sum(level.stats.dirty_evictions for level in hierarchy.levels),
+        "amat": stats.amat,
+        "dram_read_bytes": stats.dram_read_bytes,
+        "dram_write_bytes": stats.dram_write_bytes,
+        "seconds": time.perf_counter() - start,
+    }
+
+def _run_point(point: Dict[str, Any]) -> Dict[str, Any]:
+    metrics = simulate(point["config"], _worker_trace.addresses, _worker_trace.ops)
+    return {"key": point["key"], "params": point["params"], **metrics}
+
+# --- Sweep ---
+
+def _load_checkpoint(path: Optional[str]) -> Dict[str, Dict[str, Any]]:
+    done = {}
+    if path and os.path.exists(path):
+        with open(path, "r") as f:
+            for line in f:
+                line = line.strip()
+                if line:
+                    row = json.loads(line)
+                    done[row["key"]] = row
+    return done
+
+def sweep(trace: SharedTrace, points: Iterable[Mapping[str, Any]], workers: Optional[int] = None,
+          checkpoint: Optional[str] = None) -> Iterator[Dict[str, Any]]:
+    """Yield one result row per grid point as workers finish.
+
+    Points already present in ``checkpoint`` are yielded from it without being
+    re-simulated; new rows are appended to it as they arrive.
+    """
+    done = _load_checkpoint(checkpoint)
+    pending = []
+    for point in points:
+        key = config_key(point["config"], trace.digest)
+        if key in done:
+            yield done[key]
+        else:
+            pending.append({**point, "key": key})
+    if not pending:
+        return
+    log = open(checkpoint, "a") if checkpoint else None
+    try:
+        with Pool(workers, initializer=_init_worker, initargs=(trace.name, trace.length)) as pool:
+            for row in pool.imap_unordered(_run_point, pending):
+                if log:
+                    log.write(json.dumps(row) + "\n")
+                    log.flush()
+                yield row
+    finally:
+        if log:
+            log.close()
+
+def _column_dtype(values: Sequence[Any]) -> str:
+    if all(isinstance(v, bool) for v in values):
+        return "?"
+    if all(isinstance(v, int) and not isinstance(v, bool) for v in values):
+        return "i8"
+    if all(isinstance(v, (int, float)) and not isinstance(v, bool) for v in values):
+        return "f8"
+    return f"U{max(len(str(v)) for v in values)}"
+
+def to_table(rows: Sequence[Mapping[str, Any]]) -> np.ndarray:
+    """Result rows as a structured array: key, one column per swept parameter, then metrics."""
+    params = list(rows[0]["params"]) if rows else []
+    dtype = [("key", "U16")]
+    dtype += [(name, _column_dtype([row["params"][name] for row in rows])) for name in params]
+    dtype += METRIC_FIELDS
+    table = np.zeros(len(rows), dtype=dtype)
+    for i, row in enumerate(rows):
+        table[i] = (row["key"], *(row["params"][name] for name in params),
+                    *(row[name] for name, _ in METRIC_FIELDS))
+    return table
+
+def run_sweep(trace: SharedTrace, base: Mapping[str, Any], grid: Mapping[str, Sequence[Any]],
+              workers: Optional[int] = None, checkpoint: Optional[str] = None) -> np.ndarray:
+    points = expand_grid(base, grid)
+    order = {config_key(point["config"], trace.digest): i for i, point in enumerate(points)}
+    rows = sorted(sweep(trace, points, workers, checkpoint), key=lambda row: order.get(row["key"], len(order)))
+    return to_table(rows)
+
+def write_csv(table: np.ndarray, path: str):
+    with open(path, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(table.dtype.names)
+        writer.writerows(row.tolist() for row in table)
+
+# --- CLI ---
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Sweep cache configurations over one trace.")
+    parser.add_argument("trace", help="trace file (din, lackey or binary)")
+    parser.add_argument("--grid", required=True,
+                        help='JSON/TOML file with "base" config and "grid" of parameter lists')
+    parser.add_argument("--format", choices=traces.FORMATS, help="trace format (detected by default)")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: all cores)")
+    parser.add_argument("--limit", type=int, default=None, help="only use the first N references")
+    parser.add_argument("--checkpoint", help="JSON-lines file used to resume an interrupted sweep")
+    parser.add_argument("--out", help="write results to this CSV file (default: stdout)")
+    args = parser.parse_args(argv)
+
+    spec = mylib.load_config(args.grid)
+    with SharedTrace.load(args.trace, args.format, args.limit) as trace:
+        table = run_sweep(trace, spec.get("base", {}), spec.get("grid", {}), args.workers, args.checkpoint)
+    if args.out:
+        write_csv(table, args.out)
+    else:
+        writer = csv.writer(sys.stdout)
+        writer.writerow(table.dtype.names)
+        writer.writerows(row.tolist() for row in table)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,21 @@
+import numpy as np
+import pytest
+
+import mylib
+
+@pytest.mark.parametrize("write_policy", ("write-back", "write-through"))
+def test_hot_set_batch_matches_objects_engine(write_policy):
+    # Wide rounds first, then a long tail on two hot sets that runs per access.
+    rng = np.random.default_rng(3)
+    spread = rng.integers(0, 1 << 14, 2000) * 64
+    hot = (rng.integers(0, 40, 3000) * 64 * 64) | (rng.integers(0, 2, 3000) * 64)
+    addresses = np.concatenate([spread, hot, spread[:500]])
+    writes = rng.random(addresses.size) < 0.3
+    caches = [mylib.Cache(64, 4, 64, engine=engine, write_policy=write_policy, write_allocate=False)
+              for engine in ("numpy", "objects")]
+    hits = [cache.access_batch(addresses, writes, 0) for cache in caches]
+    np.testing.assert_array_equal(hits[0], hits[1])
+    assert caches[0].stats == caches[1].stats
+    states = [cache.get_state(policy=False) for cache in caches]
+    for name in mylib.Cache.STATE_ARRAYS:
+        np.testing.assert_array_equal(states[0][name], states[1][name])
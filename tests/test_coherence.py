@@ -0,0 +1,54 @@
+import numpy as np
+
+import coherence
+import traces
+import workloads
+
+SMALL = {"private": [{"size": "1KiB", "associativity": 2}, {"size": "4KiB", "associativity": 4}],
+         "shared": [{"size": "16KiB", "associativity": 8}], "engine": "numpy", "cores": 4}
+
+def _trace(seed=1):
+    streams = []
+    for core in range(4):
+        own = workloads.strided(6000, stride=64, footprint=1 << 20, base=(core + 1) << 30, seed=seed + core)
+        shared = workloads.uniform(2000, footprint=4096, seed=seed, write_ratio=0.3)
+        streams.append(workloads.interleave([own, shared], seed=core))
+    return np.concatenate(list(workloads.interleave(streams, cores=True, chunk_size=5000)))
+
+def _records(cores, lines, writes=False):
+    records = np.zeros(len(lines), dtype=traces.CORE_TRACE_DTYPE)
+    records["core"], records["addr"], records["op"] = cores, np.asarray(lines) * 64, writes
+    return records
+
+def _forced(config):
+    system = coherence.MultiCoreCache.from_config({**config, "batch_threshold": 10 ** 9})
+    system._coherent = lambda cores, lines, writes: np.ones(cores.size, dtype=bool)
+    return system
+
+def test_write_to_shared_line_after_sharer_evicted_is_an_upgrade():
+    # Core 1 evicts its copy of line 0, leaving core 0 alone in S; its next write still upgrades.
+    chunks = [_records([0, 1], [0, 0]), _records(1, np.arange(1, 65)), _records([0], [0], True)]
+    for system in (coherence.MultiCoreCache.from_config(SMALL), _forced(SMALL)):
+        coherence.replay(system, chunks)
+        assert system.stats.upgrades == 1
+        assert system.directory[0] == (1, True)
+
+def test_directory_drops_lines_no_core_holds():
+    system = coherence.MultiCoreCache.from_config(SMALL)
+    coherence.replay(system, np.array_split(_trace(), 4))
+    lines = sum(level.num_sets * level.associativity for level in system.cores[0].levels) * 4
+    assert len(system.directory) <= lines
+    for line, (mask, _) in system.directory.items():
+        for core in range(4):
+            if mask >> core & 1:
+                assert system._resident(core, np.array([line * system.line_size]))[0]
+
+def test_pruned_directory_matches_per_access_coherence():
+    records = np.array_split(_trace(2), 3)
+    batched = coherence.MultiCoreCache.from_config(SMALL)
+    serial = _forced(SMALL)
+    assert coherence.replay(batched, records) == coherence.replay(serial, records)
+    summaries = [system.summary() for system in (batched, serial)]
+    for summary in summaries:
+        summary["coherence"].pop("coherence_events")
+    assert summaries[0] == summaries[1]
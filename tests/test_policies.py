@@ -0,0 +1,54 @@
+import numpy as np
+import pytest
+
+import checkpoint
+import mylib
+
+DETERMINISTIC = ("lru", "fifo", "plru", "srrip", "lfu")
+
+def _mixed_run(cache: mylib.Cache, addresses: np.ndarray):
+    # Alternate batches and scalar accesses so the policy crosses between both paths.
+    time = 0
+    for start in range(0, addresses.size, 64):
+        batch = addresses[start:start + 48]
+        cache.access_batch(batch, False, time)
+        time += batch.size
+        for address in addresses[start + 48:start + 64].tolist():
+            cache.read(address, time)
+            time += 1
+
+@pytest.mark.parametrize("policy", DETERMINISTIC)
+def test_mixed_batch_and_scalar_match_objects_engine(policy):
+    addresses = np.random.default_rng(1).integers(0, 48, 4096) * 64
+    caches = [mylib.Cache(4, 4, 64, engine=engine, policy=policy) for engine in ("numpy", "objects")]
+    for cache in caches:
+        _mixed_run(cache, addresses)
+    reference = mylib.Cache(4, 4, 64, engine="objects", policy=policy)
+    for i, address in enumerate(addresses.tolist()):
+        reference.read(address, i)
+    states = [cache.get_state(policy=False) for cache in caches + [reference]]
+    for state in states[1:]:
+        for name in ("tags", "valid"):
+            np.testing.assert_array_equal(states[0][name], state[name])
+    assert caches[0].stats == caches[1].stats == reference.stats
+
+def test_lfu_scalar_victim_after_batch():
+    cache = mylib.Cache(1, 4, 64, engine="numpy", policy="lfu")
+    cache.access_batch(np.array([0, 64, 128, 192, 0, 64, 128, 0, 64]), False, 0)
+    cache.read(0, 100)    # scalar hit right after the batch
+    cache.read(256, 101)  # line 3 has the lowest count
+    assert sorted(cache.get_state()["tags"][0].tolist()) == [0, 1, 2, 4]
+
+@pytest.mark.parametrize("engine", ("numpy", "objects"))
+def test_lfu_checkpoint_round_trip(tmp_path, engine):
+    addresses = np.random.default_rng(2).integers(0, 48, 6000) * 64
+    warm, rest = addresses[:3000], addresses[3000:]
+    straight = mylib.Cache(8, 4, 64, engine=engine, policy="lfu")
+    straight.access_batch(warm, False, 0)
+    saved = tmp_path / "lfu.npz"
+    checkpoint.save(straight, saved, time=warm.size)
+    restored, time = checkpoint.load(saved)
+    for cache in (straight, restored):
+        for i, address in enumerate(rest.tolist()):
+            cache.read(address, time + i)
+    assert straight.stats == restored.stats
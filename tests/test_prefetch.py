@@ -0,0 +1,27 @@
+import os
+
+import mylib
+import traces
+import workloads
+
+SERVER = os.path.join(os.path.dirname(__file__), os.pardir, "configs", "server.toml")
+
+def _stream_l2(prefetch_latency=None):
+    config = mylib.load_config(SERVER)
+    config["levels"][1].update(prefetcher={"name": "stream", "degree": 8}, prefetch_latency=prefetch_latency)
+    hierarchy = mylib.MultiLevelCache.from_config(config)
+    traces.replay(hierarchy, workloads.strided(50000, stride=8))
+    return hierarchy
+
+def test_stream_prefetches_are_timely_on_a_sequential_scan():
+    # 8 lines ahead at 8 accesses per line covers the fill latency at this AMAT.
+    hierarchy = _stream_l2()
+    stats = hierarchy.L2.prefetch_stats
+    assert stats.useful > 0 and stats.timeliness > 0.9
+    assert hierarchy.L2.late_window() < hierarchy.L2.fill_cycles
+
+def test_configured_prefetch_latency_is_in_accesses():
+    assert _stream_l2(prefetch_latency=100).L2.prefetch_stats.timeliness == 0.0
+    hierarchy = _stream_l2(prefetch_latency=10)
+    assert hierarchy.L2.prefetch_stats.timeliness > 0.9
+    assert hierarchy.to_config()["levels"][1]["prefetch_latency"] == 10
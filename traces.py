@@ -0,0 +1,215 @@
+"""Streaming memory-trace readers and headless replay.
+
+Every reader yields chunks of at most ``chunk_size`` records as NumPy structured
+arrays of ``TRACE_DTYPE`` so replay memory stays flat whatever the trace length.
+Text readers reuse one buffer per stream; the binary reader hands out zero-copy
+views of a memory-mapped file. Consumers must not keep a chunk past the next one.
+"""
+from dataclasses import dataclass
+from typing import Iterable, Iterator, Optional
+
+import numpy as np
+
+# --- Record format ---
+
+OP_READ = 0
+OP_WRITE = 1
+OP_IFETCH = 2
+
+# Packed op+address records: 9 bytes each, no padding.
+TRACE_DTYPE = np.dtype([("op", "u1"), ("addr", "<u8")])
+# Multi-core traces add the issuing core (see coherence.py).
+CORE_TRACE_DTYPE = np.dtype([("core", "<u2"), ("op", "u1"), ("addr", "<u8")])
+BINARY_MAGIC = b"CTRACE1\0"
+DEFAULT_CHUNK_SIZE = 1 << 20
+
+FORMATS = ("din", "lackey", "bin")
+
+_LACKEY_OPS = {"L": (OP_READ,), "S": (OP_WRITE,), "M": (OP_READ, OP_WRITE), "I": (OP_IFETCH,)}
+
+def _chunks_from_records(records: Iterable, chunk_size: int) -> Iterator[np.ndarray]:
+    buffer = np.empty(chunk_size, dtype=TRACE_DTYPE)
+    ops, addrs = buffer["op"], buffer["addr"]
+    n = 0
+    for op, addr in records:
+        ops[n] = op
+        addrs[n] = addr
+        n += 1
+        if n == chunk_size:
+            yield buffer
+            n = 0
+    if n:
+        yield buffer[:n]
+
+# --- Text formats ---
+
+def _din_records(lines: Iterable[str]):
+    for line in lines:
+        fields = line.split()
+        if len(fields) < 2:
+            continue
+        label = int(fields[0])
+        # Dinero labels: 0 read, 1 write, 2 ifetch, 3 escape, 4 cache flush.
+        if label <= OP_IFETCH:
+            yield label, int(fields[1], 16)
+
+def _lackey_records(lines: Iterable[str]):
+    for line in lines:
+        if line.startswith("=="):
+            continue
+        fields = line.split()
+        if len(fields) != 2:
+            continue
+        ops = _LACKEY_OPS.get(fields[0])
+        if ops is None:
+            continue
+        addr = int(fields[1].split(",", 1)[0], 16)
+        for op in ops:
+            yield op, addr
+
+def read_din(path: str, chunk_size: int = DEFAULT_CHUNK_SIZE) -> Iterator[np.ndarray]:
+    """Stream a Dinero ``din`` trace (``label hex_address [size]`` per line)."""
+    with open(path, "r") as f:
+        yield from _chunks_from_records(_din_records(f), chunk_size)
+
+def read_lackey(path: str, chunk_size: int = DEFAULT_CHUNK_SIZE) -> Iterator[np.ndarray]:
+    """Stream Valgrind ``--tool=lackey --trace-mem=yes`` output. ``M`` lines count as a read then a write."""
+    with open(path, "r") as f:
+        yield from _chunks_from_records(_lackey_records(f), chunk_size)
+
+def read_multicore(path: str, chunk_size: int = DEFAULT_CHUNK_SIZE) -> Iterator[np.ndarray]:
+    """Stream a multi-core text trace: ``core label hex_address`` per line, labels as in din."""
+    buffer = np.empty(chunk_size, dtype=CORE_TRACE_DTYPE)
+    cores, ops, addrs = buffer["core"], buffer["op"], buffer["addr"]
+    n = 0
+    with open(path, "r") as f:
+        for line in f:
+            fields = line.split()
+            if len(fields) < 3 or int(fields[1]) > OP_IFETCH:
+                continue
+            cores[n] = int(fields[0])
+            ops[n] = int(fields[1])
+            addrs[n] = int(fields[2], 16)
+            n += 1
+            if n == chunk_size:
+                yield buffer
+                n = 0
+    if n:
+        yield buffer[:n]
+
+# --- Binary format ---
+
+def read_binary(path: str, chunk_size: int = DEFAULT_CHUNK_SIZE) -> Iterator[np.ndarray]:
+    """Stream a packed binary trace as zero-copy views of a memory map."""
+    with open(path, "rb") as f:
+        if f.read(len(BINARY_MAGIC)) != BINARY_MAGIC:
+            raise ValueError(f"{path} is not a binary cache trace")
+    records = np.memmap(path, dtype=TRACE_DTYPE, mode="r", offset=len(BINARY_MAGIC))
+    for start in range(0, records.shape[0], chunk_size):
+        yield records[start:start + chunk_size]
+
+def write_binary(path: str, chunks: Iterable[np.ndarray]) -> int:
+    """Write chunks of TRACE_DTYPE records to a binary trace; returns the record count."""
+    count = 0
+    with open(path, "wb") as f:
+        f.write(BINARY_MAGIC)
+        for chunk in chunks:
+            np.ascontiguousarray(chunk, dtype=TRACE_DTYPE).tofile(f)
+            count += len(chunk)
+    return count
+
+def detect_format(path: str) -> str:
+    with open(path, "rb") as f:
+        head = f.read(4096)
+    if head.startswith(BINARY_MAGIC):
+        return "bin"
+    for line in head.decode("ascii", errors="replace").splitlines():
+        fields = line.split()
+        if not fields or line.startswith("=="):
+            continue
+        return "lackey" if fields[0] in _LACKEY_OPS else "din"
+    raise ValueError(f"Cannot detect trace format of {path}")
+
+def open_trace(path: str, fmt: Optional[str] = None,
+               chunk_size: int = DEFAULT_CHUNK_SIZE) -> Iterator[np.ndarray]:
+    fmt = fmt or detect_format(path)
+    if fmt == "din":
+        return read_din(path, chunk_size)
+    if fmt == "lackey":
+        return read_lackey(path, chunk_size)
+    if fmt == "bin":
+        return read_binary(path, chunk_size)
+    raise ValueError(f"Unknown trace format {fmt!r}, expected one of {FORMATS}")
+
+def convert(src: str, dst: str, fmt: Optional[str] = None,
+            chunk_size: int = DEFAULT_CHUNK_SIZE) -> int:
+    """Convert a text trace to the binary format."""
+    return write_binary(dst, open_trace(src, fmt, chunk_size))
+
+# --- Replay ---
+
+@dataclass
+class ReplayResult:
+    accesses: int = 0
+    reads: int = 0
+    writes: int = 0
+    hits: int = 0
+    end_time: int = 0
+
+    @property
+    def misses(self) -> int:
+        return self.accesses - self.hits
+
+    @property
+    def hit_ratio(self) -> float:
+        return self.hits / self.accesses if self.accesses else 0.0
+
+def replay(cache, chunks: Iterable[np.ndarray], time: int = 0,
+           include_ifetch: bool = True, batched: bool = True,
+           limit: Optional[int] = None) -> ReplayResult:
+    """Drive a Cache or MultiLevelCache with a stream of trace chunks.
+
+    Each record gets its own timestamp starting at ``time``. With ``batched``
+    the chunks go through ``access_batch``; otherwise through the per-call
+    access_memory/write_memory (or read/write) API.
+    """
+    result = ReplayResult(end_time=time)
+    if limit is not None:
+        chunks = _limit_chunks(chunks, limit)
+    for chunk in chunks:
+        ops, addrs = chunk["op"], chunk["addr"]
+        if not include_ifetch:
+            keep = ops != OP_IFETCH
+            ops, addrs = ops[keep], addrs[keep]
+        writes = ops == OP_WRITE
+        n = addrs.shape[0]
+        if batched:
+            hits = int(np.count_nonzero(cache.access_batch(addrs.astype(np.int64), writes, result.end_time)))
+        else:
+            hits = _replay_per_call(cache, addrs, writes, result.end_time)
+        nwrites = int(np.count_nonzero(writes))
+        result.accesses += n
+        result.writes += nwrites
+        result.reads += n - nwrites
+        result.hits += hits
+        result.end_time += n
+    return result
+
+def _limit_chunks(chunks: Iterable[np.ndarray], limit: int) -> Iterator[np.ndarray]:
+    remaining = limit
+    for chunk in chunks:
+        if remaining <= 0:
+            return
+        chunk = chunk[:remaining]
+        remaining -= len(chunk)
+        yield chunk
+
+def _replay_per_call(cache, addrs: np.ndarray, writes: np.ndarray, time: int) -> int:
+    read = getattr(cache, "access_memory", None) or cache.read
+    write = getattr(cache, "write_memory", None) or cache.write
+    hits = 0
+    for addr, is_write in zip(addrs.tolist(), writes.tolist()):
+        # No callback, so no per-level message is formatted.
+        hits += (write if is_write else read)(addr, time, None)
+        time += 1
+    return hits
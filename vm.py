@@ -0,0 +1,294 @@
+"""Virtual-memory front end: TLBs and radix page walks in front of a MultiLevelCache.
+
+Addresses fed to VirtualMemory are virtual. Each access is looked up in the
+TLB levels (plain Cache objects whose "blocks" are pages); a miss in all of
+them walks an x86-64 style four-level radix page table, and every page-table
+entry read goes through the data hierarchy like any load, competing with the
+program's own lines. The translated physical address then accesses the data
+hierarchy.
+
+Pages are 4 KiB, 2 MiB or 1 GiB: ``page_size`` sets the default and
+``huge_pages`` maps virtual ranges to other sizes, so a transparent-huge-page
+run is just ``page_size="2M"``. Physical frames are allocated on first touch,
+data and page tables from separate regions.
+
+    memory = VirtualMemory(hierarchy, page_size="2M")
+    traces.replay(memory, chunks)
+    memory.summary()
+"""
+from dataclasses import asdict, dataclass, fields
+from typing import Any, Dict, List, Mapping, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+import mylib
+
+PAGE_SIZES = {"4K": 1 << 12, "2M": 1 << 21, "1G": 1 << 30}
+# Page-table levels walked per page size (x86-64 four-level paging, 9 index bits per level).
+WALK_LEVELS = {"4K": 4, "2M": 3, "1G": 2}
+PTE_SIZE = 8
+# Physical memory: data frames from 0 upwards, page-table pages from here upwards.
+PAGE_TABLE_BASE = 1 << 44
+_CLASS_SHIFT = 52  # TLB key = page size class << 52 | virtual page number
+
+@dataclass
+class TLBConfig:
+    name: str
+    entries: int
+    associativity: int
+    page_sizes: Sequence[str] = ("4K",)
+    level: int = 1  # lookup order: every level-1 TLB first, then level 2, ...
+    hit_latency: int = 1
+    policy: str = "lru"
+
+    @classmethod
+    def from_dict(cls, data: Mapping[str, Any]) -> "TLBConfig":
+        unknown = set(data) - {field.name for field in fields(cls)}
+        if unknown:
+            raise ValueError(f"Unknown TLB options: {sorted(unknown)}")
+        config = cls(**data)
+        config.validate()
+        return config
+
+    def validate(self):
+        if self.entries < 1 or self.associativity < 1 or self.entries % self.associativity:
+            raise ValueError(f"{self.name}: entries ({self.entries}) must be a positive multiple "
+                             f"of associativity ({self.associativity})")
+        unknown = set(self.page_sizes) - set(PAGE_SIZES)
+        if unknown:
+            raise ValueError(f"{self.name}: unknown page sizes {sorted(unknown)}, expected {sorted(PAGE_SIZES)}")
+
+    def build(self) -> mylib.Cache:
+        return mylib.Cache(self.entries // self.associativity, self.associativity, 1, engine="numpy",
+                           name=self.name, policy=self.policy, hit_latency=self.hit_latency)
+
+# Roughly a recent x86 core: split first-level DTLBs, a unified second-level STLB.
+DEFAULT_TLBS = (
+    TLBConfig("DTLB-4K", 64, 4, ("4K",)),
+    TLBConfig("DTLB-2M", 32, 4, ("2M",)),
+    TLBConfig("DTLB-1G", 4, 4, ("1G",)),
+    TLBConfig("STLB", 1536, 12, ("4K", "2M"), level=2, hit_latency=7),
+    TLBConfig("STLB-1G", 16, 4, ("1G",), level=2, hit_latency=7),
+)
+
+@dataclass
+class VMStats:
+    accesses: int = 0
+    walks: int = 0
+    walk_latency: int = 0         # cycles spent reading page-table entries
+    translation_latency: int = 0  # TLB lookups plus walks
+    data_latency: int = 0
+
+    @property
+    def avg_walk_latency(self) -> float:
+        return self.walk_latency / self.walks if self.walks else 0.0
+
+    @property
+    def walk_rate(self) -> float:
+        return self.walks / self.accesses if self.accesses else 0.0
+
+    @property
+    def amat(self) -> float:
+        """Average cycles per access including address translation."""
+        return (self.translation_latency + self.data_latency) / self.accesses if self.accesses else 0.0
+
+    def reset(self):
+        for field in fields(self):
+            setattr(self, field.name, 0)
+
+    def as_dict(self) -> Dict[str, int]:
+        return asdict(self)
+
+class VirtualMemory:
+    def __init__(self, hierarchy: mylib.MultiLevelCache,
+                 tlbs: Sequence[Union[TLBConfig, Mapping[str, Any]]] = DEFAULT_TLBS,
+                 page_size: str = "4K", huge_pages: Sequence[Tuple[int, int, str]] = ()):
+        if page_size not in PAGE_SIZES:
+            raise ValueError(f"Unknown page size {page_size!r}, expected one of {sorted(PAGE_SIZES)}")
+        for start, end, size in huge_pages:
+            if size not in PAGE_SIZES or start % PAGE_SIZES[size] or end % PAGE_SIZES[size]:
+                raise ValueError(f"Huge-page range {start:#x}-{end:#x} must use a known page size "
+                                 f"and be aligned to it, got {size!r}")
+        self.hierarchy = hierarchy
+        self.page_size = page_size
+        self.huge_pages = list(huge_pages)
+        configs = [tlb if isinstance(tlb, TLBConfig) else TLBConfig.from_dict(tlb) for tlb in tlbs]
+        self.tlbs = [config.build() for config in configs]
+        # Per lookup level, per page size: the TLB that caches it there.
+        self._levels: List[Dict[str, mylib.Cache]] = []
+        for level in sorted({config.level for config in configs}):
+            by_size = {}
+            for config, tlb in zip(configs, self.tlbs):
+                if config.level == level:
+                    by_size.update({size: tlb for size in config.page_sizes if size not in by_size})
+            self._levels.append(by_size)
+        self.stats = VMStats()
+        self.frames: Dict[int, int] = {}  # TLB key -> physical base of the page
+        self._next_frame = 0
+        self._root = PAGE_TABLE_BASE
+        self._tables: Dict[Tuple[int, int], int] = {}  # (depth, virtual prefix) -> table page
+        self._next_table = PAGE_TABLE_BASE + PAGE_SIZES["4K"]
+
+    # --- Pages ---
+
+    def page_size_of(self, address: int) -> str:
+        for start, end, size in self.huge_pages:
+            if start <= address < end:
+                return size
+        return self.page_size
+
+    @staticmethod
+    def _key(address: int, size: str) -> int:
+        return _SIZE_CLASS[size] << _CLASS_SHIFT | address >> _SHIFT[size]
+
+    def _frame(self, key: int) -> int:
+        frame = self.frames.get(key)
+        if frame is None:
+            size = PAGE_SIZES[_CLASS_SIZE[key >> _CLASS_SHIFT]]
+            frame = -(-self._next_frame // size) * size
+            self._next_frame = frame + size
+            self.frames[key] = frame
+        return frame
+
+    def walk_addresses(self, address: int, size: str) -> List[int]:
+        """Physical addresses of the PTEs read to translate ``address``, root first."""
+        depth_count = WALK_LEVELS[size]
+        ptes, table = [], self._root
+        for depth in range(depth_count):
+            shift = 39 - 9 * depth
+            ptes.append(table + ((address >> shift) & 511) * PTE_SIZE)
+            if depth + 1 < depth_count:
+                node = (depth + 1, address >> shift)
+                table = self._tables.get(node)
+                if table is None:
+                    table = self._tables[node] = self._next_table
+                    self._next_table += PAGE_SIZES["4K"]
+        return ptes
+
+    # --- Per access ---
+
+    def translate(self, address: int, time: int) -> int:
+        """Physical address of ``address``, looking up the TLBs and walking on a miss."""
+        size = self.page_size_of(address)
+        key = self._key(address, size)
+        stats = self.stats
+        for by_size in self._levels:
+            tlb = by_size.get(size)
+            if tlb is None:
+                continue
+            stats.translation_latency += tlb.hit_latency
+            if tlb.read(key, time):
+                break
+        else:
+            latency = self.hierarchy._latency
+            walk = sum(int(latency[self.hierarchy._access(pte, time, False)])
+                       for pte in self.walk_addresses(address, size))
+            stats.walks += 1
+            stats.walk_latency += walk
+            stats.translation_latency += walk
+        return self._frame(key) + (address & (PAGE_SIZES[size] - 1))
+
+    def access_memory(self, address: int, time: int, callback=None) -> bool:
+        return self._access(address, time, False, callback)
+
+    def write_memory(self, address: int, time: int, callback=None) -> bool:
+        return self._access(address, time, True, callback)
+
+    def _access(self, address: int, time: int, is_write: bool, callback) -> bool:
+        physical = self.translate(address, time)
+        served = self.hierarchy._access(physical, time, is_write, callback)
+        self.stats.accesses += 1
+        self.stats.data_latency += int(self.hierarchy._latency[served])
+        return served < len(self.hierarchy.levels)
+
+    # --- Batches ---
+
+    def access_batch(self, addresses, is_write: Union[bool, np.ndarray] = False,
+                     time: Union[int, np.ndarray] = 0) -> np.ndarray:
+        """Translate and simulate a chunk of virtual accesses; returns the data hit mask.
+
+        Same results as the per-access API: the TLB levels run as batches, the
+        walks are expanded into PTE reads placed before their access, and the
+        merged stream goes through the hierarchy in one batch.
+        """
+        addresses, writes, times = mylib._batch_arguments(addresses, is_write, time)
+        n = addresses.size
+        stats = self.stats
+        sizes = np.full(n, _SIZE_CLASS[self.page_size], dtype=np.int64)
+        for start, end, size in self.huge_pages:
+            sizes[(addresses >= start) & (addresses < end)] = _SIZE_CLASS[size]
+        shifts = _SHIFTS[sizes]
+        keys = sizes << _CLASS_SHIFT | addresses >> shifts
+
+        # Frames in first-touch order, as the per-access path allocates them.
+        unique, first, inverse = np.unique(keys, return_index=True, return_inverse=True)
+        bases = np.empty(unique.size, dtype=np.int64)
+        for i in np.argsort(first, kind="stable").tolist():
+            bases[i] = self._frame(int(unique[i]))
+        physical = bases[inverse] + (addresses & ((np.int64(1) << shifts) - 1))
+
+        pending = np.arange(n)
+        for by_size in self._levels:
+            if pending.size == 0:
+                break
+            hit = np.zeros(pending.size, dtype=bool)
+            # A TLB holding several page sizes sees them as one ordered stream.
+            for tlb in dict.fromkeys(by_size.values()):
+                held = [_SIZE_CLASS[size] for size, owner in by_size.items() if owner is tlb]
+                mine = np.isin(sizes[pending], held)
+                if not mine.any():
+                    continue
+                selected = pending[mine]
+                stats.translation_latency += tlb.hit_latency * selected.size
+                hit[mine] = tlb.access_batch(keys[selected], False, times[selected])
+            pending = pending[~hit]
+
+        # Merge the walks' PTE reads in front of their accesses.
+        walk_ptes = [self.walk_addresses(int(addresses[i]), _CLASS_SIZE[int(sizes[i])]) for i in pending.tolist()]
+        counts = np.ones(n, dtype=np.int64)
+        counts[pending] += np.fromiter(map(len, walk_ptes), dtype=np.int64, count=len(walk_ptes))
+        data_slots = np.cumsum(counts) - 1
+        merged = np.repeat(physical, counts)
+        merged_writes = np.repeat(writes, counts)
+        is_pte = np.ones(merged.size, dtype=bool)
+        is_pte[data_slots] = False
+        pte_slots = np.flatnonzero(is_pte)
+        if walk_ptes:
+            merged[pte_slots] = np.concatenate([np.asarray(ptes, dtype=np.int64) for ptes in walk_ptes])
+            merged_writes[pte_slots] = False
+        served = self.hierarchy.serve_batch(merged, merged_writes, np.repeat(times, counts))
+
+        latency = self.hierarchy._latency
+        walk = int(latency[served[pte_slots]].sum())
+        stats.walks += pending.size
+        stats.walk_latency += walk
+        stats.translation_latency += walk
+        stats.accesses += n
+        data = served[data_slots]
+        stats.data_latency += int(latency[data].sum())
+        return data < len(self.hierarchy.levels)
+
+    # --- Reporting ---
+
+    def summary(self) -> Dict[str, Any]:
+        stats = self.stats
+        return {
+            **stats.as_dict(),
+            "avg_walk_latency": stats.avg_walk_latency,
+            "walk_rate": stats.walk_rate,
+            "amat": stats.amat,
+            "tlbs": {tlb.name: {**tlb.stats.as_dict(), "miss_ratio": 1 - tlb.stats.hit_ratio
+                                if tlb.stats.accesses else 0.0} for tlb in self.tlbs},
+            "data": self.hierarchy.summary(),
+        }
+
+    def reset_stats(self):
+        self.stats.reset()
+        for tlb in self.tlbs:
+            tlb.stats.reset()
+        self.hierarchy.reset_stats()
+
+_SIZE_CLASS = {size: i for i, size in enumerate(PAGE_SIZES)}
+_CLASS_SIZE = {i: size for size, i in _SIZE_CLASS.items()}
+_SHIFT = {size: PAGE_SIZES[size].bit_length() - 1 for size in PAGE_SIZES}
+_SHIFTS = np.array([_SHIFT[size] for size in PAGE_SIZES], dtype=np.int64)
@@ -0,0 +1,229 @@
+"""Synthetic address streams, generated lazily in chunks.
+
+Every generator yields ``traces.TRACE_DTYPE`` chunks, so its output feeds
+``traces.replay``, ``traces.write_binary`` or the playback/sweep tools like a
+real trace. Nothing is materialized beyond one chunk: loop-nest kernels
+(strided sweeps, matrix multiply, stencils) compute each address directly from
+its position in the stream, and randomized ones seed every chunk from
+``(seed, chunk number)``. Billion-access workloads therefore cost one chunk of
+memory and are reproducible chunk by chunk.
+
+    traces.replay(hierarchy, workloads.matmul(256, tile=32))
+"""
+import math
+from typing import Callable, Iterable, Iterator, Optional, Sequence, Tuple
+
+import numpy as np
+
+import traces
+
+DEFAULT_CHUNK_SIZE = traces.DEFAULT_CHUNK_SIZE
+# Odd multiplier that scatters Zipf ranks over the line space.
+_SCATTER = 2654435761
+
+def _records(addresses: np.ndarray, writes: Optional[np.ndarray] = None) -> np.ndarray:
+    chunk = np.empty(addresses.size, dtype=traces.TRACE_DTYPE)
+    chunk["addr"] = addresses
+    chunk["op"] = traces.OP_READ if writes is None else np.where(writes, traces.OP_WRITE, traces.OP_READ)
+    return chunk
+
+def _chunk_rng(seed: int, chunk: int) -> np.random.Generator:
+    return np.random.default_rng([seed, chunk])
+
+def _generate(length: int, chunk_size: int,
+              make: Callable[[np.ndarray, int], Tuple[np.ndarray, Optional[np.ndarray]]]) -> Iterator[np.ndarray]:
+    # make(positions, chunk number) -> (addresses, write mask or None)
+    for number, start in enumerate(range(0, length, chunk_size)):
+        positions = np.arange(start, min(start + chunk_size, length), dtype=np.int64)
+        yield _records(*make(positions, number))
+
+def _writes(rng: np.random.Generator, n: int, write_ratio: float) -> Optional[np.ndarray]:
+    return rng.random(n) < write_ratio if write_ratio else None
+
+# --- Sweeps and random access ---
+
+def strided(length: int, stride: int = 64, footprint: int = 1 << 24, base: int = 0,
+            write_ratio: float = 0.0, seed: int = 0, chunk_size: int = DEFAULT_CHUNK_SIZE) -> Iterator[np.ndarray]:
+    """``base + i * stride`` wrapping around ``footprint`` bytes; stride 8 is a sequential scan."""
+    def make(positions, number):
+        return base + (positions * stride) % footprint, _writes(_chunk_rng(seed, number), positions.size, write_ratio)
+    return _generate(length, chunk_size, make)
+
+def uniform(length: int, footprint: int = 1 << 28, align: int = 8, base: int = 0,
+            write_ratio: float = 0.25, seed: int = 0, chunk_size: int = DEFAULT_CHUNK_SIZE) -> Iterator[np.ndarray]:
+    """Uniformly random ``align``-aligned addresses in ``footprint`` bytes."""
+    def make(positions, number):
+        rng = _chunk_rng(seed, number)
+        return base + rng.integers(0, footprint // align, positions.size) * align, \
+            _writes(rng, positions.size, write_ratio)
+    return _generate(length, chunk_size, make)
+
+def zipf(length: int, lines: int = 1 << 20, exponent: float = 1.2, block_size: int = 64, base: int = 0,
+         write_ratio: float = 0.25, seed: int = 0, chunk_size: int = DEFAULT_CHUNK_SIZE) -> Iterator[np.ndarray]:
+    """Zipfian hot set: line rank r is drawn with probability ~ r**-exponent (exponent > 1).
+
+    Ranks are scattered over ``lines`` lines with a multiplicative hash, so hot
+    lines don't share a set.
+    """
+    if exponent <= 1:
+        raise ValueError(f"Zipf exponent must be > 1, got {exponent}")
+    if math.gcd(_SCATTER, lines) != 1:
+        raise ValueError(f"lines ({lines}) must be coprime with {_SCATTER}")
+    offset = int(np.random.default_rng(seed).integers(lines))
+    def make(positions, number):
+        rng = _chunk_rng(seed, number)
+        ranks = np.minimum(rng.zipf(exponent, positions.size), lines) - 1
+        line = (ranks * _SCATTER + offset) % lines
+        return base + line * block_size + rng.integers(0, block_size // 8, positions.size) * 8, \
+            _writes(rng, positions.size, write_ratio)
+    return _generate(length, chunk_size, make)
+
+def pointer_chase(length: int, nodes: int = 1 << 18, node_size: int = 64, base: int = 0,
+                  seed: int = 0, chunk_size: int = DEFAULT_CHUNK_SIZE) -> Iterator[np.ndarray]:
+    """Dependent loads around one random cycle through ``nodes`` nodes (reads only)."""
+    order = np.random.default_rng(seed).permutation(nodes).astype(np.int64)
+    return _generate(length, chunk_size, lambda positions, number: (base + order[positions % nodes] * node_size, None))
+
+# --- Loop-nest kernels ---
+
+def matmul(n: int, tile: Optional[int] = None, elem_size: int = 8, base: int = 0,
+           chunk_size: int = DEFAULT_CHUNK_SIZE) -> Iterator[np.ndarray]:
+    """C += A @ B on row-major n x n matrices, naive (``tile=None``) or tiled.
+
+    Loop order is ii, jj, kk, i, j, k: per (i, j) within a tile, the k loop
+    reads A[i, k] and B[k, j], then C[i, j] is read and written.
+    """
+    tile = tile or n
+    if n % tile:
+        raise ValueError(f"Tile size {tile} must divide the matrix size {n}")
+    tiles = n // tile
+    per_ij = 2 * tile + 2
+    matrix = n * n * elem_size
+    a_base, b_base, c_base = base, base + matrix, base + 2 * matrix
+    length = tiles ** 3 * tile * tile * per_ij
+
+    def make(positions, number):
+        group, r = np.divmod(positions, per_ij)
+        # group enumerates (ii, jj, kk, i, j) in mixed radix.
+        group, j = np.divmod(group, tile)
+        group, i = np.divmod(group, tile)
+        group, kk = np.divmod(group, tiles)
+        ii, jj = np.divmod(group, tiles)
+        row, col = ii * tile + i, jj * tile + j
+        k = kk * tile + r // 2
+        addresses = np.where(r % 2 == 0, a_base + (row * n + k) * elem_size, b_base + (k * n + col) * elem_size)
+        in_c = r >= 2 * tile
+        addresses = np.where(in_c, c_base + (row * n + col) * elem_size, addresses)
+        return addresses, r == per_ij - 1
+    return _generate(length, chunk_size, make)
+
+def stencil(nx: int, ny: int, sweeps: int = 1, elem_size: int = 8, base: int = 0,
+            chunk_size: int = DEFAULT_CHUNK_SIZE) -> Iterator[np.ndarray]:
+    """5-point Jacobi sweeps over an nx x ny grid, ping-ponging between two buffers.
+
+    Each interior point reads its four neighbours and itself from the source
+    grid and writes the destination grid.
+    """
+    if nx < 3 or ny < 3:
+        raise ValueError("A stencil grid needs at least 3 x 3 points")
+    interior = (nx - 2) * (ny - 2)
+    grid = nx * ny * elem_size
+    # Row/column offsets of the reads, then the write (0, 0).
+    dy = np.array([-1, 1, 0, 0, 0, 0], dtype=np.int64)
+    dx = np.array([0, 0, -1, 1, 0, 0], dtype=np.int64)
+    length = sweeps * interior * 6
+
+    def make(positions, number):
+        point, r = np.divmod(positions, 6)
+        sweep, point = np.divmod(point, interior)
+        y, x = np.divmod(point, nx - 2)
+        y, x = y + 1 + dy[r], x + 1 + dx[r]
+        write = r == 5
+        # Sweep s reads buffer s % 2 and writes the other one.
+        buffer = np.where(write, (sweep + 1) % 2, sweep % 2)
+        return base + buffer * grid + (y * nx + x) * elem_size, write
+    return _generate(length, chunk_size, make)
+
+def hash_probe(length: int, table_size: int = 1 << 20, entry_size: int = 16, load_factor: float = 0.7,
+               insert_ratio: float = 0.1, base: int = 0, seed: int = 0,
+               chunk_size: int = DEFAULT_CHUNK_SIZE) -> Iterator[np.ndarray]:
+    """Open-addressing lookups with linear probing.
+
+    Each lookup hashes to a random slot and probes consecutive slots; the probe
+    count is geometric with mean ~ 1 / (1 - load_factor). Inserts write the
+    last probed slot. A probe sequence may be split across chunk boundaries.
+    """
+    if not 0 <= load_factor < 1:
+        raise ValueError(f"load_factor must be in [0, 1), got {load_factor}")
+    def make(positions, number):
+        rng = _chunk_rng(seed, number)
+        n = positions.size
+        lookups = int(n * (1 - load_factor)) + 16
+        probes = rng.geometric(1 - load_factor, lookups)
+        while probes.sum() < n:
+            probes = np.concatenate([probes, rng.geometric(1 - load_factor, lookups)])
+        slots = rng.integers(0, table_size, probes.size)
+        inserts = rng.random(probes.size) < insert_ratio
+        starts = np.cumsum(probes) - probes
+        lookup = np.repeat(np.arange(probes.size), probes)[:n]
+        step = np.arange(n) - starts[lookup]
+        addresses = base + ((slots[lookup] + step) % table_size) * entry_size
+        return addresses, inserts[lookup] & (step == probes[lookup] - 1)
+    return _generate(length, chunk_size, make)
+
+# --- Combining streams ---
+
+class _Stream:
+    def __init__(self, chunks: Iterable[np.ndarray]):
+        self._chunks = iter(chunks)
+        self._buffer = np.empty(0, dtype=traces.TRACE_DTYPE)
+
+    def take(self, n: int) -> np.ndarray:
+        """Next n records, fewer once the stream runs out."""
+        parts, have = [self._buffer], self._buffer.size
+        while have < n:
+            chunk = next(self._chunks, None)
+            if chunk is None:
+                break
+            parts.append(np.asarray(chunk, dtype=traces.TRACE_DTYPE))
+            have += chunk.size
+        records = np.concatenate(parts) if len(parts) > 1 else parts[0]
+        self._buffer = records[n:]
+        return records[:n]
+
+def interleave(streams: Sequence[Iterable[np.ndarray]], weights: Optional[Sequence[float]] = None,
+               seed: int = 0, chunk_size: int = DEFAULT_CHUNK_SIZE, cores: bool = False) -> Iterator[np.ndarray]:
+    """Merge several streams: round-robin, or a seeded random mix in proportion to ``weights``.
+
+    Each stream keeps its own order. The output ends as soon as any stream runs
+    out, so give the streams their own ``base`` addresses and matching lengths.
+    With ``cores`` the chunks are ``traces.CORE_TRACE_DTYPE``, stream i running
+    on core i (for coherence.MultiCoreCache); overlapping bases then model sharing.
+    """
+    sources = [_Stream(stream) for stream in streams]
+    if weights is not None:
+        weights = np.asarray(weights, dtype=np.float64)
+        weights = weights / weights.sum()
+    number = 0
+    while True:
+        if weights is None:
+            choice = np.arange(chunk_size) % len(sources)
+        else:
+            choice = _chunk_rng(seed, number).choice(len(sources), size=chunk_size, p=weights)
+        out = np.empty(chunk_size, dtype=traces.CORE_TRACE_DTYPE if cores else traces.TRACE_DTYPE)
+        end = chunk_size
+        for s, source in enumerate(sources):
+            positions = np.flatnonzero(choice == s)
+            records = source.take(positions.size)
+            filled = positions[:records.size]
+            out["op"][filled] = records["op"]
+            out["addr"][filled] = records["addr"]
+            if cores:
+                out["core"][filled] = s
+            if records.size < positions.size:
+                end = min(end, int(positions[records.size]))
+        if end:
+            yield out[:end]
+        if end < chunk_size:
+            return
+        number += 1